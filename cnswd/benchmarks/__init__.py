@@ -0,0 +1,10 @@
+"""
+性能基准
+
+用法：
+    python -m cnswd.benchmarks.fixed_data
+    python -m cnswd.benchmarks.page_objects
+    python -m cnswd.benchmarks.sources --record
+    python -m cnswd.benchmarks.excel
+    python -m cnswd.benchmarks.hq_parser
+"""
@@ -0,0 +1,88 @@
+"""
+电子表格读取引擎性能基准
+
+从夹具库中选取`.xls`、`.xlsx`内容(如网易成交明细、深交所股票列表)，
+比较各可用读取引擎的解析速度，并检查结果是否一致。
+
+用法：
+    python -m cnswd.benchmarks.excel --fixtures fixtures
+    python -m cnswd.benchmarks.excel --files a.xls b.xlsx --repeat 5
+"""
+import argparse
+import time
+
+from cnswd.websource.excel import available_engines, read_excel
+from cnswd.websource.replay import FixtureStore
+
+# 文件头标识
+MAGICS = {
+    b'\xd0\xcf\x11\xe0': 'xls',
+    b'PK\x03\x04': 'xlsx',
+}
+
+
+def _kind(content):
+    return MAGICS.get(content[:4])
+
+
+def load_fixtures(root):
+    """夹具库中的电子表格内容，返回[(名称, 内容)]"""
+    store = FixtureStore(root)
+    res = []
+    for key in sorted(store.keys()):
+        meta, content = store.load(key)
+        kind = _kind(content)
+        if kind:
+            res.append((f'{kind} {meta["url"]}', content))
+    return res
+
+
+def load_files(paths):
+    res = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            res.append((path, f.read()))
+    return res
+
+
+def run(items, engines, repeat):
+    print(f'电子表格 {len(items)}项 共{sum(len(c) for _, c in items) / 1024:.1f}KB')
+    print(f'{"引擎":<10} {"行数":>10} {"耗时(秒)":>10} {"行/秒":>12} {"失败":>6}')
+    results = {}
+    for engine in engines:
+        frames, failed, elapsed = {}, 0, 0.0
+        for name, content in items:
+            try:
+                for _ in range(repeat):
+                    t = time.time()
+                    frames[name] = read_excel(content, engine=engine)
+                    elapsed += time.time() - t
+            except Exception as e:
+                print(f'{engine:<10} {name} 失败：{e!r}')
+                failed += 1
+        rows = sum(len(df) for df in frames.values())
+        t = elapsed / repeat
+        print(f'{engine:<10} {rows:>10} {t:>10.3f} '
+              f'{rows / t if t else 0:>12.0f} {failed:>6}')
+        results[engine] = frames
+    # 以首个引擎为基准比较结果
+    base, *others = engines
+    for engine in others:
+        diff = [name for name, df in results[engine].items()
+                if name in results[base] and not df.equals(results[base][name])]
+        print(f'{engine}与{base}结果不一致：{len(diff)}项')
+        for name in diff:
+            print(f'    {name}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='电子表格读取引擎性能基准')
+    parser.add_argument('--fixtures', default='fixtures', help='夹具目录')
+    parser.add_argument('--files', nargs='+', help='电子表格文件，指定时不使用夹具库')
+    parser.add_argument('--engines', nargs='+', default=available_engines())
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    items = load_files(args.files) if args.files else load_fixtures(args.fixtures)
+    if not items:
+        parser.error('没有可用的电子表格，请先以`cnswd.benchmarks.sources --record`录制夹具')
+    run(items, args.engines, args.repeat)
@@ -0,0 +1,135 @@
+"""
+`fixed_data`性能基准
+
+以财务报表(8.x)宽表测试数据为样本，比较原实现副本(原方式)
+与向量化、缓存修复方案(现方式)的耗时。
+
+用法：
+    python -m cnswd.benchmarks.fixed_data --path tests/cninfo/db_8_3_2.csv --level 8.3.2
+"""
+import argparse
+import re
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from cnswd.scripts.cninfo.units import (CODE_COLS, CODE_PAT, DATE_COL_PAT, FIN_PAT,
+                                        MID_PAT, _remove_prefix_num,
+                                        _remove_suffix_unit, _special_fix,
+                                        fixed_data, parse_unit)
+
+
+# 以下为原实现的副本，作为比较基准，不随现实现变动
+def _origin_fix_code(df):
+    """修复代码"""
+    cols = ['证券代码', '股票代码', '上市代码', '转板代码', '基金代码']
+    # 股票行数数据 代码 000001-SZE
+
+    def f(x):
+        if isinstance(x, str):
+            return CODE_PAT.sub('', x)
+        try:
+            return str(int(x)).zfill(6)
+        except Exception:
+            return x
+    for c in cols:
+        if c in df.columns:
+            df[c] = df[c].map(f)
+    return df
+
+
+def _origin_fix_date(df):
+    """修复日期"""
+    for col in df.columns:
+        if re.search(DATE_COL_PAT, col):
+            df[col] = pd.to_datetime(
+                df[col], infer_datetime_format=True, errors='coerce')
+    return df
+
+
+def _origin_fix_num_unit(df):
+    """修复列数量单位"""
+    units = {}
+    for col_name in df.columns:
+        units.update(parse_unit(col_name))
+    for col, unit in units.items():
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            raise TypeError(f'应为数字类型。列"{col}"实际为"{df[col].dtype}"')
+        df[col] = df[col] * unit
+    return df
+
+
+def _origin_fix_col_name(df):
+    """修复列名称"""
+    # 更名
+    if ("股票代码" in df.columns) and ("股票简称" in df.columns):
+        df.rename(columns={"股票代码": "证券代码",
+                           "股票简称": "证券简称"},
+                  inplace=True)
+    origin = df.columns
+
+    def f(x):
+        x = _remove_prefix_num(x)
+        x = _remove_suffix_unit(x)
+        x = MID_PAT.sub('_', x)
+        x = x.replace('Ａ', 'A')
+        x = x.replace('Ｂ', 'B')
+        x = x.replace('Ｈ', 'H')
+        x = FIN_PAT.sub('', x.strip())
+        return x
+    df.columns = map(f, origin)
+    return df
+
+
+def origin_fixed_data(input_df, level, db_name):
+    """原方式：每次解析列结构、逐元素修复代码"""
+    df = input_df.copy()
+    df = _special_fix(df, level, db_name)
+    df = _origin_fix_code(df)
+    df = _origin_fix_date(df)
+    df = _origin_fix_num_unit(df)
+    df = _origin_fix_col_name(df)
+    return df
+
+
+def _unique_codes(data):
+    """代码列改为各行互不相同，模拟以股票代码为键的高基数宽表"""
+    data = data.copy()
+    suffixes = np.array(['-SZE', '-SHE'])
+    n = np.arange(len(data))
+    for c in CODE_COLS:
+        if c in data.columns:
+            data[c] = pd.Series(n).astype(str).str.zfill(6).values + suffixes[n % 2]
+    return data
+
+
+def _compare(title, data, level, db_name, repeat):
+    # 结果须一致
+    pd.testing.assert_frame_equal(origin_fixed_data(data, level, db_name),
+                                  fixed_data(data, level, db_name))
+    print(f'{title}：{data.shape[0]}行 {data.shape[1]}列')
+    for name, func in (('原方式', origin_fixed_data), ('现方式', fixed_data)):
+        t = min(timeit.repeat(lambda: func(data, level, db_name),
+                              number=1, repeat=repeat))
+        print(f'{name:<6} {t * 1000:>10.2f} 毫秒')
+
+
+def run(path, level, db_name, repeat, rows):
+    data = pd.read_csv(path)
+    if rows:
+        data = pd.concat([data] * (rows // len(data) + 1),
+                         ignore_index=True).iloc[:rows]
+    _compare(f'样本 {path}', data, level, db_name, repeat)
+    _compare('高基数代码', _unique_codes(data), level, db_name, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='fixed_data性能基准')
+    parser.add_argument('--path', default='tests/cninfo/db_8_3_2.csv')
+    parser.add_argument('--level', default='8.3.2')
+    parser.add_argument('--db_name', default='dataBrowse')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=0, help='复制样本至指定行数')
+    args = parser.parse_args()
+    run(args.path, args.level, args.db_name, args.repeat, args.rows)
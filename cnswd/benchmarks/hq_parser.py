@@ -0,0 +1,84 @@
+"""
+实时报价解析性能基准
+
+以全市场规模(默认4500只股票)合成新浪实时报价内容，比较原逐行拆分解析与`parse_hq`。
+
+用法：
+    python -m cnswd.benchmarks.hq_parser
+    python -m cnswd.benchmarks.hq_parser --codes 4500 --repeat 20
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from cnswd.constants import QUOTE_COLS
+from cnswd.websource.sina import parse_hq
+
+QUOTE_PATTERN = re.compile('"(.*)"')
+CODE_PATTERN = re.compile(r'hq_str_s[zh](\d{6})')
+
+
+def make_content(n, seed=0):
+    """合成n只股票的报价内容，约2%为停牌(无数据)"""
+    rng = np.random.RandomState(seed)
+    lines = []
+    for i in range(n):
+        prefix = 'sh' if i % 3 == 0 else 'sz'
+        code = f'{600000 + i:06d}' if prefix == 'sh' else f'{i:06d}'
+        if rng.rand() < 0.02:
+            lines.append(f'var hq_str_{prefix}{code}="";')
+            continue
+        price = round(rng.uniform(2, 200), 2)
+        levels = ','.join(f'{rng.randint(1, 5000) * 100},{price:.3f}' for _ in range(10))
+        fields = [f'股票{i}', f'{price:.3f}', f'{price:.3f}', f'{price:.3f}', f'{price:.3f}',
+                  f'{price:.3f}', f'{price:.3f}', f'{price:.3f}',
+                  str(rng.randint(1, 10 ** 8)), f'{rng.uniform(1, 10 ** 9):.3f}',
+                  levels, '2018-12-03', '15:00:03', '00']
+        lines.append(f'var hq_str_{prefix}{code}="{",".join(fields)}";')
+    return '\n'.join(lines)
+
+
+def _convert_to_numeric(s, exclude=()):
+    if pd.api.types.is_string_dtype(s) and s.name not in exclude:
+        return pd.to_numeric(s, errors='coerce')
+    return s
+
+
+def legacy_parse(content):
+    """原解析方法：两次正则、逐行拆分、逐列转换"""
+    res = [x.split(',') for x in re.findall(QUOTE_PATTERN, content)]
+    codes = [x for x in re.findall(CODE_PATTERN, content)]
+    df = pd.DataFrame(res).iloc[:, :32]
+    df.columns = QUOTE_COLS[1:]
+    df.insert(0, '股票代码', codes)
+    df.dropna(inplace=True)
+    return df.apply(_convert_to_numeric, exclude=('股票代码', '股票简称', '日期', '时间'))
+
+
+def _timeit(func, content, repeat):
+    func(content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        res = func(content)
+    return (time.perf_counter() - start) / repeat, res
+
+
+def run(n, repeat):
+    content = make_content(n)
+    print(f'股票{n}只 内容{len(content) / 1024:.1f}KB')
+    base, old = _timeit(legacy_parse, content, repeat)
+    t, new = _timeit(parse_hq, content, repeat)
+    print(f'{"方法":<12} {"行数":>6} {"耗时(毫秒)":>12} {"倍数":>6}')
+    print(f'{"legacy_parse":<12} {len(old):>6} {base * 1000:>12.2f} {1:>6.1f}')
+    print(f'{"parse_hq":<12} {len(new):>6} {t * 1000:>12.2f} {base / t:>6.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='实时报价解析性能基准')
+    parser.add_argument('--codes', type=int, default=4500)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    run(args.codes, args.repeat)
@@ -0,0 +1,52 @@
+"""
+网页版页面对象性能基准
+
+在本地替身网站上运行`DataBrowse`、`ThematicStatistics`，报告各项目耗时及每页耗时，
+用于衡量数据提取方式的改进。需要Firefox及geckodriver。
+
+用法：
+    python -m cnswd.benchmarks.page_objects --api db --levels 1.1 3.1 --rows 500 --table pages
+"""
+import argparse
+import time
+
+from cnswd.websource.cninfo.standin_site import TABLE_MODES, StandInSite
+from cnswd.websource.cninfo.data_browse import DataBrowse
+from cnswd.websource.cninfo.thematic_statistics import ThematicStatistics
+
+API_CLASSES = {'db': DataBrowse, 'ts': ThematicStatistics}
+
+
+def run(api_name, levels, start, end, rows, latency, table, tabs):
+    api_class = API_CLASSES[api_name]
+    # 以最大每页显示行数计算页数
+    view = max(api_class.view_selection.values())
+    with StandInSite(rows=rows, latency=latency, table=table) as site:
+        start_time = time.time()
+        with api_class(clear_cache=False, tabs=tabs, base_url=site.base_url) as api:
+            print(f'加载主页 {time.time() - start_time:>8.2f} 秒')
+            print(f'{"项目":<8} {"行数":>8} {"查询":>6} {"页数":>6} {"耗时(秒)":>10} {"每页(秒)":>10}')
+            for level in levels:
+                site.queries.clear()
+                t = time.time()
+                df = api.get_data(level, start, end)
+                elapsed = time.time() - t
+                pages = site.pages(view)
+                print(f'{level:<8} {len(df):>8} {len(site.queries):>6} {pages:>6} '
+                      f'{elapsed:>10.2f} {elapsed / max(pages, 1):>10.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='网页版页面对象性能基准')
+    parser.add_argument('--api', choices=list(API_CLASSES), default='db')
+    parser.add_argument('--levels', nargs='+', default=['1.1', '3.1'])
+    parser.add_argument('--start', default='2018-01-01')
+    parser.add_argument('--end', default='2018-01-31')
+    parser.add_argument('--rows', type=int, default=500, help='每次查询返回行数')
+    parser.add_argument('--latency', type=float, default=0.2, help='查询延时(秒)')
+    parser.add_argument('--table', choices=TABLE_MODES, default='model',
+                        help='数据表读取方式')
+    parser.add_argument('--tabs', type=int, default=1)
+    args = parser.parse_args()
+    run(args.api, args.levels, args.start, args.end, args.rows,
+        args.latency, args.table, args.tabs)
@@ -0,0 +1,104 @@
+"""
+网站数据源性能基准
+
+以夹具库回放网络响应，测量各数据源函数"读取+解析"的吞吐量。
+首次运行需以`--record`访问网站录制夹具，此后可离线重复运行。
+
+用法：
+    python -m cnswd.benchmarks.sources --fixtures fixtures --record
+    python -m cnswd.benchmarks.sources --fixtures fixtures --latency 0.05 --rate 10
+    python -m cnswd.benchmarks.sources --fixtures fixtures --cases wy.fetch_history sina.fetch_quotes
+"""
+import argparse
+import asyncio
+import importlib
+import time
+
+import pandas as pd
+
+from cnswd.websource.replay import FixtureStore, Transport, using
+
+CODES = ['000001', '000002', '300002', '600000', '600519']
+
+# 名称: (模块, 函数, 位置参数, 是否异步)
+CASES = {
+    'wy.fetch_history': ('cnswd.websource.wy', 'fetch_history',
+                         ('000001', '2018-01-01', '2018-12-31'), False),
+    'wy.fetch_financial_report': ('cnswd.websource.wy', 'fetch_financial_report',
+                                  ('000001', 'report', 'zcfzb'), False),
+    'wy.fetch_margin_data': ('cnswd.websource.wy', 'fetch_margin_data',
+                             ('2018-12-03',), False),
+    'sina.fetch_quotes': ('cnswd.websource.sina', 'fetch_quotes', (CODES,), False),
+    'sina.fetch_company_info': ('cnswd.websource.sina', 'fetch_company_info',
+                                ('000001',), False),
+    'tencent.fetch_concept_categories': ('cnswd.websource.tencent',
+                                         'fetch_concept_categories', (), False),
+    'juchao.fetch_symbols_list': ('cnswd.websource.juchao', 'fetch_symbols_list',
+                                  (), False),
+    'nbsc.fetch_economics': ('cnswd.websource.nbsc', 'fetch_economics',
+                             ('A010101', '2018-01', '2018-12', 'monthly'), False),
+    'szse.fetch_companys_info': ('cnswd.websource.szse', 'fetch_companys_info',
+                                 (), False),
+    'wy.fetch_cjmx': ('cnswd.websource.wy', 'fetch_cjmx', ('000001', '2018-12-03'), False),
+    'tencent.fetch_minutely_prices': ('cnswd.websource.tencent',
+                                      'fetch_minutely_prices', (), False),
+    'quote.to_dataframe': ('cnswd.scripts.szsh.quote', 'to_dataframe', (CODES,), True),
+}
+
+
+def _call(module, name, args, is_async):
+    func = getattr(importlib.import_module(module), name)
+    if is_async:
+        return asyncio.run(func(*args))
+    return func(*args)
+
+
+def _rows(res):
+    """结果行数"""
+    if isinstance(res, pd.DataFrame):
+        return len(res)
+    if isinstance(res, (list, tuple)):
+        return sum(_rows(x) for x in res)
+    return 1
+
+
+def run(names, root, record, latency, rate, repeat):
+    store = FixtureStore(root)
+    if record:
+        transport = Transport('record', store)
+        repeat = 1
+    else:
+        transport = Transport('replay', store, latency=latency, rate=rate)
+    print(f'{"数据源":<36} {"请求":>6} {"行数":>8} {"KB":>10} {"耗时(秒)":>10} {"行/秒":>10} {"KB/秒":>10}')
+    with using(transport):
+        for name in names:
+            module, func, args, is_async = CASES[name]
+            transport.stats = {'requests': 0, 'bytes': 0}
+            rows, elapsed = 0, 0.0
+            try:
+                for _ in range(repeat):
+                    t = time.time()
+                    rows = _rows(_call(module, func, args, is_async))
+                    elapsed += time.time() - t
+            except Exception as e:
+                print(f'{name:<36} 失败：{e!r}')
+                continue
+            n = transport.stats['requests'] // repeat
+            kb = transport.stats['bytes'] / repeat / 1024
+            t = elapsed / repeat
+            print(f'{name:<36} {n:>6} {rows:>8} {kb:>10.1f} {t:>10.3f} '
+                  f'{rows / t if t else 0:>10.0f} {kb / t if t else 0:>10.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='网站数据源性能基准')
+    parser.add_argument('--fixtures', default='fixtures', help='夹具目录')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--record', action='store_true', help='访问网站录制夹具')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='回放响应延时(秒)，负数表示使用录制时的响应时间')
+    parser.add_argument('--rate', type=float, default=None, help='同一网站每秒最多请求次数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    latency = None if args.latency < 0 else args.latency
+    run(args.cases, args.fixtures, args.record, latency, args.rate, args.repeat)
@@ -1,42 +1,73 @@
-import os
-import time
+import hashlib
+import queue
 import sys
+import threading
+import time
 import numpy as np
 import pandas as pd
+from sqlalchemy import func, inspect, text
 
-from cnswd.websource.exceptions import RetryException
-from cnswd.utils import data_root, loop_period_by
+from cnswd.websource.exceptions import BudgetExceeded
+from cnswd.utils import loop_period_by
 from cnswd.websource.cninfo.constants import DB_NAME, DB_DATE_FREQ, TS_NAME, TS_DATE_FREQ
 from cnswd.websource.cninfo.data_browse import DataBrowse
+from cnswd.websource.cninfo.planner import DATE_FMT_STRS, PeriodPlanner
 from cnswd.websource.cninfo.thematic_statistics import ThematicStatistics
+from cnswd.websource.cninfo.webapi import DataBrowseClient, ThematicStatisticsClient
 from cnswd.sql.base import get_engine, get_session
+from cnswd.sql.coerce import coerce_frame, column_types
+from cnswd.sql.journal import (get_level_record, get_period_record,
+                               set_level_record, set_period_record)
 
 from .base import DB_DATE_FIELD, DB_MODEL_MAPS, TS_DATE_FIELD, TS_MODEL_MAPS
 from .units import fixed_data
 
-record_path = os.path.join(data_root('record'), 'cninfo.csv')
+# 单个项目每轮刷新的时间预算(秒)，超出后移入失败队列，最后重试
+LEVEL_BUDGET = 30 * 60
+# 按刷新周期确定的项目优先级，数值越小越优先
+FREQ_PRIORITY = {'D': 0, 'B': 0, 'W': 1, 'M': 2, 'Q': 3, 'Y': 4, None: 5}
+# 合并稀疏期间时，每次查询期望行数。网页版一次读取全部结果，不按页拆分期间
+PERIOD_ROWS = 5000
+
+
+def get_record(index, path_str=None):
+    """项目刷新状态"""
+    return get_level_record(index, path_str)
+
+
+def update_record(index, status, path_str=None):
+    """更新刷新状态，保存至本地日志数据库"""
+    set_level_record(index, status, path_str)
+
 
+def _period_key(s, e):
+    """期间日志键值"""
+    if s is None:
+        return '全部'
+    return f"{s.strftime(r'%Y-%m-%d')}~{e.strftime(r'%Y-%m-%d')}"
 
-def get_record(index):
-    try:
-        return pd.read_csv(record_path, index_col=0).loc[index].to_dict()
-    except FileNotFoundError:
-        df = pd.DataFrame({'完成状态': '未执行',
-                           '尝试次数': 0,
-                           '完成时间': pd.Timestamp('now'),
-                           '备注': ''},
-                          index=[index])
-        df.to_csv(record_path)
-        return pd.read_csv(record_path, index_col=0).loc[index].to_dict()
-    except KeyError:
-        return {'完成状态': '未执行', '尝试次数': 0, '完成时间': pd.Timestamp('now'), '备注': ''}
 
+def _staging_key(period):
+    """期间暂存日志键值，与完成日志分别记录"""
+    return f"{_period_key(*period)}#暂存"
 
-def update_record(index, status):
-    """更新刷新状态，保持至本地文件"""
-    df = pd.read_csv(record_path, index_col=0)
-    df.loc[index] = pd.Series(status)
-    df.to_csv(record_path)
+
+def _row_hashes(df):
+    """各行哈希值"""
+    return pd.util.hash_pandas_object(df, index=False).values
+
+
+def _combine_hash(columns, hashes):
+    """由列名称及各行哈希值计算数据内容哈希值，与行顺序无关"""
+    m = hashlib.md5('|'.join(map(str, columns)).encode('utf-8'))
+    if len(hashes):
+        m.update(np.sort(hashes).tobytes())
+    return m.hexdigest()
+
+
+def _content_hash(df):
+    """数据内容哈希值"""
+    return _combine_hash(df.columns, _row_hashes(df) if len(df) else [])
 
 
 class Refresher(object):
@@ -44,14 +75,39 @@ class Refresher(object):
     date_field = {}
     level_model = {}
     level_name = {}
-    api_class = None
+    api_class = None           # 网页版
+    client_class = None        # 接口版
 
-    def __init__(self, end_date=None, retry_times=20):
+    def __init__(self, end_date=None, retry_times=20, backend='selenium', tabs=1,
+                 workers=1, level_budget=LEVEL_BUDGET, stream=False, journal_path=None,
+                 planner_path=None, path_str=None):
         if end_date is None:
             self.end_date = pd.Timestamp('now').normalize()
         else:
             self.end_date = pd.Timestamp(end_date).normalize()
         self.retry_times = retry_times
+        assert backend in ('selenium', 'json'), 'backend可选值为("selenium","json")'
+        self.backend = backend
+        self.tabs = tabs
+        self.workers = max(1, workers)
+        self.level_budget = level_budget
+        # 流式写入：逐页规范并写入，内存占用有限，已写入部分不因后续失败而丢失
+        self.stream = stream
+        self.journal_path = journal_path  # 日志数据库路径，为None时使用默认路径
+        self.path_str = path_str  # 数据库路径，为None时使用默认路径
+        # 各工作线程共用期间规划器，统计在每次运行结束时保存
+        self.planner = PeriodPlanner(planner_path)
+        self._plans = {}
+        self._run_start = pd.Timestamp('now')
+        # 多工作线程共用数据库，写入需加锁
+        self._write_lock = threading.RLock()
+        self._available = False
+
+    def make_api(self):
+        """按后端类型创建数据读取实例"""
+        if self.backend == 'json':
+            return self.client_class(True)
+        return self.api_class(True, self.tabs)
 
     @property
     def db_name(self):
@@ -114,7 +170,7 @@ class Refresher(object):
 
     def get_start_date(self, level):
         """刷新项目数据的开始日期"""
-        session = get_session(self.db_name)
+        session = get_session(self.db_name, path_str=self.path_str)
         class_ = self.get_level_class(level)
         date_field = self.get_date_field(level)
         default_date = self.get_default_start_date(level)
@@ -131,62 +187,290 @@ class Refresher(object):
             start_date = self._compute_start(end_dates, level)
         return start_date
 
-    def _delete(self, api, level, start):
-        """删除项目开始日期之后的所有数据"""
-        # 删除最近的日线数据
-        # 融资融券数据导致不一致，需要清理旧数据
+    def _period_query(self, session, level, start, end):
+        """项目期间内数据查询，开始日期为空时为全部数据"""
         class_ = self.get_level_class(level)
-        table_name = class_.__tablename__
-        expr = getattr(class_, self.get_date_field(level))
-        session = get_session(self.db_name)
-        num = session.query(class_).filter(
-            expr >= start).delete(False)
+        query = session.query(class_)
+        if start is not None:
+            expr = getattr(class_, self.get_date_field(level))
+            query = query.filter(expr >= start)
+            if end is not None:
+                query = query.filter(expr < end + pd.Timedelta(days=1))
+        return query
+
+    def _delete(self, api, level, start, end=None):
+        """删除项目期间内的数据
+
+        未指定结束日期时，删除开始日期之后的所有数据
+        """
+        table_name = self.get_level_class(level).__tablename__
         st = start.strftime(r'%Y-%m-%d')
-        msg = f"删除 {self.db_name} {table_name} {st} 开始 {num}行"
+        if end is not None:
+            st += f" ~ {end.strftime(r'%Y-%m-%d')}"
+        with self._write_lock:
+            session = get_session(self.db_name, path_str=self.path_str)
+            num = self._period_query(session, level, start, end).delete(False)
+            session.commit()
+            session.close()
+        msg = f"删除 {self.db_name} {table_name} {st} {num}行"
         api.logger.notice(msg)
-        session.commit()
-        session.close()
 
-    def _to_sql(self, api, level, df, if_exists):
+    def _count(self, level, start, end):
+        """项目期间内已存储的行数"""
+        engine = get_engine(self.db_name, path_str=self.path_str)
+        if not inspect(engine).has_table(self.get_level_class(level).__tablename__):
+            return 0
+        session = get_session(self.db_name, path_str=self.path_str)
+        try:
+            # 只计数，不涉及模型其他列
+            query = self._period_query(session, level, start, end)
+            class_ = self.get_level_class(level)
+            return query.with_entities(func.count()).select_from(class_).scalar()
+        finally:
+            session.close()
+
+    def _normalize(self, level, df):
+        """修复数据并按模型列类型转换"""
+        if df.empty:
+            return df
+        df = fixed_data(df, level, self.db_name)
+        return coerce_frame(df, self.get_level_class(level))
+
+    def _to_sql(self, api, level, df, if_exists, table_name=None):
+        """写入已规范的数据，默认写入项目表"""
         class_ = self.get_level_class(level)
-        table_name = class_.__tablename__
-        engine = get_engine(self.db_name)
-        df.to_sql(table_name, con=engine, if_exists=if_exists, index=False)
+        table_name = table_name or class_.__tablename__
+        engine = get_engine(self.db_name, path_str=self.path_str)
+        # 按模型列类型整列写入，避免逐行推断类型
+        dtype = column_types(class_, df.columns)
+        with self._write_lock:
+            df.to_sql(table_name, con=engine, if_exists=if_exists, index=False,
+                      dtype=dtype)
         action = '添加' if if_exists == 'append' else '更新'
         api.logger.notice(f"{action} {self.db_name} {table_name} {len(df)} 行")
 
     def _add(self, api, level, df):
-        df = fixed_data(df, level, self.db_name)
+        df = self._normalize(level, df)
         self._to_sql(api, level, df, 'append')
+        return df
 
     def _replace(self, api, level, df):
-        df = fixed_data(df, level, self.db_name)
+        df = self._normalize(level, df)
         self._to_sql(api, level, df, 'replace')
+        return df
+
+    def _is_unchanged(self, level, period, hash_value):
+        """期间数据是否与上次写入一致
+
+        哈希值相同且数据库中期间行数与记录一致时，无需重新写入
+        """
+        d = get_period_record(self.api_class.__name__, level, _period_key(*period),
+                              self.journal_path)
+        if d is None or d['状态'] != '完成' or d['哈希值'] != hash_value:
+            return False
+        return self._count(level, *period) == d['行数']
+
+    def _is_committed(self, level, period):
+        """期间是否已在本次运行中完成
+
+        重试时跳过本次运行中已完成的期间。以往运行完成的期间仍需重新读取，
+        报告期、截止日期类项目在期间结束后数周内仍会新增数据，是否需要写入由`_is_unchanged`判定。
+        """
+        d = get_period_record(self.api_class.__name__, level, _period_key(*period),
+                              self.journal_path)
+        if d is None or d['状态'] != '完成':
+            return False
+        return d['完成时间'] >= self._run_start
 
-    def _loop_by_level(self, api, level, freq):
+    def _commit_period(self, level, period, rows, hash_value):
+        """记录期间完成"""
+        with self._write_lock:
+            set_period_record(self.api_class.__name__, level, _period_key(*period),
+                              '完成', rows, hash_value, self.journal_path)
+
+    def _plan_periods(self, level, start, end, freq):
+        """项目刷新期间
+
+        以日期字符串表达期间的项目，按历史行密度合并相邻的稀疏期间。
+        同一运行中规划结果保持不变，重试时已完成期间的日志键值一致。
+        """
+        if level not in self._plans:
+            ps = loop_period_by(start, end, freq, False)
+            if self.date_freq[level][0][1] in DATE_FMT_STRS:
+                key = f"{self.api_class.__name__}{level}"
+                ps = self.planner.plan(key, ps, PERIOD_ROWS, split=False)
+            self._plans[level] = ps
+        return self._plans[level]
+
+    def _observe(self, level, period, rows):
+        """记录期间行数，供下次运行规划"""
+        s, e = period
+        if s is not None and self.date_freq[level][0][1] in DATE_FMT_STRS:
+            self.planner.observe(f"{self.api_class.__name__}{level}", s, e, rows)
+
+    def _check_budget(self, level, deadline):
+        """超出时间预算时中止项目"""
+        if deadline is not None and time.time() > deadline:
+            raise BudgetExceeded(f'{level} 超出时间预算')
+
+    def _staging_name(self, level):
+        """项目暂存表名称"""
+        return f"{self.get_level_class(level).__tablename__}_staging"
+
+    def _staged_rows(self, level, period):
+        """期间在本次运行中已暂存的行数
+
+        暂存表行数与日志不一致时(如暂存表已用于其他期间)，返回0，重新暂存
+        """
+        d = get_period_record(self.api_class.__name__, level, _staging_key(period),
+                              self.journal_path)
+        if d is None or d['状态'] != '暂存' or d['完成时间'] < self._run_start:
+            return 0
+        name = self._staging_name(level)
+        engine = get_engine(self.db_name, path_str=self.path_str)
+        if not inspect(engine).has_table(name):
+            return 0
+        with engine.connect() as conn:
+            num = conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+        return num if num == d['行数'] else 0
+
+    def _swap(self, api, level, period, rows):
+        """以暂存表数据替换项目表期间数据(开始日期为空时为全表)"""
+        class_ = self.get_level_class(level)
+        table_name, staging = class_.__tablename__, self._staging_name(level)
+        s, e = period
+        engine = get_engine(self.db_name, path_str=self.path_str)
+        with self._write_lock:
+            insp = inspect(engine)
+            if rows == 0:
+                if s is not None and insp.has_table(table_name):
+                    # 期间无数据
+                    self._delete(api, level, s, e)
+                return
+            columns = [c['name'] for c in insp.get_columns(staging)]
+            existing = []
+            if insp.has_table(table_name):
+                existing = [c['name'] for c in insp.get_columns(table_name)]
+            if s is None and set(columns) != set(existing):
+                # 新表或列有变动，以暂存表替代项目表
+                with engine.begin() as conn:
+                    conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+                    conn.execute(text(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"'))
+            else:
+                cols = ', '.join(f'"{c}"' for c in columns)
+                # 删除与插入在同一事务内完成
+                with engine.begin() as conn:
+                    delete = class_.__table__.delete()
+                    if s is not None:
+                        expr = class_.__table__.c[self.get_date_field(level)]
+                        delete = delete.where(expr >= s).where(
+                            expr < e + pd.Timedelta(days=1))
+                    conn.execute(delete)
+                    conn.execute(text(f'INSERT INTO "{table_name}" ({cols}) '
+                                      f'SELECT {cols} FROM "{staging}"'))
+                self._drop_staging(level)
+        api.logger.notice(f"更新 {self.db_name} {table_name} {_period_key(*period)} {rows} 行")
+
+    def _drop_staging(self, level):
+        """删除项目暂存表"""
+        engine = get_engine(self.db_name, path_str=self.path_str)
+        with self._write_lock, engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{self._staging_name(level)}"'))
+
+    def _stream_period(self, api, level, period, deadline=None):
+        """逐页规范并写入暂存表，完成后替换项目表期间数据，返回(行数, 哈希值)
+
+        期间开始日期为空时替换全表。中途失败时项目表保持不变；
+        本次运行中重试时，已暂存的行不再写入。每页写入前检查时间预算。
+        数据与上次写入一致时，不替换项目表。
+        """
+        s, e = period
+        if s is None:
+            pages = api.iter_data(level)
+        else:
+            pages = api.iter_data(level, s, e, periods=[period])
+        staging = self._staging_name(level)
+        staged = self._staged_rows(level, period)
+        if staged:
+            api.logger.notice(f"{level} {_period_key(*period)} 已暂存 {staged} 行")
+        rows, hashes, columns = 0, [], []
+        for page in pages:
+            self._check_budget(level, deadline)
+            df = self._normalize(level, page)
+            if df.empty:
+                continue
+            hashes.append(_row_hashes(df))
+            columns = df.columns
+            # 跳过已暂存部分
+            new = df.iloc[max(0, staged - rows):]
+            rows += len(df)
+            if len(new):
+                if_exists = 'append' if rows > len(new) else 'replace'
+                self._to_sql(api, level, new, if_exists, staging)
+                with self._write_lock:
+                    set_period_record(self.api_class.__name__, level,
+                                      _staging_key(period), '暂存', rows, None,
+                                      self.journal_path)
+        hashes = np.concatenate(hashes) if hashes else []
+        hash_value = _combine_hash(columns, hashes)
+        if self._is_unchanged(level, period, hash_value):
+            api.logger.info(f"{level} {_period_key(*period)} 数据未变动")
+            self._drop_staging(level)
+        else:
+            self._swap(api, level, period, rows)
+        return rows, hash_value
+
+    def _loop_by_level(self, api, level, freq, deadline=None):
         if freq is None:
             # 一次执行，无需循环
-            df = api.get_data(level)
-            if not df.empty:
-                self._replace(api, level, df)
+            period = (None, None)
+            if self._is_committed(level, period):
+                return
+            self._check_budget(level, deadline)
+            if self.stream:
+                self._commit_period(
+                    level, period, *self._stream_period(api, level, period, deadline))
+                return
+            df = self._normalize(level, api.get_data(level))
+            hash_value = _content_hash(df)
+            if self._is_unchanged(level, period, hash_value):
+                api.logger.info(f"{level} 数据未变动")
+            elif not df.empty:
+                self._to_sql(api, level, df, 'replace')
+            self._commit_period(level, period, len(df), hash_value)
         else:
             start = self.get_start_date(level)
             default_date = self.get_default_start_date(level)
             default_date = pd.Timestamp(default_date)
             start_date = start if start > default_date else default_date
-            # 在开始之前，删除可能重复的数据
-            if start_date is not None:
-                self._delete(api, level, start_date)
-            # 按freq循环
-            ps = loop_period_by(start_date, self.end_date, freq, False)
+            # 按freq循环，逐期间删除可能重复的数据后添加，并记录日志
+            # 重试或再次刷新时，跳过已完成期间；数据未变动时，跳过写入
+            ps = self._plan_periods(level, start_date, self.end_date, freq)
             for s, e in ps:
-                df = api.get_data(level, s, e)
-                if not df.empty:
-                    self._add(api, level, df)
+                # 已完成期间均已记录，超时后再次执行时从此处继续
+                self._check_budget(level, deadline)
+                if self._is_committed(level, (s, e)):
+                    api.logger.info(f"{level} {_period_key(s, e)} 已经完成")
+                    continue
+                if self.stream:
+                    rows, hash_value = self._stream_period(api, level, (s, e), deadline)
+                    self._observe(level, (s, e), rows)
+                    self._commit_period(level, (s, e), rows, hash_value)
+                    continue
+                df = self._normalize(level, api.get_data(level, s, e, periods=[(s, e)]))
+                self._observe(level, (s, e), len(df))
+                hash_value = _content_hash(df)
+                if self._is_unchanged(level, (s, e), hash_value):
+                    api.logger.info(f"{level} {_period_key(s, e)} 数据未变动")
+                else:
+                    self._delete(api, level, s, e)
+                    if not df.empty:
+                        self._to_sql(api, level, df, 'append')
+                self._commit_period(level, (s, e), len(df), hash_value)
 
     def get_status_dict(self, level):
         index = f"{self.api_class.__name__}{level}"
-        return get_record(index)
+        return get_record(index, self.journal_path)
 
     def was_completed(self, level):
         """判定项目是否完成刷新"""
@@ -195,35 +479,99 @@ class Refresher(object):
         is_available = now - pd.Timestamp(d['完成时间']) < pd.Timedelta(hours=12)
         return d['完成状态'] == '完成' and is_available
 
-    def __call__(self):
-        with self.api_class(True) as api:
+    def get_priority(self, level):
+        """项目优先级，刷新周期越短越优先"""
+        return FREQ_PRIORITY[self.get_freq(level)]
+
+    def _refresh_level(self, api, level):
+        """刷新单个项目，返回是否完成"""
+        freq = self.get_freq(level)
+        index = f"{self.api_class.__name__}{level}"
+        status = self.get_status_dict(level)
+        deadline = time.time() + self.level_budget
+        for i in range(self.retry_times):
+            # 如果已经完成，则返回
+            if self.was_completed(level):
+                api.logger.notice(f'{level} 已经完成')
+                return True
+            if time.time() > deadline:
+                api.logger.warning(f'{level} 超出时间预算，移入失败队列')
+                return False
+            api.logger.info(f"{level:{12}} 第{i+1:{2}}次尝试")
+            try:
+                self._loop_by_level(api, level, freq, deadline)
+                status['完成状态'] = '完成'
+                status['备注'] = ''
+            except BudgetExceeded as e:
+                # 会话正常，已完成期间均已记录，无需重建
+                status['完成状态'] = '异常'
+                status['备注'] = f"{e}"
+                api.logger.warning(f'{e}，移入失败队列')
+                return False
+            except Exception as e:
+                status['完成状态'] = '异常'
+                status['备注'] = f"{e}"
+                time.sleep(np.random.random())
+                api.logger.error(e)
+                api.reset()
+            finally:
+                status['尝试次数'] = i+1
+                status['完成时间'] = pd.Timestamp('now')
+                with self._write_lock:
+                    update_record(index, status, self.journal_path)
+        return self.was_completed(level)
+
+    def _work(self, tasks, failed):
+        """工作线程：使用独立的浏览器或接口会话，依次领取项目"""
+        with self.make_api() as api:
             if not api.is_available:
-                sys.exit(1)            
-            for level in self.level_name.keys():
-                freq = self.get_freq(level)
-                index = f"{self.api_class.__name__}{level}"
-                status = self.get_status_dict(level)
-                for i in range(self.retry_times):
-                    # 如果已经完成，则返回
-                    if self.was_completed(level):
-                        api.logger.notice(f'{level} 已经完成')
-                        break
-                    api.logger.info(f"{level:{12}} 第{i+1:{2}}次尝试")
-                    try:
-                        self._loop_by_level(api, level, freq)
-                        status['完成状态'] = '完成'
-                        status['备注'] = ''
-                    except Exception as e:
-                        status['完成状态'] = '异常'
-                        status['备注'] = f"{e}"
-                        time.sleep(np.random.random())
-                        api.logger.error(e)
-                        api.reset()
-                    finally:
-                        status['尝试次数'] = i+1
-                        status['完成时间'] = pd.Timestamp('now')
-                        update_record(index, status)
-        self._report(self.level_name.keys())
+                api.logger.error(f'{api!r} 不可用')
+                return
+            self._available = True
+            while True:
+                try:
+                    _, _, level = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    done = self._refresh_level(api, level)
+                except Exception as e:
+                    api.logger.error(f'{level} {e!r}')
+                    done = False
+                if not done:
+                    failed.put(level)
+
+    def _schedule(self, levels):
+        """分配项目至各工作线程，返回未完成项目列表"""
+        tasks = queue.PriorityQueue()
+        for i, level in enumerate(levels):
+            tasks.put((self.get_priority(level), i, level))
+        failed = queue.Queue()
+        n = min(self.workers, len(levels))
+        threads = [threading.Thread(target=self._work, args=(tasks, failed))
+                   for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 保持原有顺序
+        failed = set(failed.queue)
+        return [level for level in levels if level in failed]
+
+    def __call__(self):
+        self._run_start = pd.Timestamp('now')
+        self._plans = {}
+        levels = list(self.level_name.keys())
+        try:
+            failed = self._schedule(levels)
+            if not self._available:
+                sys.exit(1)
+            # 失败队列最后重试
+            if failed:
+                failed = self._schedule(failed)
+        finally:
+            self.planner.save()
+        self._report(levels)
 
     def _report(self, levels):
         """报告执行状态"""
@@ -242,6 +590,7 @@ class DBRefresher(Refresher):
     level_model = DB_MODEL_MAPS
     level_name = DB_NAME
     api_class = DataBrowse
+    client_class = DataBrowseClient
 
 
 class TSRefresher(Refresher):
@@ -251,3 +600,4 @@ class TSRefresher(Refresher):
     level_model = TS_MODEL_MAPS
     level_name = TS_NAME
     api_class = ThematicStatistics
+    client_class = ThematicStatisticsClient
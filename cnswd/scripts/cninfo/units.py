@@ -11,6 +11,10 @@
 
 """
 import re
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
 import pandas as pd
 from .base import DB_DATE_FIELD, TS_DATE_FIELD
 
@@ -25,6 +29,8 @@ MID_PAT = re.compile(r"([)）]$|\b[（）()、：:-])")
 SUFFIX_PAT = re.compile(
     r'\s.*?[股元]|[(（)]单位[：:].*?[)）]|[(（)][万亿]?[股元][)）]|[(（ )]?[%‰][)）]?$')
 FIN_PAT = re.compile(r"(_{1,})$")
+DATE_FMT = r'%Y-%m-%d'
+CODE_COLS = ('证券代码', '股票代码', '上市代码', '转板代码', '基金代码')
 
 UNIT_MAPS = {
     '%': 0.01,
@@ -56,34 +62,92 @@ def parse_unit(col_name):
 
 def get_unit_dict(df):
     """解析数据框的单位词典"""
-    units = {}
-    for col_name in df.columns:
-        units.update(parse_unit(col_name))
-    return units
+    return dict(_unit_items(tuple(df.columns)))
 
 
-def _fix_code(df):
+@lru_cache(None)
+def _unit_items(columns):
+    units = {}
+    for col_name in columns:
+        units.update(parse_unit(col_name))
+    return tuple(units.items())
+
+
+def _zfill_codes(ints):
+    """整数补齐为6位字符
+
+    0 ~ 999999以数组运算逐位取数字，直接组成6位字符数组；其余以`str.zfill`补齐
+    """
+    ints = np.asarray(ints, dtype='int64')
+    res = np.empty(len(ints), dtype=object)
+    small = (ints >= 0) & (ints < 10 ** 6)
+    if small.any():
+        digits = ints[small, None] // 10 ** np.arange(5, -1, -1) % 10 + ord('0')
+        res[small] = digits.astype('<u4').view('<U6').ravel()
+    if not small.all():
+        res[~small] = pd.Series(ints[~small]).astype(str).str.zfill(6).values
+    return res
+
+
+def _fix_code_values(u):
+    """以向量化字符串操作修复代码值
+
+    字符串去除市场后缀，如 000001-SZE -> 000001；数字取整后补齐为6位字符；其余保持不变
+    """
+    res = u.astype(object)
+    if pd.api.types.is_object_dtype(u):
+        # 非字符串值结果为缺失值
+        stripped = u.str.replace(CODE_PAT, '', regex=True)
+        is_str = stripped.notna()
+        res = res.where(~is_str, stripped)
+    else:
+        is_str = pd.Series(False, index=u.index)
+    if is_str.all():
+        return res
+    nums = pd.to_numeric(u.where(~is_str), errors='coerce')
+    is_num = ~is_str & np.isfinite(nums) & (nums.abs() < 2.0 ** 63)
+    if is_num.any():
+        res[is_num] = _zfill_codes(np.trunc(nums[is_num]))
+    return res
+
+
+def _fix_code_series(s):
+    """修复代码列
+
+    同一代码在多期数据中重复出现，先对列值编码，只修复唯一值后再按编码展开。
+    """
+    codes, uniques = pd.factorize(s)
+    if len(uniques) == 0:
+        # 空列或全部缺失
+        return s.copy() if len(s) else s.astype(object)
+    fixed = _fix_code_values(pd.Series(uniques)).to_numpy(dtype=object)
+    res = fixed.take(codes)
+    # 缺失值保持原值
+    na_mask = codes == -1
+    if na_mask.any():
+        res[na_mask] = s.values[na_mask]
+    return pd.Series(res, index=s.index, name=s.name)
+
+
+def _fix_code(df, cols=None):
     """修复代码"""
-    cols = ['证券代码', '股票代码', '上市代码', '转板代码', '基金代码']
     # 股票行数数据 代码 000001-SZE
-
-    def f(x):
-        if isinstance(x, str):
-            return CODE_PAT.sub('', x)
-        try:
-            return str(int(x)).zfill(6)
-        except Exception:
-            return x
+    if cols is None:
+        cols = [c for c in CODE_COLS if c in df.columns]
     for c in cols:
-        if c in df.columns:
-            df[c] = df[c].map(f)
+        df[c] = _fix_code_series(df[c])
     return df
 
 
-def _fix_date(df):
+def _fix_date(df, cols=None):
     """修复日期"""
-    for col in df.columns:
-        if re.search(DATE_COL_PAT, col):
+    if cols is None:
+        cols = [col for col in df.columns if re.search(DATE_COL_PAT, col)]
+    for col in cols:
+        try:
+            # 网页日期多为"YYYY-MM-DD"格式，按固定格式解析最快
+            df[col] = pd.to_datetime(df[col], format=DATE_FMT)
+        except (ValueError, TypeError):
             df[col] = pd.to_datetime(
                 df[col], infer_datetime_format=True, errors='coerce')
     return df
@@ -251,9 +315,10 @@ def _special_fix(df, level, db_name):
     return df
 
 
-def _fix_num_unit(df):
+def _fix_num_unit(df, units=None):
     """修复列数量单位"""
-    units = get_unit_dict(df)
+    if units is None:
+        units = get_unit_dict(df)
     for col, unit in units.items():
         if not pd.api.types.is_numeric_dtype(df[col]):
             raise TypeError(f'应为数字类型。列"{col}"实际为"{df[col].dtype}"')
@@ -271,35 +336,59 @@ def _remove_suffix_unit(x):
     return SUFFIX_PAT.sub('', x)
 
 
+def _fixed_col_name(x):
+    """规范单个列名称"""
+    x = _remove_prefix_num(x)
+    x = _remove_suffix_unit(x)
+    x = MID_PAT.sub('_', x)
+    x = x.replace('Ａ', 'A')
+    x = x.replace('Ｂ', 'B')
+    x = x.replace('Ｈ', 'H')
+    x = FIN_PAT.sub('', x.strip())
+    return x
+
+
+def _fixed_col_names(columns):
+    """规范列名称列表"""
+    # 更名
+    if ("股票代码" in columns) and ("股票简称" in columns):
+        maps = {"股票代码": "证券代码", "股票简称": "证券简称"}
+        columns = [maps.get(c, c) for c in columns]
+    return [_fixed_col_name(c) for c in columns]
+
+
 def _fix_col_name(df):
     """修复列名称"""
-    # 更名
-    if ("股票代码" in df.columns) and ("股票简称" in df.columns):
-        df.rename(columns={"股票代码": "证券代码",
-                           "股票简称": "证券简称"},
-                  inplace=True)
-    origin = df.columns
-
-    def f(x):
-        x = _remove_prefix_num(x)
-        x = _remove_suffix_unit(x)
-        x = MID_PAT.sub('_', x)
-        x = x.replace('Ａ', 'A')
-        x = x.replace('Ｂ', 'B')
-        x = x.replace('Ｈ', 'H')
-        x = FIN_PAT.sub('', x.strip())
-        return x
-    df.columns = map(f, origin)
+    df.columns = _fixed_col_names(list(df.columns))
     return df
 
 
+@lru_cache(None)
+def _compile_plan(level, db_name, columns):
+    """编译项目修复方案
+
+    同一项目列结构固定，代码列、日期列、数量单位及列名称只需解析一次。
+    结果为缓存共享，均以不可变类型返回
+
+    Returns:
+        tuple -- (代码列, 日期列, 数量单位只读词典, 修复后列名称)
+    """
+    code_cols = tuple(c for c in CODE_COLS if c in columns)
+    date_cols = tuple(c for c in columns if re.search(DATE_COL_PAT, c))
+    units = MappingProxyType(dict(_unit_items(columns)))
+    names = tuple(_fixed_col_names(list(columns)))
+    return code_cols, date_cols, units, names
+
+
 def fixed_data(input_df, level, db_name):
     """修复日期、股票代码、数量单位及规范列名称"""
     # 避免原地修改
     df = input_df.copy()
     df = _special_fix(df, level, db_name)
-    df = _fix_code(df)
-    df = _fix_date(df)
-    df = _fix_num_unit(df)
-    df = _fix_col_name(df)
+    code_cols, date_cols, units, names = _compile_plan(
+        level, db_name, tuple(df.columns))
+    df = _fix_code(df, code_cols)
+    df = _fix_date(df, date_cols)
+    df = _fix_num_unit(df, units)
+    df.columns = names
     return df
@@ -24,7 +24,10 @@ from .infoes.news import append_historical_news, refresh_news
 from .szsh import cjmx
 from .szsh.index_daily import flush_index_daily
 from .szsh.init_stock_daily import init_stock_daily_data
+from .szsh.minute_bar import refresh_minute_bars
 from .szsh.quote import refresh_live_quote
+from .szsh.quote_poller import run_quote_poller
+from .szsh.retention import archive
 from .szsh.stock_daily import refresh_daily
 from .szsh.stock_info import refresh as refresh_szsh_stock_info
 from .szsh.tct_gn import refresh as tct_gn_refresh
@@ -35,6 +38,7 @@ from .cninfo.refresher import DBRefresher, TSRefresher
 from .cninfo.core import update_classify_bom, update_stock_classify, before_update_stock_classify
 
 from .utils import create_tables, remove_temp_files, kill_firefox
+from ..tick_store import TickStore
 
 
 logbook.set_datetime_format('local')
@@ -57,7 +61,7 @@ def stock():
 
 
 @stock.command()
-@click.option('--db_dir_name', type=click.Choice(['dataBrowse', 'info', 'szsh', 'thematicStatistics']), help='数据库目录名称')
+@click.option('--db_dir_name', type=click.Choice(['dataBrowse', 'info', 'szsh', 'thematicStatistics', 'record', 'backup']), help='数据库目录名称')
 @click.option('--rewrite/--no-rewrite', default=False, help='是否重写数据库')
 def create(db_dir_name, rewrite):
     """创建数据表"""
@@ -72,16 +76,28 @@ def create(db_dir_name, rewrite):
 # region 深证信
 
 @stock.command()
-def db_data():
+@click.option('--backend', type=click.Choice(['selenium', 'json']),
+              default='selenium', help='数据读取方式：网页或接口')
+@click.option('--tabs', default=1, help='网页方式并发标签页数量')
+@click.option('--workers', default=1, help='并发工作线程数量')
+@click.option('--stream/--no-stream', default=False, help='是否逐页写入数据')
+def db_data(backend, tabs, workers, stream):
     """刷新专题统计"""
-    r = DBRefresher()
+    r = DBRefresher(backend=backend, tabs=tabs, workers=workers,
+                    stream=stream)
     r()
 
 
 @stock.command()
-def ts_data():
+@click.option('--backend', type=click.Choice(['selenium', 'json']),
+              default='selenium', help='数据读取方式：网页或接口')
+@click.option('--tabs', default=1, help='网页方式并发标签页数量')
+@click.option('--workers', default=1, help='并发工作线程数量')
+@click.option('--stream/--no-stream', default=False, help='是否逐页写入数据')
+def ts_data(backend, tabs, workers, stream):
     """刷新数据搜索"""
-    r = TSRefresher()
+    r = TSRefresher(backend=backend, tabs=tabs, workers=workers,
+                    stream=stream)
     r()
 
 
@@ -152,7 +168,10 @@ def szsh_stock_daily_init():
 
 @stock.command()
 @click.option('--date', default=None, help='刷新日期')
-def szsh_cjmx(date):
+@click.option('--concurrency', default=8, help='最多并发下载数量')
+@click.option('--rate', default=10.0, help='每秒最多请求次数')
+@click.option('--bars/--no-bars', default=True, help='是否随后汇总分钟线')
+def szsh_cjmx(date, concurrency, rate, bars):
     """刷新指定日期的股票成交明细"""
     if date is None:
         today = pd.Timestamp('today')
@@ -162,7 +181,17 @@ def szsh_cjmx(date):
             input_date = today
     else:
         input_date = date
-    cjmx.wy_refresh_cjmx(input_date)
+    cjmx.wy_refresh_cjmx(input_date, concurrency, rate)
+    if bars:
+        refresh_minute_bars(input_date)
+
+
+@stock.command()
+@click.option('--start', default=None, help='只汇总该日期之后的成交明细，默认自已有分钟线的最后日期起')
+def szsh_minute_bar(start):
+    """由成交明细增量汇总分钟线"""
+    rows = refresh_minute_bars(start)
+    click.echo(f'写入{rows}行')
 
 
 # @stock.command()
@@ -171,12 +200,39 @@ def szsh_cjmx(date):
 #     init_cjmx()
 
 
+@stock.command()
+@click.option('--path', default=None, help='旧版pickle文件目录')
+def szsh_cjmx_import(path):
+    """导入旧版成交明细pickle文件至存储"""
+    rows = TickStore().import_pickles(path)
+    click.echo(f'导入{rows}行')
+
+
 @stock.command()
 def szsh_quote():
     """股票实时报价"""
     refresh_live_quote()
 
 
+@stock.command()
+@click.option('--interval', default=10.0, help='轮询间隔(秒)')
+@click.option('--port', default=None, type=int, help='最新报价查询服务端口，不指定时不提供服务')
+@click.option('--analytics/--no-analytics', default=True, help='是否计算盘中指标')
+def szsh_quote_daemon(interval, port, analytics):
+    """常驻轮询股票实时报价，只写入变化的行，交易时段结束后退出"""
+    run_quote_poller(interval, port, analytics)
+
+
+@stock.command()
+@click.option('--keep-days', default=30, help='保留交易日数量')
+@click.option('--batch-size', default=200000, help='每批序号区间大小')
+@click.option('--vacuum/--no-vacuum', default=True, help='完成后是否回收空间')
+def szsh_archive(keep_days, batch_size, vacuum):
+    """将早期实时报价、成交明细移至备份数据库"""
+    res = archive(keep_days, batch_size, vacuum)
+    click.echo(f'移动行数：{res}')
+
+
 @stock.command()
 def szsh_treasury():
     """刷新国库券利率数据"""
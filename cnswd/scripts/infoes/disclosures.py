@@ -22,6 +22,7 @@ from sqlalchemy import func
 
 from cnswd.sql.base import get_engine, get_session
 from cnswd.sql.info import Disclosure
+from cnswd.websource.replay import async_request
 
 logger = logbook.Logger('公司公告')
 
@@ -119,14 +120,14 @@ async def _fetch_disclosure_async(session, plate, category, date_str, page):
         pageSize=30,
     )
     # 如果太频繁访问，容易导致关闭连接
-    async with session.post(URL, data=kwargs, headers=HEADERS) as r:
-        msg = f"{market} {date_str} 第{page}页 响应状态：{r.status}"
-        logger.info(msg)
-        await asyncio.sleep(1)
-        try:
-            return await r.json()
-        except ContentTypeError:
-            return {}
+    r = await async_request(session, 'POST', URL, data=kwargs, headers=HEADERS)
+    msg = f"{market} {date_str} 第{page}页 响应状态：{r.status}"
+    logger.info(msg)
+    await asyncio.sleep(1)
+    try:
+        return await r.json()
+    except (ContentTypeError, ValueError):
+        return {}
 
 
 async def _fetch_one_day(session, plate, date_str):
@@ -4,30 +4,25 @@
 
 只支持近期数据刷新
 """
-import os
 import time
-from functools import partial
-from urllib.error import URLError
 
 import logbook
 import pandas as pd
 from numpy import random
-from sqlalchemy import func
 
-from cnswd.sql.base import get_engine, get_session, session_scope
-from cnswd.sql.szsh import CJMX, StockDaily
-from cnswd.utils import data_root, loop_codes
+from cnswd.tick_store import TickStore
+from cnswd.utils import normalize_ticks
 from cnswd.websource._selenium import make_headless_browser
-from cnswd.websource.exceptions import NoWebData
-from cnswd.websource.wy import fetch_cjmx as wy_fetch_cjmx
 
 from .base import get_ipo_date, get_valid_codes, need_refresh
+from .cjmx_pipeline import CONCURRENCY, RATE, refresh_cjmx
 
 logger = logbook.Logger('股票成交明细')
 DATE_FMT = r'%Y-%m-%d'
 db_dir_name = 'szsh'
 BACK_DAYS = 20
 SINA_WAIT = 6 * 60  # 6分钟
+STORE_BATCH = 50  # 每批写入存储的股票日数量
 
 
 class NoopException(Exception):
@@ -53,11 +48,8 @@ def _fix_data(df, code, date_str):
     if '涨跌幅' in df:
         del df['涨跌幅']
     df.columns = ['成交时间', '成交价', '价格变动', '成交量', '成交额', '性质']
-    df.成交时间 = df.成交时间.map(lambda x: pd.Timestamp('{} {}'.format(date_str, x)))
     df['股票代码'] = code
-    df['成交量'] = df['成交量'] * 100
-    df = df.sort_values('成交时间')
-    return df
+    return normalize_ticks(df, date_str, volume_scale=100)
 
 
 def _fetch_one_page(driver, url):
@@ -110,29 +102,30 @@ def fetch_cjmx(driver, code, date_str):
     return df
 
 
-def data_path(code, date_str):
-    name = pd.Timestamp(date_str).strftime(r'%Y%m%d')
-    data_dir = os.path.join(data_root('cjmx'), code)
-    if not os.path.exists(data_dir):
-        os.mkdir(data_dir)
-    return os.path.join(data_dir, f'{name}.pkl')
-
-
-def download_to_local(driver, code, date_str, path, t):
+def _download(driver, code, date_str):
+    """下载成交明细，不成功时返回None"""
     try:
-        df = fetch_cjmx(driver, code, date_str)
-        df.to_pickle(path)
+        return fetch_cjmx(driver, code, date_str)
     except NoopException:
         logger.info(f'下载股票：{code} {date_str} 分时数据不成功，跳过')
+        return None
+
+
+def _flush(store, dfs):
+    """批量写入存储"""
+    if dfs:
+        store.append(pd.concat(dfs, ignore_index=True))
+        dfs.clear()
 
 
-def init_cjmx():
+def init_cjmx(store=None):
     """初始化股票成交明细"""
-    t = 6*60
+    store = store or TickStore()
     # 限定在2018年以后
     begin = 2018
     codes = get_valid_codes(False)
     driver = make_headless_browser()
+    dfs, dates = [], set()
     for i, code in enumerate(codes):
         if (i+1) % 5 == 0:
             time.sleep(1)
@@ -140,120 +133,50 @@ def init_cjmx():
         # 跳过没有开始日期的股票
         if start is None:
             continue
+        done = {d for _, d in store.stored(code)}
         date_rng = pd.date_range(
             start, pd.Timestamp('today')-pd.Timedelta(days=1), freq='B')
         for d in date_rng:
-            if d.year >= begin:
-                date_str = pd.Timestamp(d).strftime(DATE_FMT)
-                path = data_path(code, date_str)
-                if not os.path.exists(path):
-                    download_to_local(driver, code, date_str, path, t)
+            if d.year >= begin and d not in done:
+                df = _download(driver, code, d.strftime(DATE_FMT))
+                if df is not None:
+                    dfs.append(df)
+                    dates.add(d)
+                if len(dfs) >= STORE_BATCH:
+                    _flush(store, dfs)
+    _flush(store, dfs)
     driver.quit()
+    # 按股票分批写入后，每个日期合并为一个文件
+    for d in sorted(dates):
+        store.compact(d)
 
 
-def sina_refresh_cjmx(date):
+def sina_refresh_cjmx(date, store=None):
     """新浪刷新股票成交明细"""
+    store = store or TickStore()
     codes = get_valid_codes(True)
     driver = make_headless_browser()
     date_str = pd.Timestamp(date).strftime(DATE_FMT)
+    done = {c for c, _ in store.stored(start=date_str, end=date_str)}
+    dfs = []
     for i, code in enumerate(codes):
         if (i+1) % 5 == 0:
             time.sleep(1)
-        path = data_path(code, date_str)
-        if not os.path.exists(path):
-            download_to_local(driver, code, date_str, path, SINA_WAIT)
+        if code in done:
+            continue
+        df = _download(driver, code, date_str)
+        if df is not None:
+            dfs.append(df)
+        if len(dfs) >= STORE_BATCH:
+            _flush(store, dfs)
+    _flush(store, dfs)
     driver.quit()
+    store.compact(date_str)
 
 
-def has_traded(code, date):
-    """查询股票当天是否交易"""
-    with session_scope(db_dir_name) as session:
-        q = session.query(StockDaily).filter(
-            StockDaily.股票代码 == code,
-            func.date(StockDaily.日期) == date,
-            StockDaily.成交量 > 1,
-        )
-        return session.query(q.exists()).scalar()
-
-
-def has_cjmx(code, date):
-    """查询是否已经存在分时数据"""
-    with session_scope(db_dir_name) as session:
-        q = session.query(CJMX).filter(
-            CJMX.股票代码 == code,
-            func.date(CJMX.成交时间) == date
-        )
-        return session.query(q.exists()).scalar()
-
-
-def _wy_fix_data(df):
-    dts = df.日期.dt.strftime(r'%Y-%m-%d') + ' ' + df.时间
-    df['成交时间'] = pd.to_datetime(dts)
-    del df['时间']
-    del df['日期']
-    df = df.rename(columns={'价格': '成交价',
-                            '涨跌额': '价格变动', '方向': '性质'})
-    return df
-
-
-def wy_to_db(codes, date):
-    engine = get_engine(db_dir_name)
-    status = {}
-    for i in range(10):
-        for code in codes:
-            ok = status.get(code)
-            if ok:
-                if i == 0:
-                    logger.info(f'股票：{code} 已经刷新，跳过')
-                continue
-            if has_traded(code, date) and not has_cjmx(code, date):
-                date_str = date.strftime(DATE_FMT)
-                try:
-                    df = wy_fetch_cjmx(code, date_str)
-                    status[code] = True
-                except Exception as e:
-                    logger.info(f'股票：{code} {date_str} {e!r}')
-                    status[code] = False
-                    continue                
-                df = _wy_fix_data(df)
-                # 保留2位小数
-                df['价格变动'] = (df['价格变动'] * 100).astype('int') / 100.0
-                df['成交额'] = (df['成交额'] * 100).astype('int') / 100.0
-                df.to_sql(CJMX.__tablename__, engine, if_exists='append', index=False)
-                logger.info(f'股票：{code} {date_str} 共{len(df):>3}行')
-                time.sleep(0.3)
-            else:
-                status[code] = True
-              
-
-# def wy_refresh_cjmx(date_str):
-#     """刷新指定日期成交明细数据"""
-#     if not need_refresh(date_str):
-#         return
-#     codes = get_valid_codes(True)
-#     date = pd.Timestamp(date_str).date()
-#     p_func = partial(wy_to_db, date=date)
-#     # 缩小批量，防止数据库死锁
-#     p_codes = loop_codes(codes, 80)
-#     kws = {'exs': (URLError, TimeoutError)}
-#     # 当一次性map时，经常会出现长时间堵塞，尝试分批执行
-#     for i, b_codes in enumerate(p_codes):
-#         logger.notice(f"第{i+1}批，共{len(b_codes)}代码")
-#         runner = TryToCompleted(p_func, b_codes, kws, retry_times=10, sleep=3)
-#         runner.run()
-#         time.sleep(10)
-#         del runner
-
-
-def wy_refresh_cjmx(date_str):
+def wy_refresh_cjmx(date_str, concurrency=CONCURRENCY, rate=RATE):
     """刷新指定日期成交明细数据"""
     if not need_refresh(date_str):
         return
     codes = get_valid_codes(True)
-    date = pd.Timestamp(date_str).date()
-    for i, code in enumerate(codes):
-        # logger.notice(f"第{i+1}批，共{len(b_codes)}代码")
-        b_codes = [code]
-        wy_to_db(b_codes, date)
-        if i % 20 == 0:
-            time.sleep(1)
\ No newline at end of file
+    refresh_cjmx([date_str], codes, concurrency, rate)
@@ -0,0 +1,206 @@
+"""
+成交明细并发刷新流水线
+
+网易成交明细按(股票代码, 日期)逐项下载。流水线分为四个阶段：
+    1. 待办集合：逐日查询已交易而尚无成交明细的(代码, 日期)
+    2. 下载：aiohttp并发下载，信号量限制并发数量，并限制对网站的访问频率
+    3. 解析：在进程池中解析`.xls`内容
+    4. 写入：单一写入者按批写入数据库，每批一个事务
+
+中断后重新运行，已写入的项目由第1阶段自动排除。
+"""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+import logbook
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import CJMX, StockDaily
+from cnswd.utils import normalize_ticks
+from cnswd.websource.replay import async_request
+from cnswd.websource.wy import _cjmx_url, parse_cjmx
+
+logger = logbook.Logger('股票成交明细')
+db_dir_name = 'szsh'
+DATE_FMT = r'%Y-%m-%d'
+CONCURRENCY = 8        # 最多并发下载数量
+RATE = 10              # 每秒最多请求次数
+BATCH_ROWS = 200000    # 每批写入行数
+MAX_TRY = 3            # 下载失败项目最多尝试次数
+
+
+def pending_pairs(session, dates, codes=None):
+    """已交易而尚无成交明细的(股票代码, 日期)集合
+
+    逐日查询当日已交易的股票，以`EXISTS`子查询检查是否已有成交明细，
+    找到首行即停止，无需对成交明细逐行计算`func.date`或去重
+    """
+    codes = None if codes is None else set(codes)
+    res = set()
+    for d in sorted({pd.Timestamp(d).normalize() for d in dates}):
+        start = d.to_pydatetime()
+        end = (d + pd.Timedelta(days=1)).to_pydatetime()
+        has_ticks = session.query(CJMX.序号).filter(
+            CJMX.股票代码 == StockDaily.股票代码,
+            CJMX.成交时间 >= start,
+            CJMX.成交时间 < end,
+        ).exists()
+        q = session.query(StockDaily.股票代码).filter(
+            StockDaily.日期 >= start,
+            StockDaily.日期 < end,
+            StockDaily.成交量 > 1,
+            ~has_ticks,
+        )
+        res.update((code, d) for code, in q.all() if codes is None or code in codes)
+    return res
+
+
+def _wy_fix_data(df):
+    """整理网易成交明细，价格变动及成交额保留2位小数(截断)"""
+    date = df['日期'].iat[0] if len(df) else None
+    del df['日期']
+    df.rename(columns={'价格': '成交价', '涨跌额': '价格变动', '方向': '性质'},
+              inplace=True)
+    return normalize_ticks(df, date, time_col='时间', truncate=('价格变动', '成交额'))
+
+
+def _parse(content, code, date_str):
+    """解析并整理单项成交明细，在进程池中运行"""
+    return _wy_fix_data(parse_cjmx(content, code, date_str))
+
+
+def _write(engine, dfs):
+    """一个事务内批量写入"""
+    df = pd.concat(dfs, ignore_index=True)
+    with engine.begin() as conn:
+        df.to_sql(CJMX.__tablename__, conn, if_exists='append', index=False)
+    return len(df)
+
+
+class RateLimiter(object):
+    """访问频率限制：相邻两次请求至少间隔`1/rate`秒"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+async def _download(session, sem, limiter, code, date_str):
+    """下载单项内容，网页不存在时返回None"""
+    url = _cjmx_url(code, date_str)
+    async with sem:
+        await limiter.wait()
+        r = await async_request(session, 'GET', url)
+    if r.status == 404:
+        return None
+    if r.status != 200:
+        raise ConnectionError(f'响应状态：{r.status}')
+    return await r.read()
+
+
+async def _run(pairs, engine, concurrency, rate, processes):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    sem = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    stats = {'项目': len(pairs), '行数': 0, '无数据': 0, '失败': 0}
+
+    async def writer():
+        buf, rows = [], 0
+        while True:
+            df = await queue.get()
+            if df is not None:
+                buf.append(df)
+                rows += len(df)
+            if buf and (df is None or rows >= BATCH_ROWS):
+                n = await loop.run_in_executor(None, _write, engine, buf)
+                stats['行数'] += n
+                logger.info(f'写入{len(buf)}项 共{n}行')
+                buf, rows = [], 0
+            if df is None:
+                return
+
+    async def put(df):
+        # 写入者异常退出时，不再等待队列空位
+        task = asyncio.ensure_future(queue.put(df))
+        await asyncio.wait([task, writing], return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            writing.result()
+
+    async def one(session, pool, code, date, failed):
+        date_str = date.strftime(DATE_FMT)
+        try:
+            content = await _download(session, sem, limiter, code, date_str)
+            if content is None:
+                stats['无数据'] += 1
+                return
+            df = await loop.run_in_executor(pool, _parse, content, code, date_str)
+        except Exception as e:
+            logger.info(f'股票：{code} {date_str} {e!r}')
+            failed.append((code, date))
+            return
+        await put(df)
+
+    writing = asyncio.ensure_future(writer())
+    todo = sorted(pairs)
+    with ProcessPoolExecutor(processes) as pool:
+        async with aiohttp.ClientSession() as session:
+            for i in range(MAX_TRY):
+                failed = []
+                await asyncio.gather(
+                    *[one(session, pool, c, d, failed) for c, d in todo])
+                todo = failed
+                if not todo:
+                    break
+                logger.notice(f'第{i+1}轮 {len(todo)}项失败，稍后重试')
+                await asyncio.sleep(2 ** i)
+    await put(None)
+    await writing
+    stats['失败'] = len(todo)
+    return stats
+
+
+def refresh_cjmx(dates, codes=None, concurrency=CONCURRENCY, rate=RATE,
+                 processes=None, engine=None):
+    """并发刷新成交明细
+
+    Arguments:
+        dates {list} -- 日期列表
+
+    Keyword Arguments:
+        codes {list} -- 限定股票代码，为None时不限定 (default: {None})
+        concurrency {int} -- 最多并发下载数量 (default: {CONCURRENCY})
+        rate {float} -- 每秒最多请求次数 (default: {RATE})
+        processes {int} -- 解析进程数量，为None时使用CPU数量 (default: {None})
+        engine {Engine} -- 数据库引擎 (default: {`szsh`数据库})
+
+    Returns:
+        dict -- 项目数、写入行数、无数据及最终失败项目数
+    """
+    engine = engine or get_engine(db_dir_name)
+    CJMX.__table__.create(engine, checkfirst=True)
+    start = time.time()
+    session = Session(bind=engine)
+    try:
+        pairs = pending_pairs(session, dates, codes)
+    finally:
+        session.close()
+    logger.notice(f'待下载 {len(pairs)}项')
+    if not pairs:
+        return {'项目': 0, '行数': 0, '无数据': 0, '失败': 0}
+    stats = asyncio.run(_run(pairs, engine, concurrency, rate, processes))
+    logger.notice(f'{stats} 用时{time.time() - start:.1f}秒')
+    return stats
@@ -0,0 +1,162 @@
+"""
+盘中报价指标
+
+随实时报价轮询增量计算，每次只处理本次变化的股票：
+    区间成交量、区间成交额  累计值与该股票上次报价之差，当日首次报价为累计值
+    均价                    当日成交额 / 成交量(成交量加权平均价)
+    中间价、价差            买1价与卖1价，任一为0(涨跌停或无报价)时为空
+    失衡                    五档买卖量失衡 (买量 - 卖量) / (买量 + 卖量)
+
+各股票上次累计值以数组保存，股票代码以`pd.Index`定位行号。
+时间不晚于上次报价的行视为重复，不输出也不更新状态。
+`stage`只计算指标，返回的待定状态在指标写入成功后以`commit`保存；`update`为二者合并。
+重新启动时以`seed`载入各股票当日最后报价的累计值，避免以累计值作为首个区间值。
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import IntradayStat
+
+db_dir_name = 'szsh'
+STAT_COLS = ['股票代码', '时间', '区间成交量', '区间成交额', '均价', '中间价', '价差', '失衡']
+BID_VOLUME_COLS = [f'买{i}量' for i in range(1, 6)]
+ASK_VOLUME_COLS = [f'卖{i}量' for i in range(1, 6)]
+
+
+class IntradayAnalytics(object):
+    """盘中报价指标增量计算"""
+
+    def __init__(self):
+        self._index = pd.Index([], dtype=object)
+        self.volume = np.empty(0, dtype='float64')  # 上次累计成交量
+        self.amount = np.empty(0, dtype='float64')  # 上次累计成交额
+        self.times = np.empty(0, dtype='datetime64[ns]')  # 上次报价时间
+
+    def __len__(self):
+        return len(self._index)
+
+    def _grow(self, codes):
+        """为新增股票分配行"""
+        n = len(codes)
+        self._index = self._index.append(pd.Index(codes, dtype=object))
+        self.volume = np.concatenate([self.volume, np.zeros(n)])
+        self.amount = np.concatenate([self.amount, np.zeros(n)])
+        nat = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.times = np.concatenate([self.times, nat])
+
+    def seed(self, df):
+        """载入各股票上次报价的累计值，不输出指标
+
+        Arguments:
+            df {pd.DataFrame} -- 含股票代码、时间、成交量、成交额列
+        """
+        if df.empty:
+            return
+        df = df.sort_values('时间').drop_duplicates('股票代码', keep='last')
+        codes = df['股票代码'].to_numpy(dtype=object)
+        pos = self._index.get_indexer(codes)
+        if (pos < 0).any():
+            self._grow(codes[pos < 0])
+            pos = self._index.get_indexer(codes)
+        self.commit((pos, df['成交量'].to_numpy(dtype='float64'),
+                     df['成交额'].to_numpy(dtype='float64'),
+                     df['时间'].to_numpy(dtype='datetime64[ns]')))
+
+    def update(self, df):
+        """以本次变化的报价更新状态，返回指标
+
+        Arguments:
+            df {pd.DataFrame} -- 实时报价，`时间`为日期时间类型
+
+        Returns:
+            pd.DataFrame -- 列见`STAT_COLS`
+        """
+        res, pending = self.stage(df)
+        self.commit(pending)
+        return res
+
+    def commit(self, pending):
+        """保存`stage`返回的待定状态"""
+        if pending is None:
+            return
+        pos, volume, amount, times = pending
+        self.volume[pos], self.amount[pos], self.times[pos] = volume, amount, times
+
+    def stage(self, df):
+        """计算本次变化的报价指标，不更新状态
+
+        Arguments:
+            df {pd.DataFrame} -- 实时报价，`时间`为日期时间类型
+
+        Returns:
+            tuple -- (指标, 待定状态)，指标列见`STAT_COLS`
+        """
+        if df.empty:
+            return pd.DataFrame(columns=STAT_COLS), None
+        df = df.drop_duplicates('股票代码', keep='last')
+        codes = df['股票代码'].to_numpy(dtype=object)
+        pos = self._index.get_indexer(codes)
+        if (pos < 0).any():
+            self._grow(codes[pos < 0])
+            pos = self._index.get_indexer(codes)
+        times = df['时间'].to_numpy(dtype='datetime64[ns]')
+        old = self.times[pos]
+        fresh = np.isnat(old) | (times > old)
+        df, pos, times, old = df[fresh], pos[fresh], times[fresh], old[fresh]
+
+        volume = df['成交量'].to_numpy(dtype='float64')
+        amount = df['成交额'].to_numpy(dtype='float64')
+        # 跨日或累计值减少(数据源重置)时，以累计值作为区间值
+        same_day = times.astype('datetime64[D]') == old.astype('datetime64[D]')
+        d_volume = volume - np.where(same_day, self.volume[pos], 0)
+        d_amount = amount - np.where(same_day, self.amount[pos], 0)
+        reset = d_volume < 0
+        d_volume[reset] = volume[reset]
+        d_amount[reset] = amount[reset]
+
+        bid, ask = df['买1价'].to_numpy(dtype='float64'), df['卖1价'].to_numpy(dtype='float64')
+        quoted = (bid > 0) & (ask > 0)
+        bids = df[BID_VOLUME_COLS].to_numpy(dtype='float64').sum(axis=1)
+        asks = df[ASK_VOLUME_COLS].to_numpy(dtype='float64').sum(axis=1)
+        total = bids + asks
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res = pd.DataFrame({
+                '股票代码': codes[fresh],
+                '时间': times,
+                '区间成交量': np.nan_to_num(d_volume).astype('int64'),
+                '区间成交额': d_amount,
+                '均价': np.where(volume > 0, amount / volume, np.nan),
+                '中间价': np.where(quoted, (bid + ask) / 2, np.nan),
+                '价差': np.where(quoted, ask - bid, np.nan),
+                '失衡': np.where(total > 0, (bids - asks) / total, np.nan),
+            })
+        return res, (pos, volume, amount, times)
+
+
+def read_intraday_stats(codes=None, start=None, end=None, engine=None):
+    """读取盘中报价指标
+
+    Keyword Arguments:
+        codes {list} -- 股票代码，为None时不限定 (default: {None})
+        start {datelike} -- 开始时间 (default: {None})
+        end {datelike} -- 结束时间(含) (default: {None})
+
+    Returns:
+        pd.DataFrame -- 按股票代码、时间排序的指标
+    """
+    engine = engine or get_engine(db_dir_name)
+    session = Session(bind=engine)
+    try:
+        q = session.query(*[getattr(IntradayStat, c) for c in STAT_COLS])
+        if codes is not None:
+            q = q.filter(IntradayStat.股票代码.in_(codes))
+        if start is not None:
+            q = q.filter(IntradayStat.时间 >= pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            q = q.filter(IntradayStat.时间 <= pd.Timestamp(end).to_pydatetime())
+        q = q.order_by(IntradayStat.股票代码, IntradayStat.时间)
+        return pd.DataFrame(q.all(), columns=STAT_COLS)
+    finally:
+        session.close()
@@ -0,0 +1,257 @@
+"""
+分钟线
+
+由成交明细汇总1、5、15、30、60分钟线(开高低收、成交量、成交额、买卖盘成交量)。
+
+时间规则(左闭右开，以结束时间标记)：
+    [09:30:00, 09:31:00)的成交记为09:31分钟线，依此类推
+    上午 09:31 ~ 11:30，下午 13:01 ~ 15:00，每日240个交易分钟
+    集合竞价(09:25)并入首根分钟线，11:30、15:00及之后的成交并入当时段末根分钟线
+
+先以1分钟线汇总成交明细，再由1分钟线汇总其余周期，全部以数组`reduceat`计算。
+刷新为增量方式：只处理有成交明细而尚无分钟线的(股票代码, 日期)，默认自已有分钟线的最后日期起检查。
+成交明细来自数据库`CJMX`表及成交明细存储(`TickStore`)，同一(股票代码, 日期)优先使用存储。
+"""
+import logbook
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import CJMX, MinuteBar
+from cnswd.tick_store import TickStore
+from cnswd.utils import loop_codes
+
+logger = logbook.Logger('分钟线')
+
+db_dir_name = 'szsh'
+FREQS = (1, 5, 15, 30, 60)
+BAR_COLS = ['股票代码', '周期', '时间', '开盘', '最高', '最低', '收盘',
+            '成交量', '成交额', '买盘成交量', '卖盘成交量', '成交笔数']
+CODE_BATCH = 500  # 每次查询股票数量
+TICK_COLS = ['股票代码', '成交时间', '成交价', '成交量', '成交额', '性质']
+
+# 交易分钟(结束时间，自零时起分钟数)
+_AM_FIRST, _AM_LAST = 9 * 60 + 31, 11 * 60 + 30
+_PM_FIRST, _PM_LAST = 13 * 60 + 1, 15 * 60
+_AM_MINUTES = _AM_LAST - _AM_FIRST + 1
+
+
+def _minute_index(seconds):
+    """自零时起秒数转换为交易分钟序号(0 ~ 239)"""
+    minute = seconds // 60 + 1
+    am = minute <= (_AM_LAST + _PM_FIRST) // 2
+    idx = np.where(am,
+                   np.clip(minute, _AM_FIRST, _AM_LAST) - _AM_FIRST,
+                   np.clip(minute, _PM_FIRST, _PM_LAST) - _PM_FIRST + _AM_MINUTES)
+    return idx
+
+
+def _index_to_minute(idx):
+    """交易分钟序号转换为自零时起分钟数"""
+    return np.where(idx < _AM_MINUTES, idx + _AM_FIRST, idx - _AM_MINUTES + _PM_FIRST)
+
+
+def _reduce(codes, days, idx, open_, high, low, close, volume, amount, buy, sell, count):
+    """按(股票代码, 日期, 分钟序号)汇总已排序数组"""
+    key_change = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1]) | (idx[1:] != idx[:-1])
+    starts = np.concatenate([[0], np.flatnonzero(key_change) + 1])
+    ends = np.concatenate([starts[1:], [len(codes)]]) - 1
+    return {
+        '股票代码': codes[starts],
+        '日期': days[starts],
+        '序号': idx[starts],
+        '开盘': open_[starts],
+        '最高': np.maximum.reduceat(high, starts),
+        '最低': np.minimum.reduceat(low, starts),
+        '收盘': close[ends],
+        '成交量': np.add.reduceat(volume, starts),
+        '成交额': np.add.reduceat(amount, starts),
+        '买盘成交量': np.add.reduceat(buy, starts),
+        '卖盘成交量': np.add.reduceat(sell, starts),
+        '成交笔数': np.add.reduceat(count, starts),
+    }
+
+
+def _to_frame(bars, freq, code_names):
+    # 以各区间末个交易分钟为结束时间
+    last = bars['序号'] // freq * freq + freq - 1
+    minutes = _index_to_minute(last).astype('timedelta64[m]')
+    df = pd.DataFrame({k: v for k, v in bars.items() if k not in ('日期', '序号')})
+    df['股票代码'] = code_names.take(bars['股票代码'])
+    df.insert(1, '周期', freq)
+    df.insert(2, '时间', bars['日期'] + minutes)
+    return df[BAR_COLS]
+
+
+def aggregate(ticks, freqs=FREQS):
+    """成交明细汇总为分钟线
+
+    Arguments:
+        ticks {pd.DataFrame} -- 成交明细，含股票代码、成交时间、成交价、成交量、成交额、性质
+
+    Keyword Arguments:
+        freqs {tuple} -- 周期(分钟)，须能整除120 (default: {FREQS})
+
+    Returns:
+        pd.DataFrame -- 分钟线，列见`BAR_COLS`
+    """
+    assert all(120 % f == 0 for f in freqs), '周期须能整除120'
+    if ticks.empty:
+        return pd.DataFrame(columns=BAR_COLS)
+    # 分钟序号随时间单调，按股票代码、成交时间排序后即可分段汇总
+    ticks = ticks.dropna(subset=['成交价']).sort_values(
+        ['股票代码', '成交时间'], kind='mergesort')
+    times = ticks['成交时间'].values
+    days = times.astype('datetime64[D]')
+    seconds = (times - days).astype('timedelta64[s]').astype('int64')
+    idx = _minute_index(seconds)
+    # 以整数编码比较，避免逐项处理字符串
+    codes, code_names = pd.factorize(ticks['股票代码'])
+    price = ticks['成交价'].to_numpy(dtype='float64')
+    volume = ticks['成交量'].fillna(0).to_numpy(dtype='int64')
+    amount = ticks['成交额'].to_numpy(dtype='float64')
+    sides, side_names = pd.factorize(ticks['性质'])
+    # 末项对应缺失值(编码为-1)
+    side_names = [str(x)[:1] for x in side_names] + ['']
+    buy = np.where(np.array([x == '买' for x in side_names])[sides], volume, 0)
+    sell = np.where(np.array([x == '卖' for x in side_names])[sides], volume, 0)
+    count = np.ones(len(codes), dtype='int64')
+    bars = _reduce(codes, days, idx, price, price, price, price,
+                   volume, amount, buy, sell, count)
+    dfs = []
+    for freq in sorted(freqs):
+        if freq == 1:
+            res = bars
+        else:
+            res = _reduce(bars['股票代码'], bars['日期'], bars['序号'] // freq,
+                          bars['开盘'], bars['最高'], bars['最低'], bars['收盘'],
+                          bars['成交量'], bars['成交额'], bars['买盘成交量'],
+                          bars['卖盘成交量'], bars['成交笔数'])
+            res['序号'] = res['序号'] * freq
+        dfs.append(_to_frame(res, freq, code_names))
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _last_bar_date(session):
+    """已有分钟线的最后日期，以`时间`索引取最大值"""
+    last = session.query(func.max(MinuteBar.时间)).scalar()
+    return None if last is None else pd.Timestamp(last).normalize()
+
+
+def pending_pairs(session, start=None, store=None):
+    """有成交明细(数据库或成交明细存储)而尚无分钟线的(股票代码, 日期)集合
+
+    `start`为None时自已有分钟线的最后日期起检查(该日可能只汇总了部分股票)，
+    查询范围只随新增日期增长。各日期按成交时间、分钟线时间索引分别查询。
+    """
+    if start is None:
+        start = _last_bar_date(session)
+    q = session.query(func.date(CJMX.成交时间)).distinct()
+    if start is not None:
+        start = pd.Timestamp(start).normalize()
+        q = q.filter(CJMX.成交时间 >= start.to_pydatetime())
+    pairs = {}
+    for d, in q.all():
+        pairs.setdefault(pd.Timestamp(d), set())
+    if store is not None:
+        for code, d in store.stored(start=start):
+            pairs.setdefault(d, set()).add(code)
+    res = set()
+    for d in sorted(pairs):
+        day = (d.to_pydatetime(), (d + pd.Timedelta(days=1)).to_pydatetime())
+        codes = session.query(CJMX.股票代码).filter(
+            CJMX.成交时间 >= day[0], CJMX.成交时间 < day[1]).distinct()
+        done = session.query(MinuteBar.股票代码).filter(
+            MinuteBar.周期 == 1, MinuteBar.时间 >= day[0],
+            MinuteBar.时间 < day[1]).distinct()
+        codes = pairs[d] | {c for c, in codes.all()}
+        res.update((c, d) for c in codes - {c for c, in done.all()})
+    return res
+
+
+def _read_ticks(session, codes, date, store=None):
+    """读取指定日期成交明细，已存储的股票读取存储，其余读取数据库"""
+    dfs, rest = [], codes
+    if store is not None:
+        stored = {c for c, _ in store.stored(codes, date, date)}
+        if stored:
+            dfs.append(store.read(sorted(stored), date, date, columns=TICK_COLS))
+            rest = [c for c in codes if c not in stored]
+    if rest:
+        q = session.query(*[getattr(CJMX, c) for c in TICK_COLS]).filter(
+            CJMX.成交时间 >= date.to_pydatetime(),
+            CJMX.成交时间 < (date + pd.Timedelta(days=1)).to_pydatetime(),
+            CJMX.股票代码.in_(rest),
+        )
+        dfs.append(pd.DataFrame(q.all(), columns=TICK_COLS))
+    df = pd.concat(dfs, ignore_index=True)
+    df['成交时间'] = pd.to_datetime(df['成交时间'])
+    return df
+
+
+def refresh_minute_bars(start=None, freqs=FREQS, engine=None, store=None):
+    """增量刷新分钟线
+
+    Keyword Arguments:
+        start {datelike} -- 只检查该日期之后的成交明细，为None时自已有分钟线的最后日期起检查；
+                            补录更早日期的成交明细后须指定 (default: {None})
+        freqs {tuple} -- 周期(分钟) (default: {FREQS})
+        engine {Engine} -- 数据库引擎 (default: {`szsh`数据库})
+        store {TickStore} -- 成交明细存储 (default: {TickStore()})
+
+    Returns:
+        int -- 写入分钟线数量
+    """
+    engine = engine or get_engine(db_dir_name)
+    store = store or TickStore()
+    MinuteBar.__table__.create(engine, checkfirst=True)
+    session = Session(bind=engine)
+    rows = 0
+    try:
+        pairs = pending_pairs(session, start, store)
+        logger.notice(f'待汇总 {len(pairs)}项')
+        by_date = {}
+        for code, date in pairs:
+            by_date.setdefault(date, []).append(code)
+        for date in sorted(by_date):
+            for codes in loop_codes(sorted(by_date[date]), CODE_BATCH):
+                df = aggregate(_read_ticks(session, codes, date, store), freqs)
+                with engine.begin() as conn:
+                    df.to_sql(MinuteBar.__tablename__, conn, if_exists='append', index=False)
+                rows += len(df)
+            logger.info(f'{date.date()} 股票{len(by_date[date])}只')
+    finally:
+        session.close()
+    return rows
+
+
+def read_bars(codes=None, start=None, end=None, freq=1, engine=None):
+    """读取分钟线
+
+    Keyword Arguments:
+        codes {list} -- 股票代码，为None时不限定 (default: {None})
+        start {datelike} -- 开始日期 (default: {None})
+        end {datelike} -- 结束日期(含) (default: {None})
+        freq {int} -- 周期(分钟) (default: {1})
+
+    Returns:
+        pd.DataFrame -- 按股票代码、时间排序的分钟线
+    """
+    engine = engine or get_engine(db_dir_name)
+    session = Session(bind=engine)
+    try:
+        q = session.query(*[getattr(MinuteBar, c) for c in BAR_COLS]).filter(
+            MinuteBar.周期 == freq)
+        if codes is not None:
+            q = q.filter(MinuteBar.股票代码.in_(codes))
+        if start is not None:
+            q = q.filter(MinuteBar.时间 >= pd.Timestamp(start).normalize().to_pydatetime())
+        if end is not None:
+            end = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            q = q.filter(MinuteBar.时间 < end.to_pydatetime())
+        q = q.order_by(MinuteBar.股票代码, MinuteBar.时间)
+        return pd.DataFrame(q.all(), columns=BAR_COLS)
+    finally:
+        session.close()
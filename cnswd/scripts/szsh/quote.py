@@ -1,41 +1,19 @@
 import asyncio
 import time
-import re
-import aiohttp
 import logbook
 import pandas as pd
 from cnswd.sql.base import get_engine, session_scope
 from cnswd.utils import loop_codes
-from cnswd.constants import QUOTE_COLS
+from cnswd.websource.replay import async_request
+from cnswd.websource.sina import parse_hq
 
 from .base import get_valid_codes, need_refresh
 
 logger = logbook.Logger('实时报价')
 
-QUOTE_PATTERN = re.compile('"(.*)"')
-CODE_PATTERN = re.compile(r'hq_str_s[zh](\d{6})')
 db_dir_name = 'szsh'
 
 
-def _convert_to_numeric(s, exclude=()):
-    if pd.api.types.is_string_dtype(s):
-        if exclude:
-            if s.name not in exclude:
-                return pd.to_numeric(s, errors='coerce')
-    return s
-
-
-def _to_dataframe(content):
-    """解析网页数据，返回DataFrame对象"""
-    res = [x.split(',') for x in re.findall(QUOTE_PATTERN, content)]
-    codes = [x for x in re.findall(CODE_PATTERN, content)]
-    df = pd.DataFrame(res).iloc[:, :32]
-    df.columns = QUOTE_COLS[1:]
-    df.insert(0, '股票代码', codes)
-    df.dropna(inplace=True)
-    return df
-
-
 def _add_prefix(stock_code):
     pre = stock_code[0]
     if pre == '6':
@@ -44,32 +22,36 @@ def _add_prefix(stock_code):
         return 'sz{}'.format(stock_code)
 
 
-async def fetch(codes):
+async def fetch(codes, session=None):
     url_fmt = 'http://hq.sinajs.cn/list={}'
     url = url_fmt.format(','.join(map(_add_prefix, codes)))
-    async with aiohttp.request('GET', url) as r:
-        data = await r.text()
-    return data
+    r = await async_request(session, 'GET', url)
+    return await r.text()
 
 
-async def to_dataframe(codes):
+async def to_dataframe(codes, session=None):
     """解析网页数据，返回DataFrame对象"""
-    content = await fetch(codes)
-    df = _to_dataframe(content)
-    df = df.apply(_convert_to_numeric, exclude=('股票代码', '股票简称', '日期', '时间'))
+    content = await fetch(codes, session)
+    df = parse_hq(content)
     df = df[df.成交额 > 0]
     if len(df) > 0:
-        df['时间'] = pd.to_datetime(df.日期 + ' ' + df.时间)
+        df['时间'] = pd.to_datetime(df.日期 + ' ' + df.时间, format='%Y-%m-%d %H:%M:%S')
         del df['日期']
         return df
     return pd.DataFrame()
 
 
-async def fetch_all(batch_num=800):
-    """获取所有股票实时报价原始数据"""
-    stock_codes = get_valid_codes()
+async def fetch_all(batch_num=800, codes=None, session=None):
+    """获取所有股票实时报价原始数据
+
+    Keyword Arguments:
+        batch_num {int} -- 每次请求股票数量 (default: {800})
+        codes {list} -- 股票代码，为None时查询有效股票代码 (default: {None})
+        session {aiohttp.ClientSession} -- 会话，为None时每次请求新建连接 (default: {None})
+    """
+    stock_codes = get_valid_codes() if codes is None else codes
     b_codes = loop_codes(stock_codes, batch_num)
-    tasks = [to_dataframe(codes) for codes in b_codes]
+    tasks = [to_dataframe(codes, session) for codes in b_codes]
     dfs = await asyncio.gather(
         *tasks
     )
@@ -0,0 +1,231 @@
+"""
+实时报价轮询
+
+常驻进程，取代计划任务每分钟启动一次`refresh_live_quote`：
+    1. 单一`aiohttp.ClientSession`，连接复用
+    2. 股票代码在启动时读取一次，保存在内存
+    3. 按设定间隔(可小于1分钟)轮询，只写入累计成交量或五档报价发生变化的行
+
+交易时段结束后自动退出，可由计划任务程序在每个交易日开盘前启动。
+指定端口时同时在内存保存最新报价快照，并提供本机查询服务(见`snapshot`)。
+变化的行同时增量计算盘中指标(见`intraday`)，与报价在同一事务写入。
+比较用的上次快照及盘中指标状态在写入成功后才更新，写入失败时下次轮询重新写入这些变化。
+启动时由当日已写入的最后报价恢复上次快照及指标状态，重新启动不会重复写入或重复计算。
+"""
+import asyncio
+import time
+
+import aiohttp
+import logbook
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import IntradayStat, LiveQuote
+
+from .base import get_valid_codes, need_refresh
+from .intraday import IntradayAnalytics
+from .quote import fetch_all
+from .snapshot import HOST, QuoteSnapshot, start_server
+
+logger = logbook.Logger('实时报价轮询')
+
+db_dir_name = 'szsh'
+INTERVAL = 10  # 轮询间隔(秒)
+# 轮询时段，含早盘集合竞价
+SESSIONS = (('09:15', '11:31'), ('12:59', '15:01'))
+# 比较是否变化的列
+CHANGE_COLS = ['成交量', '成交额', '现价', '竞买价', '竞卖价'] + \
+    [f'{side}{i}{item}' for side in ('买', '卖') for i in range(1, 6) for item in ('量', '价')]
+
+
+def _session_bounds(day):
+    return [(day + pd.Timedelta(f'{s}:00'), day + pd.Timedelta(f'{e}:00'))
+            for s, e in SESSIONS]
+
+
+def _insert_or_ignore(table, conn, keys, data_iter):
+    """`to_sql`插入方法，忽略主键已存在的行"""
+    stmt = insert(table.table).prefix_with('OR IGNORE')
+    conn.execute(stmt, [dict(zip(keys, row)) for row in data_iter])
+
+
+def read_last_quotes(engine, day):
+    """各股票当日最后写入的报价"""
+    session = Session(bind=engine)
+    try:
+        last = session.query(
+            LiveQuote.股票代码, func.max(LiveQuote.时间).label('时间')).filter(
+            LiveQuote.时间 >= day.to_pydatetime()).group_by(LiveQuote.股票代码).subquery()
+        cols = ['股票代码', '时间'] + CHANGE_COLS
+        q = session.query(*[getattr(LiveQuote, c) for c in cols]).join(
+            last, (LiveQuote.股票代码 == last.c.股票代码) & (LiveQuote.时间 == last.c.时间))
+        df = pd.DataFrame(q.all(), columns=cols)
+    finally:
+        session.close()
+    df['时间'] = pd.to_datetime(df['时间'])
+    return df.drop_duplicates('股票代码', keep='last')
+
+
+def changed_rows(df, last):
+    """与上次快照比较，返回新增或变化的行
+
+    Arguments:
+        df {pd.DataFrame} -- 本次报价
+        last {pd.DataFrame} -- 上次快照，以股票代码为索引，为None时全部视为变化
+    """
+    if last is None or last.empty:
+        return df
+    new = df.set_index('股票代码')[CHANGE_COLS]
+    old = last.reindex(new.index)
+    same = (new.values == old.values) | (pd.isna(new.values) & pd.isna(old.values))
+    mask = ~np.all(same, axis=1)
+    return df[mask]
+
+
+class QuotePoller(object):
+    """实时报价轮询
+
+    Keyword Arguments:
+        interval {float} -- 轮询间隔(秒) (default: {INTERVAL})
+        batch_num {int} -- 每次请求股票数量 (default: {800})
+        codes {list} -- 股票代码，为None时使用有效股票代码 (default: {None})
+        engine {Engine} -- 数据库引擎 (default: {`szsh`数据库})
+        snapshot {QuoteSnapshot} -- 最新报价快照，为None时不保存 (default: {None})
+        analytics {IntradayAnalytics} -- 盘中指标，为None时不计算 (default: {None})
+    """
+
+    def __init__(self, interval=INTERVAL, batch_num=800, codes=None, engine=None,
+                 snapshot=None, analytics=None):
+        self.interval = interval
+        self.batch_num = batch_num
+        self.codes = codes
+        self.engine = engine or get_engine(db_dir_name)
+        self.last = None  # 以股票代码为索引的最新快照
+        self.snapshot = snapshot
+        self.analytics = analytics
+        LiveQuote.__table__.create(self.engine, checkfirst=True)
+        if analytics is not None:
+            IntradayStat.__table__.create(self.engine, checkfirst=True)
+        self.stats = {'轮询': 0, '报价': 0, '写入': 0}
+
+    def _write(self, df, stats=None):
+        with self.engine.begin() as conn:
+            df.to_sql(LiveQuote.__tablename__, conn, index=False, if_exists='append')
+            if stats is not None and len(stats):
+                # 与已有指标重复(如重新启动)时忽略
+                stats.to_sql(IntradayStat.__tablename__, conn, index=False,
+                             if_exists='append', method=_insert_or_ignore)
+
+    def restore(self, day=None):
+        """由当日已写入的报价恢复上次快照及盘中指标状态，返回恢复的股票数量"""
+        day = pd.Timestamp(day or 'today').normalize()
+        df = read_last_quotes(self.engine, day)
+        if df.empty:
+            return 0
+        self.update(df)
+        if self.analytics is not None:
+            self.analytics.seed(df)
+        logger.notice(f'恢复{len(df)}只股票的最后报价')
+        return len(df)
+
+    def update(self, df):
+        """以已写入的报价更新上次快照"""
+        snapshot = df.set_index('股票代码')[CHANGE_COLS]
+        if self.last is None:
+            self.last = snapshot
+        else:
+            # 保留本次未返回的股票
+            self.last = pd.concat([self.last[~self.last.index.isin(snapshot.index)], snapshot])
+
+    async def poll_once(self, session):
+        """轮询一次，返回写入行数"""
+        today = pd.Timestamp('today').normalize()
+        df = await fetch_all(self.batch_num, self.codes, session)
+        self.stats['轮询'] += 1
+        if df.empty:
+            return 0
+        df = df.loc[df['时间'] >= today, :]
+        self.stats['报价'] += len(df)
+        if self.snapshot is not None:
+            self.snapshot.update(df)
+        df = df.drop_duplicates('股票代码', keep='last')
+        delta = changed_rows(df, self.last)
+        if len(delta):
+            stats, pending = None, None
+            if self.analytics is not None:
+                stats, pending = self.analytics.stage(delta)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, delta, stats)
+            if self.analytics is not None:
+                self.analytics.commit(pending)
+        self.update(df)
+        self.stats['写入'] += len(delta)
+        return len(delta)
+
+    async def run(self, until=None):
+        """轮询至交易时段结束
+
+        Keyword Arguments:
+            until {pd.Timestamp} -- 结束时间，为None时为当日最后交易时段结束 (default: {None})
+        """
+        day = pd.Timestamp('today').normalize()
+        bounds = _session_bounds(day)
+        until = until or bounds[-1][1]
+        if self.codes is None:
+            self.codes = sorted(get_valid_codes())
+        self.restore(day)
+        logger.notice(f'股票{len(self.codes)}只，间隔{self.interval}秒，至{until}')
+        async with aiohttp.ClientSession() as session:
+            while True:
+                now = pd.Timestamp('now')
+                if now >= until:
+                    break
+                waiting = [s for s, e in bounds if now < s]
+                if not any(s <= now < e for s, e in bounds) and waiting:
+                    # 非交易时段，等待下一时段开始
+                    await asyncio.sleep(min((waiting[0] - now).total_seconds(),
+                                            (until - now).total_seconds()))
+                    continue
+                start = time.monotonic()
+                try:
+                    n = await self.poll_once(session)
+                    logger.info(f'写入{n}行')
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.info(f'{e!r}')
+                except Exception as e:
+                    # 数据库、解析等错误不中止轮询，未写入的变化在下次轮询重新写入
+                    logger.error(f'{e!r}')
+                await asyncio.sleep(max(0, self.interval - (time.monotonic() - start)))
+        logger.notice(f'{self.stats}')
+        return self.stats
+
+
+async def _serve_and_run(poller, port):
+    runner = await start_server(poller.snapshot, HOST, port)
+    try:
+        return await poller.run()
+    finally:
+        await runner.cleanup()
+
+
+def run_quote_poller(interval=INTERVAL, port=None, analytics=True):
+    """交易日运行实时报价轮询
+
+    Keyword Arguments:
+        interval {float} -- 轮询间隔(秒) (default: {INTERVAL})
+        port {int} -- 最新报价查询服务端口，为None时不提供服务 (default: {None})
+        analytics {bool} -- 是否计算盘中指标 (default: {True})
+    """
+    if not need_refresh(pd.Timestamp('today')):
+        logger.notice('非交易日')
+        return
+    poller = QuotePoller(interval,
+                         snapshot=None if port is None else QuoteSnapshot(),
+                         analytics=IntradayAnalytics() if analytics else None)
+    if port is None:
+        asyncio.run(poller.run())
+    else:
+        asyncio.run(_serve_and_run(poller, port))
@@ -0,0 +1,174 @@
+"""
+实时报价、成交明细滚动保留
+
+热数据库(`szsh`)只保留最近若干交易日的数据，更早的数据移至备份数据库(`backup`)。
+以`ATTACH`连接备份数据库，按序号区间分批复制、删除，每批一个事务：
+    INSERT OR IGNORE INTO backup.<表> SELECT ... FROM main.<表> WHERE 序号区间 AND 时间 < 截止日
+    INSERT INTO backup.<表> SELECT 除序号外各列 ... WHERE 备份中无相同(序号, 股票代码, 时间)
+    DELETE FROM main.<表> WHERE 序号区间 AND 时间 < 截止日
+
+备份中已有相同序号的行，如股票代码、时间一致，视为已复制；否则为不同数据(如热数据库重建后序号重复)，
+以新序号复制。删除时区间内各行均已在备份中。中断后重新运行即可继续。完成后`VACUUM`回收空间。
+`read_all`合并读取热数据库与备份数据库。
+"""
+import logbook
+import pandas as pd
+from pandas.tseries.offsets import BDay
+from sqlalchemy import inspect
+
+from cnswd.sql.backup import Base as BackupBase
+from cnswd.sql.base import db_path, get_engine
+from cnswd.sql.szsh import CJMX, LiveQuote, TradingCalendar
+
+logger = logbook.Logger('滚动保留')
+
+db_dir_name = 'szsh'
+backup_dir_name = 'backup'
+KEEP_DAYS = 30       # 保留交易日数量
+BATCH_SIZE = 200000  # 每批序号区间大小
+
+# 表名称: 时间列
+TABLES = {
+    CJMX.__tablename__: '成交时间',
+    LiveQuote.__tablename__: '时间',
+}
+
+
+def cutoff_date(engine, keep_days=KEEP_DAYS, today=None):
+    """保留期间的首个交易日，早于该日的数据移至备份
+
+    以交易日历计算，日历数据不足时以工作日计算
+    """
+    today = pd.Timestamp(today or 'today').normalize()
+    sql = (f'SELECT 日期 FROM {TradingCalendar.__tablename__} '
+           'WHERE 交易日 = 1 AND 日期 < ? ORDER BY 日期 DESC LIMIT 1 OFFSET ?')
+    with engine.connect() as conn:
+        if inspect(conn).has_table(TradingCalendar.__tablename__):
+            r = conn.exec_driver_sql(
+                sql, (str(today + pd.Timedelta(days=1)), keep_days - 1)).scalar()
+            if r is not None:
+                return pd.Timestamp(r).normalize()
+    return today - BDay(keep_days - 1)
+
+
+def _columns(conn, schema, table):
+    rows = conn.exec_driver_sql(f'PRAGMA {schema}.table_info({table})').fetchall()
+    return [r[1] for r in rows]
+
+
+def _archive_table(conn, table, time_col, cutoff, batch_size):
+    """分批移动单表数据，返回移动行数"""
+    # 只复制两表共有的列
+    backup_cols = set(_columns(conn, 'backup', table))
+    common = [c for c in _columns(conn, 'main', table) if c in backup_cols]
+    cols = ', '.join(f'"{c}"' for c in common)
+    # 序号冲突的行不含序号复制，由备份数据库分配
+    new_cols = ', '.join(f'"{c}"' for c in common if c != '序号')
+    cond = f'序号 BETWEEN ? AND ? AND "{time_col}" < ?'
+    copied = (f'SELECT 1 FROM backup.{table} AS b WHERE b.序号 = m.序号 '
+              f'AND b.股票代码 IS m.股票代码 AND b."{time_col}" IS m."{time_col}"')
+    lo, hi = conn.exec_driver_sql(
+        f'SELECT min(序号), max(序号) FROM main.{table} WHERE "{time_col}" < ?',
+        (cutoff,)).fetchone()
+    if lo is None:
+        return 0
+    moved = 0
+    for start in range(lo, hi + 1, batch_size):
+        params = (start, start + batch_size - 1, cutoff)
+        with conn.begin():
+            conn.exec_driver_sql(
+                f'INSERT OR IGNORE INTO backup.{table} ({cols}) '
+                f'SELECT {cols} FROM main.{table} WHERE {cond}', params)
+            conflicts = conn.exec_driver_sql(
+                f'INSERT INTO backup.{table} ({new_cols}) '
+                f'SELECT {new_cols} FROM main.{table} AS m '
+                f'WHERE {cond} AND NOT EXISTS ({copied})', params).rowcount
+            if conflicts:
+                logger.warning(f'{table} 序号{start}起 {conflicts}行序号与备份冲突，以新序号复制')
+            n = conn.exec_driver_sql(
+                f'DELETE FROM main.{table} WHERE {cond}', params).rowcount
+        moved += n
+        logger.info(f'{table} 序号{start}起 移动{n}行')
+    return moved
+
+
+def archive(keep_days=KEEP_DAYS, batch_size=BATCH_SIZE, vacuum=True,
+            hot_path=None, backup_path=None):
+    """将早于保留期间的实时报价、成交明细移至备份数据库
+
+    Keyword Arguments:
+        keep_days {int} -- 保留交易日数量 (default: {KEEP_DAYS})
+        batch_size {int} -- 每批序号区间大小 (default: {BATCH_SIZE})
+        vacuum {bool} -- 完成后是否回收热数据库空间 (default: {True})
+        hot_path {str} -- 热数据库路径 (default: {`szsh`数据库})
+        backup_path {str} -- 备份数据库路径 (default: {`backup`数据库})
+
+    Returns:
+        dict -- 各表移动行数
+    """
+    engine = get_engine(db_dir_name, path_str=hot_path)
+    backup_path = backup_path or db_path(backup_dir_name)
+    BackupBase.metadata.create_all(get_engine(None, path_str=backup_path))
+    cutoff = cutoff_date(engine, keep_days)
+    cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S.%f')
+    logger.notice(f'保留{keep_days}个交易日，移动{cutoff.date()}之前的数据')
+    res = {}
+    with engine.connect() as conn:
+        conn.exec_driver_sql('ATTACH DATABASE ? AS backup', (backup_path,))
+        try:
+            for table, time_col in TABLES.items():
+                if not inspect(conn).has_table(table):
+                    continue
+                res[table] = _archive_table(conn, table, time_col, cutoff_str, batch_size)
+                logger.notice(f'{table} 共移动{res[table]}行')
+        finally:
+            conn.exec_driver_sql('DETACH DATABASE backup')
+        if vacuum and any(res.values()):
+            conn.exec_driver_sql('VACUUM')
+    engine.dispose()
+    return res
+
+
+def read_all(table, start=None, end=None, codes=None, hot_path=None, backup_path=None):
+    """合并读取热数据库与备份数据库
+
+    Arguments:
+        table {str} -- 表名称，见`TABLES`
+
+    Keyword Arguments:
+        start {datelike} -- 开始时间 (default: {None})
+        end {datelike} -- 结束时间(不含) (default: {None})
+        codes {list} -- 股票代码 (default: {None})
+
+    Returns:
+        pd.DataFrame -- 按时间排序的数据
+    """
+    time_col = TABLES[table]
+    engine = get_engine(db_dir_name, path_str=hot_path)
+    backup_path = backup_path or db_path(backup_dir_name)
+    conds, params = [], []
+    if start is not None:
+        conds.append(f'"{time_col}" >= ?')
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d %H:%M:%S.%f'))
+    if end is not None:
+        conds.append(f'"{time_col}" < ?')
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d %H:%M:%S.%f'))
+    if codes is not None:
+        conds.append(f'股票代码 IN ({", ".join("?" * len(codes))})')
+        params.extend(codes)
+    where = f' WHERE {" AND ".join(conds)}' if conds else ''
+    with engine.connect() as conn:
+        conn.exec_driver_sql('ATTACH DATABASE ? AS backup', (backup_path,))
+        try:
+            backup_cols = set(_columns(conn, 'backup', table))
+            cols = [c for c in _columns(conn, 'main', table) if c in backup_cols]
+            col_str = ', '.join(f'"{c}"' for c in cols)
+            sql = (f'SELECT {col_str} FROM main.{table}{where} UNION ALL '
+                   f'SELECT {col_str} FROM backup.{table}{where} ORDER BY "{time_col}"')
+            rows = conn.exec_driver_sql(sql, tuple(params) * 2).fetchall()
+        finally:
+            conn.exec_driver_sql('DETACH DATABASE backup')
+    engine.dispose()
+    df = pd.DataFrame(rows, columns=cols)
+    df[time_col] = pd.to_datetime(df[time_col])
+    return df
@@ -0,0 +1,173 @@
+"""
+最新报价快照
+
+随实时报价轮询在内存中保存每只股票的最新报价，供盘中程序查询，无需访问数据库。
+
+存储方式：
+    股票代码以`pd.Index`定位行号，数值列保存在一个二维浮点数组，
+    简称、时间各为一维数组，更新与查询均为数组整体操作
+
+查询接口(本机HTTP，JSON格式)：
+    GET /quotes                       全部股票
+    GET /quotes?codes=000001,000002   指定股票
+    GET /quotes/000001                单只股票，不存在时返回404
+"""
+import json
+
+import logbook
+import numpy as np
+import pandas as pd
+import requests
+from aiohttp import web
+
+from cnswd.constants import QUOTE_COLS
+
+logger = logbook.Logger('报价快照')
+
+HOST = '127.0.0.1'
+PORT = 8765
+VALUE_COLS = list(QUOTE_COLS[2:-2])
+SNAPSHOT_COLS = ['股票代码', '股票简称'] + VALUE_COLS + ['时间']
+
+
+class QuoteSnapshot(object):
+    """以数组保存的最新报价快照"""
+
+    def __init__(self):
+        self._index = pd.Index([], dtype=object)
+        self.names = np.empty(0, dtype=object)
+        self.values = np.empty((0, len(VALUE_COLS)), dtype='float64')
+        self.times = np.empty(0, dtype='datetime64[ns]')
+        self.version = 0  # 更新次数
+
+    def __len__(self):
+        return len(self._index)
+
+    def _grow(self, codes):
+        """为新增股票分配行"""
+        n = len(codes)
+        self._index = self._index.append(pd.Index(codes, dtype=object))
+        self.names = np.concatenate([self.names, np.empty(n, dtype=object)])
+        self.values = np.vstack([self.values, np.full((n, len(VALUE_COLS)), np.nan)])
+        nat = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.times = np.concatenate([self.times, nat])
+
+    def update(self, df):
+        """以报价更新快照，只替换时间不早于现有报价的行
+
+        Arguments:
+            df {pd.DataFrame} -- `quote.to_dataframe`返回的报价，`时间`为日期时间类型
+
+        Returns:
+            int -- 更新行数
+        """
+        if df.empty:
+            return 0
+        df = df.drop_duplicates('股票代码', keep='last')
+        codes = df['股票代码'].to_numpy(dtype=object)
+        pos = self._index.get_indexer(codes)
+        if (pos < 0).any():
+            self._grow(codes[pos < 0])
+            pos = self._index.get_indexer(codes)
+        times = df['时间'].to_numpy(dtype='datetime64[ns]')
+        old = self.times[pos]
+        mask = np.isnat(old) | (times >= old)
+        pos = pos[mask]
+        self.names[pos] = df['股票简称'].to_numpy(dtype=object)[mask]
+        self.values[pos] = df[VALUE_COLS].to_numpy(dtype='float64')[mask]
+        self.times[pos] = times[mask]
+        self.version += 1
+        return len(pos)
+
+    def get(self, codes=None):
+        """查询最新报价
+
+        Keyword Arguments:
+            codes {str or list} -- 股票代码，为None时返回全部，不存在的代码忽略 (default: {None})
+
+        Returns:
+            pd.DataFrame -- 列见`SNAPSHOT_COLS`
+        """
+        if codes is None:
+            pos = np.arange(len(self._index))
+        else:
+            if isinstance(codes, str):
+                codes = [codes]
+            pos = self._index.get_indexer(list(codes))
+            pos = pos[pos >= 0]
+        df = pd.DataFrame(self.values[pos], columns=VALUE_COLS)
+        df.insert(0, '股票代码', self._index.values[pos])
+        df.insert(1, '股票简称', self.names[pos])
+        df['时间'] = self.times[pos]
+        return df
+
+
+def _to_json(df):
+    return df.to_json(orient='records', force_ascii=False, date_format='iso')
+
+
+def create_app(snapshot):
+    """快照查询HTTP应用"""
+
+    async def quotes(request):
+        codes = request.query.get('codes')
+        if codes is not None:
+            codes = [x for x in codes.split(',') if x]
+        return web.Response(text=_to_json(snapshot.get(codes)),
+                            content_type='application/json')
+
+    async def quote(request):
+        df = snapshot.get(request.match_info['code'])
+        if df.empty:
+            raise web.HTTPNotFound(text=f'{request.match_info["code"]}不存在')
+        return web.Response(text=_to_json(df), content_type='application/json')
+
+    async def stats(request):
+        return web.json_response({'股票数量': len(snapshot), '更新次数': snapshot.version},
+                                 dumps=lambda x: json.dumps(x, ensure_ascii=False))
+
+    app = web.Application()
+    app.add_routes([web.get('/quotes', quotes),
+                    web.get('/quotes/{code}', quote),
+                    web.get('/stats', stats)])
+    return app
+
+
+async def start_server(snapshot, host=HOST, port=PORT):
+    """在当前事件循环中启动查询服务，返回`web.AppRunner`，由调用方`cleanup`
+
+    Arguments:
+        snapshot {QuoteSnapshot} -- 快照
+
+    Keyword Arguments:
+        host {str} -- 监听地址，默认只接受本机访问 (default: {HOST})
+        port {int} -- 端口，为0时由系统分配 (default: {PORT})
+    """
+    runner = web.AppRunner(create_app(snapshot), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.notice(f'报价快照服务 {runner.addresses}')
+    return runner
+
+
+def read_snapshot(codes=None, host=HOST, port=PORT, timeout=5):
+    """查询快照服务，返回最新报价
+
+    Keyword Arguments:
+        codes {str or list} -- 股票代码，为None时返回全部 (default: {None})
+
+    Returns:
+        pd.DataFrame -- 列见`SNAPSHOT_COLS`
+    """
+    params = None
+    if codes is not None:
+        if isinstance(codes, str):
+            codes = [codes]
+        params = {'codes': ','.join(codes)}
+    r = requests.get(f'http://{host}:{port}/quotes', params=params, timeout=timeout)
+    r.raise_for_status()
+    df = pd.DataFrame(r.json(), columns=SNAPSHOT_COLS)
+    df[VALUE_COLS] = df[VALUE_COLS].astype('float64')
+    df['时间'] = pd.to_datetime(df['时间'])
+    return df
@@ -14,6 +14,7 @@ from cnswd.constants import DB_DIR_NAME, DB_NAME, ROOT_DIR_NAME
 from cnswd.sql.backup import Base as BackupBase
 from cnswd.sql.base import db_path, get_engine
 from cnswd.sql.info import Base as InfoBase
+from cnswd.sql.journal import Base as JournalBase
 from cnswd.sql.szsh import Base as szshBase
 from cnswd.sql.data_browse import Base as SZXBase
 from cnswd.sql.thematic_statistics import Base as TSBase
@@ -37,6 +38,10 @@ def create_tables(db_dir_name=DB_DIR_NAME, rewrite=False):
         szshBase.metadata.create_all(engine)
     elif db_dir_name.startswith('thematicStatistics'):
         TSBase.metadata.create_all(engine)
+    elif db_dir_name.startswith('record'):
+        JournalBase.metadata.create_all(engine)
+    elif db_dir_name.startswith('backup'):
+        BackupBase.metadata.create_all(engine)
     else:
         raise ValueError(f'不支持{db_dir_name}')
 
@@ -0,0 +1,101 @@
+"""
+按数据模型转换数据类型
+
+写入数据库前，依据模型列定义将数据框各列统一转换为对应类型：
+    1. 浮点(Float)          -> float64，无法转换的值置为空值
+    2. 整数(Integer等)      -> 可空整数Int64，含小数或超出列类型范围的值置为空值
+    3. 日期时间(DateTime等) -> datetime64，无法转换的值置为空值
+    4. 字符(String、Text)   -> 字符串，空值保持不变
+
+SQLite按值存储整数、浮点，内存中降为较小类型并不减少存储空间，故各列保持统一类型，
+便于分批数据合并。
+"""
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from logbook import Logger
+from sqlalchemy import (BigInteger, Boolean, Date, DateTime, Float, Integer,
+                        SmallInteger, String, Text)
+
+logger = Logger('数据类型')
+
+
+def _to_float(s):
+    return pd.to_numeric(s, errors='coerce').astype('float64')
+
+
+def _to_int(s, dtype=np.int64):
+    info = np.iinfo(dtype)
+    num = pd.to_numeric(s, errors='coerce')
+    if pd.api.types.is_integer_dtype(num):
+        # 含uint64，超出范围时不能直接转换
+        valid = (num >= info.min) & (num <= info.max)
+        res = num.where(valid, 0).astype('int64').astype('Int64')
+        res[~valid] = pd.NA
+        return res
+    # 含小数部分的值视为错误值；浮点上限以2的幂表示，不含上限
+    valid = (num == np.floor(num)) & (num >= info.min) & (num < -float(info.min))
+    return num.where(valid).astype('Int64')
+
+
+def _to_datetime(s):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, errors='coerce')
+
+
+def _to_str(s):
+    if pd.api.types.is_object_dtype(s) and s.map(type).eq(str).all():
+        return s
+    res = s.astype(str).astype(object)
+    res[s.isna()] = None
+    return res
+
+
+def _converter(type_):
+    """列类型对应的转换函数，不支持的类型返回None"""
+    # 注意：Integer是BigInteger、SmallInteger的父类
+    if isinstance(type_, Boolean):
+        return None
+    if isinstance(type_, Float):
+        return _to_float
+    if isinstance(type_, SmallInteger):
+        return partial(_to_int, dtype=np.int16)
+    if isinstance(type_, (Integer, BigInteger)):
+        return _to_int
+    if isinstance(type_, (DateTime, Date)):
+        return _to_datetime
+    if isinstance(type_, (String, Text)):
+        return _to_str
+    return None
+
+
+def column_types(model, columns):
+    """数据框列所对应的模型列类型，用于`to_sql`的`dtype`参数"""
+    table_cols = model.__table__.columns
+    return {c: table_cols[c].type for c in columns if c in table_cols}
+
+
+def coerce_frame(df, model):
+    """按模型列类型转换数据框
+
+    Arguments:
+        df {pd.DataFrame} -- 待写入数据
+        model {class} -- sqlalchemy数据模型
+
+    Returns:
+        pd.DataFrame -- 转换后的数据，模型中不存在的列保持不变
+    """
+    df = df.copy()
+    table_name = model.__tablename__
+    for col, type_ in column_types(model, df.columns).items():
+        func = _converter(type_)
+        if func is None:
+            continue
+        origin = df[col]
+        df[col] = func(origin)
+        rejected = int(df[col].isna().sum() - origin.isna().sum())
+        if rejected > 0:
+            logger.warning(f'{table_name} 列"{col}" {rejected}个值无法转换为{type_}，置为空值')
+    return df
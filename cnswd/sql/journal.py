@@ -0,0 +1,138 @@
+"""
+刷新日志
+
+记录各项目刷新状态，以及按期间记录的完成情况，供重试时跳过本次运行中已完成的期间
+
+各函数`path_str`参数指定日志数据库路径，为None时使用默认路径。
+旧版状态文件`record/cninfo.csv`在首次使用默认日志数据库时导入，导入后改名为`cninfo.csv.bak`。
+"""
+import os
+import threading
+
+import logbook
+import pandas as pd
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.ext.declarative import declarative_base
+
+from cnswd.utils import data_root
+
+from .base import get_engine, session_scope
+from .common import CommonMixin
+
+logger = logbook.Logger('刷新日志')
+
+# 增强基本类
+Base = declarative_base(cls=CommonMixin)
+
+# 日志数据库目录名称
+JOURNAL_DIR_NAME = 'record'
+# 旧版状态文件名称
+CSV_RECORD_NAME = 'cninfo.csv'
+
+
+class LevelRecord(Base):
+    """项目刷新状态"""
+    项目 = Column(String(40), primary_key=True)
+    完成状态 = Column(String(10))
+    尝试次数 = Column(Integer)
+    完成时间 = Column(DateTime)
+    备注 = Column(Text)
+
+
+class PeriodRecord(Base):
+    """项目期间刷新日志"""
+    接口 = Column(String(30), primary_key=True)
+    项目 = Column(String(10), primary_key=True)
+    期间 = Column(String(30), primary_key=True)
+    状态 = Column(String(10))
+    行数 = Column(Integer)
+    哈希值 = Column(String(32))
+    完成时间 = Column(DateTime)
+
+
+_created = set()
+_lock = threading.RLock()
+
+
+def _ensure_tables(path_str=None):
+    with _lock:
+        if path_str not in _created:
+            Base.metadata.create_all(get_engine(JOURNAL_DIR_NAME, path_str=path_str))
+            _created.add(path_str)
+            if path_str is None:
+                csv_path = os.path.join(data_root(JOURNAL_DIR_NAME), CSV_RECORD_NAME)
+                if os.path.exists(csv_path):
+                    n = import_csv_records(csv_path)
+                    os.replace(csv_path, csv_path + '.bak')
+                    logger.notice(f'导入旧版状态文件{csv_path} {n}项')
+
+
+def import_csv_records(csv_path, path_str=None):
+    """导入旧版项目刷新状态文件，已有记录的项目保持不变
+
+    Arguments:
+        csv_path {str} -- 状态文件路径，以项目为索引，列为完成状态、尝试次数、完成时间、备注
+
+    Keyword Arguments:
+        path_str {str} -- 日志数据库路径 (default: {None})
+
+    Returns:
+        int -- 导入项目数量
+    """
+    _ensure_tables(path_str)
+    df = pd.read_csv(csv_path, index_col=0)
+    df['备注'] = df['备注'].fillna('').astype(str)
+    n = 0
+    with session_scope(JOURNAL_DIR_NAME, path_str=path_str) as session:
+        existed = {r[0] for r in session.query(LevelRecord.项目)}
+        for index, row in df.iterrows():
+            if index in existed:
+                continue
+            session.add(LevelRecord(
+                项目=index, 完成状态=row['完成状态'], 尝试次数=int(row['尝试次数']),
+                完成时间=pd.Timestamp(row['完成时间']).to_pydatetime(), 备注=row['备注']))
+            n += 1
+    return n
+
+
+def get_level_record(index, path_str=None):
+    """项目刷新状态字典，无记录时返回默认值"""
+    _ensure_tables(path_str)
+    with session_scope(JOURNAL_DIR_NAME, path_str=path_str) as session:
+        r = session.query(LevelRecord).get(index)
+        if r is None:
+            return {'完成状态': '未执行', '尝试次数': 0,
+                    '完成时间': pd.Timestamp('now'), '备注': ''}
+        return {'完成状态': r.完成状态, '尝试次数': r.尝试次数,
+                '完成时间': pd.Timestamp(r.完成时间), '备注': r.备注}
+
+
+def set_level_record(index, status, path_str=None):
+    """保存项目刷新状态"""
+    _ensure_tables(path_str)
+    with session_scope(JOURNAL_DIR_NAME, path_str=path_str) as session:
+        session.merge(LevelRecord(
+            项目=index, 完成状态=status['完成状态'], 尝试次数=int(status['尝试次数']),
+            完成时间=pd.Timestamp(status['完成时间']).to_pydatetime(),
+            备注=status['备注']))
+
+
+def get_period_record(api, level, period, path_str=None):
+    """期间刷新日志字典，无记录时返回None"""
+    _ensure_tables(path_str)
+    with session_scope(JOURNAL_DIR_NAME, path_str=path_str) as session:
+        r = session.query(PeriodRecord).get((api, level, period))
+        if r is None:
+            return None
+        return {'状态': r.状态, '行数': r.行数, '哈希值': r.哈希值,
+                '完成时间': pd.Timestamp(r.完成时间)}
+
+
+def set_period_record(api, level, period, status, rows=0, hash_value=None,
+                      path_str=None):
+    """保存期间刷新日志"""
+    _ensure_tables(path_str)
+    with session_scope(JOURNAL_DIR_NAME, path_str=path_str) as session:
+        session.merge(PeriodRecord(
+            接口=api, 项目=level, 期间=period, 状态=status, 行数=rows,
+            哈希值=hash_value, 完成时间=pd.Timestamp('now').to_pydatetime()))
@@ -76,6 +76,22 @@ class CJMX(Base):
     性质 = Column(Text)
 
 
+class MinuteBar(Base):
+    """分钟线(由成交明细汇总)"""
+    股票代码 = Column(String(6), primary_key=True)
+    周期 = Column(SmallInteger, primary_key=True)  # 分钟
+    时间 = Column(DateTime, primary_key=True, index=True)  # 结束时间
+    开盘 = Column(Float)
+    最高 = Column(Float)
+    最低 = Column(Float)
+    收盘 = Column(Float)
+    成交量 = Column(BigInteger)
+    成交额 = Column(Float)
+    买盘成交量 = Column(BigInteger)
+    卖盘成交量 = Column(BigInteger)
+    成交笔数 = Column(Integer)
+
+
 class TradingCalendar(Base):
     """交易日期"""
     日期 = Column(DateTime, unique=True, primary_key=True, index=True)
@@ -143,6 +159,18 @@ class LiveQuote(Base):
     卖5价 = Column(Float, name='卖5价')
 
 
+class IntradayStat(Base):
+    """盘中报价指标(由实时报价增量计算)"""
+    股票代码 = Column(String(6), primary_key=True)
+    时间 = Column(DateTime, primary_key=True, index=True)
+    区间成交量 = Column(BigInteger)  # 与上次报价之差
+    区间成交额 = Column(Float)
+    均价 = Column(Float)  # 当日成交量加权平均价
+    中间价 = Column(Float)
+    价差 = Column(Float)
+    失衡 = Column(Float)  # 五档买卖量失衡，(买量 - 卖量) / (买量 + 卖量)
+
+
 class THSGN(Base):
     """同花顺概念成分表"""
     概念 = Column(String, primary_key=True, index=True)
@@ -0,0 +1,22 @@
+"""
+成交明细存储清单
+
+记录每个(股票代码, 日期)所在的Parquet文件及行数。存在性检查及读取均以清单为准，
+未登记的文件视为未完成写入。
+"""
+from sqlalchemy import Column, Date, DateTime, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+
+from .common import CommonMixin
+
+# 增强基本类
+Base = declarative_base(cls=CommonMixin)
+
+
+class TickPartition(Base):
+    """成交明细分区"""
+    股票代码 = Column(String(6), primary_key=True)
+    日期 = Column(Date, primary_key=True, index=True)
+    文件 = Column(String(60), index=True)
+    行数 = Column(Integer)
+    写入时间 = Column(DateTime)
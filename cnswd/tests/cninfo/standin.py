@@ -0,0 +1,106 @@
+"""
+
+本地替身服务器
+
+模拟深证信数据服务JSON接口，供接口版测试使用。在线程中运行，端口由系统分配。
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from cnswd.websource.cninfo.constants import CLASSIFY_API, FIELD_API, OPTION_API
+
+
+class StandInServer(object):
+    """深证信接口替身
+
+    Arguments:
+        fields {dict} -- 接口名称: [(字段编码, 中文名称), ...]
+        records {dict} -- 接口名称: [记录, ...]
+        codes {dict} -- 分类编码: [股票代码, ...]
+
+    Keyword Arguments:
+        date_field {str} -- 按`sdate`、`edate`过滤记录所使用的字段 (default: {'F001D'})
+        options {dict} -- 接口名称: [选项值, ...]，记录按同名字段过滤 (default: {None})
+    """
+
+    def __init__(self, fields, records, codes, date_field='F001D', options=None):
+        self.fields = fields
+        self.records = records
+        self.codes = codes
+        self.date_field = date_field
+        self.options = options or {}
+        self.requests = []     # 已接收请求(接口名称, 参数)
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, api, params):
+        """按接口名称及参数返回响应内容"""
+        self.requests.append((api, params))
+        if api == FIELD_API:
+            fields = self.fields.get(params.get('apiname'), [])
+            records = [{'fieldName': c, 'fieldChineseName': t, 'sortNo': i}
+                       for i, (c, t) in enumerate(fields, 1)]
+        elif api == OPTION_API:
+            records = [{'optionValue': v, 'optionName': v}
+                       for v in self.options.get(params.get('apiname'), [])]
+        elif api == CLASSIFY_API:
+            records = [{'SECCODE': c}
+                       for c in self.codes.get(params.get('platecode'), [])]
+        elif api in self.records:
+            records = self.records[api]
+            if 'scode' in params:
+                codes = params['scode'].split(',')
+                records = [r for r in records if r.get('SECCODE') in codes]
+            if 'sdate' in params:
+                records = [r for r in records
+                           if params['sdate'] <= r[self.date_field] <= params['edate']]
+            if 'rdate' in params:
+                records = [r for r in records
+                           if r[self.date_field] == params['rdate']]
+            if params.get('type'):
+                records = [r for r in records if r.get('type') == params['type']]
+        else:
+            return {'resultcode': 404, 'resultmsg': f'无此接口：{api}'}
+        return {'resultcode': 200, 'resultmsg': 'success',
+                'count': len(records), 'records': records}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8')
+                api = urlparse(self.path).path[len('/api/'):]
+                if not self.headers.get('Accept-EncKey'):
+                    res = {'resultcode': 401, 'resultmsg': '缺少校验码'}
+                else:
+                    res = standin.respond(api, dict(parse_qsl(body, keep_blank_values=True)))
+                content = json.dumps(res, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cnswd.utils import loop_period_by
+from cnswd.websource.cninfo.planner import PeriodPlanner
+
+
+class PeriodPlannerTestCase(unittest.TestCase):
+    """测试自适应期间规划"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'density.csv')
+        self.planner = PeriodPlanner(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_no_stats(self):
+        """无统计时保持原期间"""
+        ps = loop_period_by('2018-01-01', '2018-03-31', 'M', False)
+        self.assertListEqual(self.planner.plan('x', ps, 50), ps)
+
+    def test_merge_sparse(self):
+        """稀疏项目合并期间"""
+        self.planner.observe('x', '2018-01-01', '2018-01-31', 3)
+        ps = loop_period_by('2018-01-01', '2018-12-31', 'M', False)
+        planned = self.planner.plan('x', ps, 50)
+        self.assertLess(len(planned), len(ps))
+        self.assertEqual(planned[0][0], ps[0][0])
+        self.assertEqual(planned[-1][1], ps[-1][1])
+
+    def test_split_dense(self):
+        """密集项目拆分期间，且持久化统计"""
+        self.planner.observe('x', '2018-01-01', '2018-01-31', 31 * 20)
+        self.planner.save()
+        ps = loop_period_by('2018-01-01', '2018-01-31', 'M', False)
+        planned = PeriodPlanner(self.path).plan('x', ps, 50)
+        self.assertEqual(len(planned), 16)
+        days = sum((e - s).days + 1 for s, e in planned)
+        self.assertEqual(days, 31)
+        self.assertEqual(planned[-1][1], pd.Timestamp('2018-01-31'))
+
+    def test_merge_only(self):
+        """不拆分时密集期间保持原样"""
+        self.planner.observe('x', '2018-01-01', '2018-01-31', 31 * 20)
+        ps = loop_period_by('2018-01-01', '2018-03-31', 'M', False)
+        self.assertListEqual(self.planner.plan('x', ps, 50, split=False), ps)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import logbook
+import pandas as pd
+from sqlalchemy import create_engine
+
+from cnswd.scripts.cninfo.refresher import DBRefresher, _period_key
+from cnswd.sql.journal import set_period_record
+from cnswd.websource.exceptions import BudgetExceeded
+
+
+class FakeApi(object):
+    """记录调用的数据读取实例"""
+
+    def __init__(self, pages=()):
+        self.logger = logbook.Logger('测试')
+        self.is_available = True
+        self.resets = 0
+        self.pages = pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def reset(self):
+        self.resets += 1
+
+    def get_data(self, level, start=None, end=None, periods=None):
+        return pd.concat(list(self.iter_data(level)), ignore_index=True)
+
+    def iter_data(self, level, start=None, end=None, periods=None):
+        for page in self.pages:
+            if isinstance(page, Exception):
+                raise page
+            yield page
+
+
+class RefresherTestCase(unittest.TestCase):
+    """深证信刷新工具测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.journal = os.path.join(self.root, 'record.db')
+        self.db = os.path.join(self.root, 'data.db')
+        self.refresher = DBRefresher(journal_path=self.journal,
+                                     planner_path=os.path.join(self.root, 'density.csv'),
+                                     path_str=self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _commit(self, level, period):
+        set_period_record('DataBrowse', level, _period_key(*period), '完成', 1, 'x',
+                          path_str=self.journal)
+
+    def test_resume(self):
+        """测试只跳过本次运行中已完成的期间"""
+        q3 = (pd.Timestamp('2018-07-01'), pd.Timestamp('2018-09-30'))
+        # 以往运行中、期间结束后完成的期间仍需刷新
+        self._commit('8.1.1', q3)
+        self.refresher._run_start = pd.Timestamp('now') + pd.Timedelta(seconds=1)
+        self.assertFalse(self.refresher._is_committed('8.1.1', q3))
+        self.assertFalse(self.refresher._is_committed('8.1.1', (None, None)))
+        # 本次运行中完成的期间，重试时跳过
+        self.refresher._run_start = pd.Timestamp('now') - pd.Timedelta(seconds=1)
+        self._commit('8.1.1', q3)
+        self._commit('1.1', (None, None))
+        self.assertTrue(self.refresher._is_committed('8.1.1', q3))
+        self.assertTrue(self.refresher._is_committed('1.1', (None, None)))
+
+    def test_plan_periods(self):
+        """测试按行密度合并稀疏期间，且本次运行内规划不变"""
+        start, end = pd.Timestamp('2018-01-01'), pd.Timestamp('2018-12-31')
+        self.refresher.planner.observe('DataBrowse4.1', start, end, 12)
+        ps = self.refresher._plan_periods('4.1', start, end, 'M')
+        self.assertLess(len(ps), 12)
+        self.assertEqual(ps[0][0], start)
+        self.assertEqual(ps[-1][1], end)
+        self.refresher.planner.observe('DataBrowse4.1', start, end, 10 ** 6)
+        self.assertListEqual(self.refresher._plan_periods('4.1', start, end, 'M'), ps)
+
+    def test_schedule(self):
+        """测试按刷新周期优先调度，超出预算的项目移入失败队列且不重建会话"""
+        api = FakeApi()
+        self.refresher.make_api = lambda: api
+        done, calls = set(), []
+
+        def loop(api, level, freq, deadline=None):
+            calls.append(level)
+            if level == '3.1' and calls.count(level) == 1:
+                raise BudgetExceeded(f'{level} 超出时间预算')
+            if level == '1.1' and calls.count(level) == 1:
+                raise ValueError('页面异常')
+            done.add(level)
+
+        self.refresher._loop_by_level = loop
+        self.refresher.was_completed = lambda level: level in done
+        failed = self.refresher._schedule(['1.1', '6.1', '4.1', '3.1'])
+        self.assertListEqual(calls, ['3.1', '4.1', '6.1', '1.1', '1.1'])
+        self.assertListEqual(failed, ['3.1'])
+        # 只有一般异常重建会话
+        self.assertEqual(api.resets, 1)
+        self.assertListEqual(self.refresher._schedule(failed), [])
+        self.assertEqual(self.refresher.get_status_dict('3.1')['完成状态'], '完成')
+
+    def test_stream_budget(self):
+        """测试全表项目流式写入时检查时间预算"""
+        api = FakeApi([pd.DataFrame({'a': [1]})])
+        with self.assertRaises(BudgetExceeded):
+            self.refresher._stream_period(api, '1.1', (None, None), time.time() - 1)
+
+    def _read(self, table):
+        return pd.read_sql_table(table, create_engine(f'sqlite:///{self.db}'))
+
+    def test_stream_staging(self):
+        """测试流式写入失败时全表不变，重试时继续暂存"""
+        self.refresher._normalize = lambda level, df: df
+        pd.DataFrame({'证券代码': ['000001', '000002']}).to_sql(
+            'stock_infos', create_engine(f'sqlite:///{self.db}'), index=False)
+        pages = [pd.DataFrame({'证券代码': ['000001', '000002']}),
+                 pd.DataFrame({'证券代码': ['000003']})]
+        api = FakeApi(pages + [ValueError('连接中断')])
+        with self.assertRaises(ValueError):
+            self.refresher._stream_period(api, '1.1', (None, None))
+        self.assertEqual(len(self._read('stock_infos')), 2)
+        self.assertEqual(len(self._read('stock_infos_staging')), 3)
+        # 重试时已暂存的行不再写入
+        api.pages = pages + [pd.DataFrame({'证券代码': ['000004']})]
+        with mock.patch.object(self.refresher, '_to_sql',
+                               wraps=self.refresher._to_sql) as to_sql:
+            rows, _ = self.refresher._stream_period(api, '1.1', (None, None))
+        self.assertEqual(rows, 4)
+        self.assertListEqual([len(c.args[2]) for c in to_sql.call_args_list], [1])
+        df = self._read('stock_infos')
+        self.assertListEqual(df['证券代码'].tolist(), ['000001', '000002', '000003', '000004'])
+
+    def test_stream_period(self):
+        """测试流式写入只替换期间数据"""
+        self.refresher._normalize = lambda level, df: df
+        pd.DataFrame({'证券代码': ['000001', '000001'],
+                      '交易日期': pd.to_datetime(['2018-01-02', '2018-01-03'])}).to_sql(
+            'quotes', create_engine(f'sqlite:///{self.db}'), index=False)
+        api = FakeApi([pd.DataFrame({'证券代码': ['000002'],
+                                     '交易日期': pd.to_datetime(['2018-01-02'])})])
+        day = pd.Timestamp('2018-01-02')
+        rows, _ = self.refresher._stream_period(api, '3.1', (day, day))
+        self.assertEqual(rows, 1)
+        df = self._read('quotes').sort_values('交易日期')
+        self.assertListEqual(df['证券代码'].tolist(), ['000002', '000001'])
+
+    def test_unchanged(self):
+        """测试以往运行已写入且数据未变动时不再写入项目表"""
+        self.refresher._normalize = lambda level, df: df
+        pages = [pd.DataFrame({'证券代码': ['000001', '000002']})]
+        for stream in (False, True):
+            self.refresher.stream = stream
+            self.refresher._run_start = pd.Timestamp('now')
+            api = FakeApi(pages)
+            self.refresher._loop_by_level(api, '1.1', None)
+            # 下次运行
+            self.refresher._run_start = pd.Timestamp('now') + pd.Timedelta(seconds=1)
+            # 流式写入经暂存表替换项目表
+            write = '_swap' if stream else '_to_sql'
+            with mock.patch.object(self.refresher, write,
+                                   wraps=getattr(self.refresher, write)) as m:
+                self.refresher._loop_by_level(api, '1.1', None)
+                self.assertFalse(m.called, stream)
+                # 数据变动时写入
+                api.pages = pages + [pd.DataFrame({'证券代码': ['000003']})]
+                self.refresher._run_start = pd.Timestamp('now') + pd.Timedelta(seconds=2)
+                self.refresher._loop_by_level(api, '1.1', None)
+                self.assertEqual(m.call_count, 1, stream)
+            self.assertEqual(len(self._read('stock_infos')), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import shutil
+import unittest
+from urllib.request import Request, urlopen
+
+from cnswd.websource.cninfo.data_browse import DataBrowse
+from cnswd.websource.cninfo.standin_site import StandInSite
+
+
+def _post(url, params):
+    req = Request(url, data=json.dumps(params).encode('utf-8'),
+                  headers={'Content-Type': 'application/json'})
+    with urlopen(req) as r:
+        return json.loads(r.read().decode('utf-8'))
+
+
+class StandInSiteTestCase(unittest.TestCase):
+    """深证信网站替身测试"""
+
+    def setUp(self):
+        self.site = StandInSite(rows={'3.1': 25}, columns=5, codes_per_market=3)
+        self.site.__enter__()
+
+    def tearDown(self):
+        self.site.__exit__()
+
+    def test_page(self):
+        """测试单页应用网页"""
+        with urlopen(self.site.base_url) as r:
+            html = r.read().decode('utf-8')
+        self.assertIn('dataBrowseBtn', html)
+        self.assertIn('thematicStatisticsBtn', html)
+
+    def test_query(self):
+        """测试按已选代码、字段生成数据"""
+        url = f'{self.site.base_url}/data'
+        res = _post(url, {'page': 'dataBrowse', 'level': '3.1',
+                          'codes': ['000001'], 'fields': [0, 2]})
+        self.assertListEqual(res['headers'], ['证券代码', '日期'])
+        self.assertEqual(len(res['rows']), 25)
+        # 未选代码时无数据
+        res = _post(url, {'page': 'dataBrowse', 'level': '3.1', 'codes': []})
+        self.assertEqual(len(res['rows']), 0)
+        codes = _post(f'{self.site.base_url}/codes', {'market': '沪市A'})['codes']
+        self.assertListEqual([c for c, _ in codes], ['600001', '600002', '600003'])
+        self.assertEqual(self.site.pages(10), 3 + 1)
+
+    @unittest.skipUnless(shutil.which('geckodriver'), '需要Firefox及geckodriver')
+    def test_data_browse(self):
+        """测试数据搜索页面对象各读取方式结果一致"""
+        for table in ('model', 'expand', 'pages'):
+            self.site.table = table
+            with DataBrowse(clear_cache=False, base_url=self.site.base_url) as api:
+                df = api.get_data('3.1', '2018-01-02', '2018-01-02')
+            self.assertEqual(len(df), 25, table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import re
 from pandas.testing import assert_frame_equal
 from numpy.testing import assert_array_almost_equal
 from cnswd.scripts.cninfo.units import (
-    _fix_date, _fix_code,
+    _fix_date, _fix_code, _compile_plan,
     parse_unit,
     _fix_num_unit, get_unit_dict,
     _remove_prefix_num, _remove_suffix_unit
@@ -43,6 +43,14 @@ class FixTestCase(unittest.TestCase):
         })
         assert_frame_equal(actual, expected)
 
+    def test_fix_numeric_code(self):
+        """测试数字代码补齐"""
+        origin = pd.DataFrame({'证券代码': [1, 999999, 1234567, -3, None]})
+        actual = _fix_code(origin)
+        self.assertListEqual(actual['证券代码'].tolist()[:4],
+                             ['000001', '999999', '1234567', '-00003'])
+        self.assertTrue(pd.isna(actual['证券代码'][4]))
+
     def test_parse_unit(self):
         """测试解析数量单位"""
         col_names = ['境内上市外资股（B股）', '境外上市外资股（H股）', '发行规模(万股)',
@@ -64,6 +72,18 @@ class FixTestCase(unittest.TestCase):
         for col, adj in units.items():
             assert_array_almost_equal(origin[col] * adj, actual[col])
 
+    def test_compile_plan(self):
+        """测试缓存的修复方案不可修改"""
+        columns = ('股票代码', '股票简称', '上市日期', '发行规模(万股)')
+        code_cols, date_cols, units, names = _compile_plan('1', 'db', columns)
+        self.assertEqual(code_cols, ('股票代码',))
+        self.assertEqual(date_cols, ('上市日期',))
+        self.assertEqual(names, ('证券代码', '证券简称', '上市日期', '发行规模'))
+        with self.assertRaises(TypeError):
+            units['发行规模(万股)'] = 1
+        self.assertIs(_compile_plan('1', 'db', columns)[2], units)
+        self.assertEqual(units['发行规模(万股)'], 10000)
+
     def test_remove_prefix_num(self):
         """测试去除列名称中的前导数字"""
         origin = [
@@ -0,0 +1,107 @@
+import unittest
+
+import pandas as pd
+
+from cnswd.websource.cninfo.constants import DB_API, MARKET_PLATES, TS_API
+from cnswd.websource.cninfo.webapi import (DataBrowseClient,
+                                           ThematicStatisticsClient)
+from cnswd.websource.exceptions import RetryException
+
+from .standin import StandInServer
+
+FIELDS = [('SECCODE', '证券代码'), ('SECNAME', '证券简称'), ('F001D', '公告日期')]
+RECORDS = [
+    {'F001D': '20180105', 'SECNAME': '平安银行', 'SECCODE': '000001'},
+    {'F001D': '20180110', 'SECNAME': '深物业B', 'SECCODE': '200011'},
+    {'F001D': '20180301', 'SECNAME': '浦发银行', 'SECCODE': '600000'},
+    {'F001D': '20180105', 'SECNAME': '其他', 'SECCODE': '999999'},
+]
+# 逐项读取选项的专题统计项目
+OPTION_RECORDS = [
+    {'F001D': '20180105', 'SECNAME': '平安银行', 'SECCODE': '000001', 'type': '1'},
+    {'F001D': '20180110', 'SECNAME': '深物业B', 'SECCODE': '200011', 'type': '2'},
+    {'F001D': '20180301', 'SECNAME': '浦发银行', 'SECCODE': '600000', 'type': '3'},
+]
+CODES = {
+    MARKET_PLATES['深市A']: ['000001'],
+    MARKET_PLATES['深市B']: ['200011'],
+    MARKET_PLATES['沪市A']: ['600000'],
+}
+
+
+class WebApiClientTestCase(unittest.TestCase):
+    """深证信JSON接口测试"""
+
+    def setUp(self):
+        db_api, ts_api, option_api = DB_API['2.1'], TS_API['2.1'], TS_API['2.5']
+        self.server = StandInServer(
+            {db_api: FIELDS, ts_api: FIELDS, option_api: FIELDS, DB_API['1.1']: FIELDS},
+            {db_api: RECORDS, ts_api: RECORDS, option_api: OPTION_RECORDS,
+             DB_API['1.1']: RECORDS[:3]},
+            CODES, options={option_api: ['1', '2']})
+        self.server.__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_data_browse(self):
+        """测试数据搜索按期间、分批代码读取"""
+        with DataBrowseClient(base_url=self.server.base_url) as api:
+            self.assertEqual(api.stock_code_list,
+                             ('000001', '200011', '600000'))
+            df = api.get_data('2.1', '2018-01-01', '2018-01-31')
+            self.assertTrue(api.is_available)
+        # 列名、列顺序与网页表格一致
+        self.assertListEqual(list(df.columns), [t for _, t in FIELDS])
+        # 不在代码列表中的记录被排除
+        self.assertListEqual(df['证券代码'].tolist(), ['000001', '200011'])
+
+    def test_fields_missing(self):
+        """测试无字段信息时保留原始列，字段与记录不符时报错"""
+        api = DB_API['2.1']
+        with DataBrowseClient(base_url=self.server.base_url) as client:
+            client._get_fields = lambda api: []
+            df = client._to_dataframe(api, RECORDS)
+            self.assertListEqual(list(df.columns), ['F001D', 'SECNAME', 'SECCODE'])
+            self.assertEqual(len(df), 4)
+            client._get_fields = lambda api: [('OTHER', '其他')]
+            with self.assertRaises(RetryException):
+                client._to_dataframe(api, RECORDS)
+
+    def test_iter_data(self):
+        """测试逐批读取与一次读取结果一致"""
+        with DataBrowseClient(base_url=self.server.base_url) as api:
+            expected = api.get_data('2.1', '2018-01-01', '2018-03-31')
+            pages = list(api.iter_data('2.1', '2018-01-01', '2018-03-31'))
+        self.assertGreater(len(pages), 0)
+        actual = pd.concat(pages, ignore_index=True)
+        self.assertTrue(actual.equals(expected.reset_index(drop=True)))
+
+    def test_thematic_statistics(self):
+        """测试专题统计读取"""
+        with ThematicStatisticsClient(base_url=self.server.base_url) as api:
+            df = api.get_data('2.1', '2018-01-01', '2018-03-31')
+        self.assertEqual(len(df), 4)
+        params = [p for a, p in self.server.requests if a == TS_API['2.1']]
+        self.assertTrue(all('sdate' in p for p in params))
+        # `全部`方式以空值一次读取
+        self.assertTrue(all(p['type'] == '' for p in params))
+
+    def test_thematic_statistics_options(self):
+        """测试专题统计逐项读取下拉选项"""
+        with ThematicStatisticsClient(base_url=self.server.base_url) as api:
+            df = api.get_data('2.5', '2018-01-01', '2018-03-31')
+            one = api.get_data('2.5', '2018-01-01', '2018-03-31', option='3')
+            with self.assertRaises(ValueError):
+                api.get_data('2.2', option='1')
+            with self.assertRaises(ValueError):
+                api.get_data('99.1')
+        # 只读取选项接口返回的选项
+        self.assertListEqual(df['证券代码'].tolist(), ['000001', '200011'])
+        self.assertListEqual(one['证券代码'].tolist(), ['600000'])
+        types = {p['type'] for a, p in self.server.requests if a == TS_API['2.5']}
+        self.assertSetEqual(types, {'1', '2', '3'})
+
+
+if __name__ == '__main__':
+    unittest.main()
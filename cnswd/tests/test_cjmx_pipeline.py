@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from cnswd.scripts.szsh.cjmx_pipeline import _write, pending_pairs, refresh_cjmx
+from cnswd.sql.szsh import CJMX, StockDaily
+from cnswd.websource.replay import FixtureStore, Transport, using
+from cnswd.websource.wy import _cjmx_url
+
+# 网易成交明细`.xls`，5行
+XLS = os.path.join(os.path.dirname(__file__), 'resources', 'wy_cjmx.xls')
+
+
+class CJMXPipelineTestCase(unittest.TestCase):
+    """成交明细流水线测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.engine = create_engine(
+            'sqlite:///' + os.path.join(self.root, 'szsh.db'))
+        for model in (StockDaily, CJMX):
+            model.__table__.create(self.engine)
+        daily = pd.DataFrame({
+            '股票代码': ['000001', '000002', '600000', '000001'],
+            '日期': pd.to_datetime(['2018-12-03'] * 3 + ['2018-12-04']),
+            '名称': ['平安银行', '万科A', '浦发银行', '平安银行'],
+            # 停牌股票成交量为0
+            '成交量': [100, 100, 0, 100],
+        })
+        daily.to_sql(StockDaily.__tablename__, self.engine,
+                     if_exists='append', index=False)
+        self.date = pd.Timestamp('2018-12-03')
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.root)
+
+    def _pending(self, codes=None):
+        session = Session(bind=self.engine)
+        try:
+            return pending_pairs(session, [self.date], codes)
+        finally:
+            session.close()
+
+    def test_pending_pairs(self):
+        """测试待办集合排除未交易及已写入项目"""
+        self.assertSetEqual(self._pending(), {('000001', self.date),
+                                              ('000002', self.date)})
+        df = pd.DataFrame({'股票代码': ['000001'], '成交价': [10.0],
+                           '成交时间': [pd.Timestamp('2018-12-03 09:30:00')]})
+        self.assertEqual(_write(self.engine, [df]), 1)
+        self.assertSetEqual(self._pending(), {('000002', self.date)})
+        self.assertSetEqual(self._pending(['000001']), set())
+
+    def test_refresh_without_web_data(self):
+        """测试并发下载，网页不存在的项目计入无数据"""
+        store = FixtureStore(os.path.join(self.root, 'fixtures'))
+        meta = {'status': 404, 'headers': {}, 'encoding': None, 'elapsed': 0}
+        for code in ('000001', '000002'):
+            url = _cjmx_url(code, self.date)
+            store.save(FixtureStore.key('GET', url), dict(meta, url=url), b'')
+        with using(Transport('replay', store)):
+            stats = refresh_cjmx([self.date], concurrency=2, rate=None,
+                                 processes=1, engine=self.engine)
+        self.assertEqual(stats['无数据'], 2)
+        self.assertEqual(stats['失败'], 0)
+
+    def test_refresh(self):
+        """测试下载、解析及写入"""
+        store = FixtureStore(os.path.join(self.root, 'fixtures'))
+        with open(XLS, 'rb') as f:
+            content = f.read()
+        url = _cjmx_url('000001', self.date)
+        store.save(FixtureStore.key('GET', url),
+                   {'url': url, 'status': 200, 'encoding': None, 'elapsed': 0,
+                    'headers': {'Content-Type': 'application/vnd.ms-excel'}}, content)
+        url = _cjmx_url('000002', self.date)
+        store.save(FixtureStore.key('GET', url),
+                   {'url': url, 'status': 404, 'encoding': None, 'elapsed': 0,
+                    'headers': {}}, b'')
+        with using(Transport('replay', store)):
+            stats = refresh_cjmx([self.date], concurrency=2, rate=None,
+                                 processes=1, engine=self.engine)
+        self.assertDictEqual(stats, {'项目': 2, '行数': 5, '无数据': 1, '失败': 0})
+        df = pd.read_sql_table(CJMX.__tablename__, self.engine)
+        self.assertListEqual(df['股票代码'].unique().tolist(), ['000001'])
+        self.assertTrue((df['成交时间'].dt.normalize() == self.date).all())
+        self.assertTrue(df['成交时间'].is_monotonic_increasing)
+        self.assertSetEqual(self._pending(), {('000002', self.date)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Float, Integer, SmallInteger, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+
+from cnswd.sql.coerce import coerce_frame, column_types
+from cnswd.sql.data_browse import Base, StockInfo
+
+NumBase = declarative_base()
+
+
+class Num(NumBase):
+    __tablename__ = 'nums'
+    序号 = Column(Integer, primary_key=True)
+    数量 = Column(Integer)
+    页码 = Column(SmallInteger)
+    价格 = Column(Float)
+
+
+class CoerceTestCase(unittest.TestCase):
+    """测试按数据模型转换数据类型"""
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            '证券代码': ['000001', '000002', '000003'],
+            '证券简称': ['平安银行', 2, None],
+            '上市日期': ['1991-04-03', 'x', None],
+            '注册资本': ['19405918198', 1.5, '-'],
+            '其他': [1, 2, 3],
+        })
+
+    def test_coerce(self):
+        """测试转换类型及错误值"""
+        actual = coerce_frame(self.df, StockInfo)
+        self.assertTrue(pd.api.types.is_datetime64_ns_dtype(actual['上市日期']))
+        self.assertTrue(pd.isna(actual['上市日期'][1]))
+        self.assertEqual(str(actual['注册资本'].dtype), 'float64')
+        self.assertTrue(np.isnan(actual['注册资本'][2]))
+        self.assertListEqual(actual['证券简称'].tolist(), ['平安银行', '2', None])
+        # 模型外的列保持不变
+        self.assertListEqual(actual['其他'].tolist(), [1, 2, 3])
+
+    def test_to_sql(self):
+        """测试按模型类型写入"""
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine, tables=[StockInfo.__table__])
+        df = coerce_frame(self.df.drop(columns='其他'), StockInfo)
+        df.to_sql(StockInfo.__tablename__, engine, if_exists='append',
+                  index=False, dtype=column_types(StockInfo, df.columns))
+        res = engine.execute(
+            'select typeof(上市日期), typeof(注册资本) from stock_infos').fetchall()
+        self.assertEqual(res[0], ('text', 'real'))
+
+    def test_int_range(self):
+        """测试整数列范围检查"""
+        df = pd.DataFrame({
+            '序号': [1, 2 ** 62 + 1, 3],
+            '数量': [1.0, 2.5, 1e20],
+            '页码': ['1', 40000, None],
+            '价格': [1.5, 1e300, None],
+        })
+        actual = coerce_frame(df, Num)
+        self.assertEqual(str(actual['序号'].dtype), 'Int64')
+        self.assertEqual(actual['序号'][1], 2 ** 62 + 1)
+        # 含小数、超出int64范围的值置为空值
+        self.assertListEqual(actual['数量'].isna().tolist(), [False, True, True])
+        # 超出SmallInteger范围
+        self.assertListEqual(actual['页码'].isna().tolist(), [False, True, True])
+        self.assertEqual(str(actual['价格'].dtype), 'float64')
+        self.assertEqual(actual['价格'][1], 1e300)
+        actual = coerce_frame(pd.DataFrame({'数量': ['18446744073709551615', '-3']}), Num)
+        self.assertListEqual(actual['数量'].isna().tolist(), [True, False])
+
+    def test_int_to_sql(self):
+        """测试可空整数写入值不变"""
+        engine = create_engine('sqlite://')
+        NumBase.metadata.create_all(engine)
+        df = pd.DataFrame({'序号': [1, 2], '数量': [3, None],
+                           '页码': [1, 2], '价格': [1.5, None]})
+        df = coerce_frame(df, Num)
+        df.to_sql(Num.__tablename__, engine, if_exists='append',
+                  index=False, dtype=column_types(Num, df.columns))
+        res = engine.execute('select 数量, 页码, 价格 from nums order by 序号').fetchall()
+        self.assertListEqual([tuple(r) for r in res], [(3, 1, 1.5), (None, 2, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
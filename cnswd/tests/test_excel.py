@@ -0,0 +1,63 @@
+import importlib.util
+import os
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from cnswd.websource.excel import _frame, available_engines, read_excel
+
+HAS_ALL = all(importlib.util.find_spec(m) for m in ('python_calamine', 'openpyxl'))
+XLSX = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                    'resources', 'szx_api.xlsx')
+# 网易成交明细格式，`.xls`由xlrd读取，不依赖calamine及openpyxl
+XLS = os.path.join(os.path.dirname(__file__), 'resources', 'wy_cjmx.xls')
+
+
+class ExcelTestCase(unittest.TestCase):
+    """电子表格读取测试"""
+
+    def test_frame(self):
+        """测试单元格数据解析：跳行、列选择、缺失值、千分位及类型"""
+        rows = [
+            ['标题', '', ''],
+            ['代码', '成交量', '日期'],
+            ['000001', '1,234', datetime(2018, 12, 3)],
+            ['000002', '--', datetime(2018, 12, 4)],
+        ]
+        df = _frame(rows, skiprows=[0], usecols=['代码', '成交量'],
+                    dtype={'代码': str}, na_values=['--'], thousands=',')
+        self.assertListEqual(list(df.columns), ['代码', '成交量'])
+        self.assertListEqual(list(df['代码']), ['000001', '000002'])
+        self.assertEqual(df['成交量'][0], 1234)
+        self.assertTrue(pd.isna(df['成交量'][1]))
+
+    def test_unknown_keyword(self):
+        """测试不支持的参数"""
+        with self.assertRaises(AssertionError):
+            read_excel(b'', converters={})
+
+    def test_pandas_engine(self):
+        """测试pandas引擎读取`.xls`文件"""
+        with open(XLS, 'rb') as f:
+            content = f.read()
+        df = read_excel(content, engine='pandas', na_values=['--'],
+                        dtype={0: str, 1: float, 2: float, 4: float, 5: str})
+        self.assertListEqual(list(df.columns),
+                             ['成交时间', '成交价', '价格变动', '成交量', '成交额', '性质'])
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df['成交时间'][0], '09:25:03')
+        self.assertTrue(pd.isna(df['价格变动'][0]))
+        self.assertEqual(df['成交量'].dtype, 'int64')
+        self.assertEqual(df['性质'][3], '中性盘')
+
+    @unittest.skipUnless(HAS_ALL, '需要安装python-calamine及openpyxl')
+    def test_engines_agree(self):
+        """测试各引擎读取结果一致"""
+        self.assertIn('calamine', available_engines())
+        expected = read_excel(XLSX, engine='pandas')
+        pd.testing.assert_frame_equal(read_excel(XLSX, engine='calamine'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
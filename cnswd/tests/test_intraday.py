@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cnswd.scripts.szsh.intraday import IntradayAnalytics
+
+
+def _quotes(code, time, volume, amount, bid1=9.99, ask1=10.0):
+    row = {'股票代码': code, '时间': pd.Timestamp(time), '成交量': volume, '成交额': amount,
+           '买1价': bid1, '卖1价': ask1}
+    for i in range(1, 6):
+        row[f'买{i}量'] = 300
+        row[f'卖{i}量'] = 100
+    return pd.DataFrame([row])
+
+
+class IntradayAnalyticsTestCase(unittest.TestCase):
+    """盘中报价指标测试"""
+
+    def test_update(self):
+        """测试区间值、均价、价差及失衡"""
+        op = IntradayAnalytics()
+        res = op.update(_quotes('000001', '2018-12-03 09:30:03', 1000, 10000.0))
+        self.assertEqual(res['区间成交量'].iloc[0], 1000)
+        res = op.update(pd.concat([_quotes('000001', '2018-12-03 09:30:06', 1500, 15100.0),
+                                   _quotes('000002', '2018-12-03 09:30:06', 200, 2000.0, 0, 10.0)]))
+        first = res.iloc[0]
+        self.assertEqual(first['区间成交量'], 500)
+        self.assertAlmostEqual(first['区间成交额'], 5100.0)
+        self.assertAlmostEqual(first['均价'], 15100.0 / 1500)
+        self.assertAlmostEqual(first['中间价'], 9.995)
+        self.assertAlmostEqual(first['价差'], 0.01)
+        self.assertAlmostEqual(first['失衡'], 0.5)
+        # 无买1价时中间价、价差为空
+        self.assertTrue(np.isnan(res.iloc[1]['中间价']))
+        self.assertTrue(np.isnan(res.iloc[1]['价差']))
+
+    def test_stale_and_new_day(self):
+        """测试重复时间及跨日"""
+        op = IntradayAnalytics()
+        op.update(_quotes('000001', '2018-12-03 15:00:03', 1000, 10000.0))
+        self.assertTrue(op.update(_quotes('000001', '2018-12-03 15:00:03', 1200, 12000.0)).empty)
+        res = op.update(_quotes('000001', '2018-12-04 09:25:03', 300, 3000.0))
+        self.assertEqual(res['区间成交量'].iloc[0], 300)
+        self.assertEqual(len(op), 1)
+
+    def test_seed(self):
+        """测试载入上次累计值后以差值计算区间值"""
+        op = IntradayAnalytics()
+        op.seed(_quotes('000001', '2018-12-03 10:00:00', 1000, 10000.0))
+        self.assertTrue(op.update(_quotes('000001', '2018-12-03 10:00:00', 1000, 10000.0)).empty)
+        res = op.update(_quotes('000001', '2018-12-03 10:00:03', 1200, 12000.0))
+        self.assertEqual(res['区间成交量'].iloc[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cnswd.sql.journal import (get_level_record, get_period_record,
+                               import_csv_records, set_level_record,
+                               set_period_record)
+
+
+class JournalTestCase(unittest.TestCase):
+    """刷新日志测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'stock.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_period_record(self):
+        """测试期间日志读写"""
+        self.assertIsNone(get_period_record('DataBrowse', '8.1.1', '全部', self.path))
+        set_period_record('DataBrowse', '8.1.1', '2018-07-01~2018-09-30', '完成', 10, 'abc',
+                          path_str=self.path)
+        d = get_period_record('DataBrowse', '8.1.1', '2018-07-01~2018-09-30', self.path)
+        self.assertEqual(d['状态'], '完成')
+        self.assertEqual(d['行数'], 10)
+        self.assertEqual(d['哈希值'], 'abc')
+        # 再次保存时覆盖
+        set_period_record('DataBrowse', '8.1.1', '2018-07-01~2018-09-30', '完成', 12, 'def',
+                          path_str=self.path)
+        d = get_period_record('DataBrowse', '8.1.1', '2018-07-01~2018-09-30', self.path)
+        self.assertEqual((d['行数'], d['哈希值']), (12, 'def'))
+
+    def test_import_csv_records(self):
+        """测试导入旧版状态文件"""
+        csv_path = os.path.join(self.root, 'cninfo.csv')
+        pd.DataFrame({'完成状态': ['完成', '异常'], '尝试次数': [1, 3],
+                      '完成时间': ['2018-12-03 08:00:00', '2018-12-03 09:00:00'],
+                      '备注': [None, '超时']},
+                     index=['DataBrowse1.1', 'DataBrowse2.1']).to_csv(csv_path)
+        set_level_record('DataBrowse1.1', {'完成状态': '未执行', '尝试次数': 0,
+                                           '完成时间': '2018-12-04', '备注': ''}, self.path)
+        self.assertEqual(import_csv_records(csv_path, self.path), 1)
+        # 已有记录保持不变
+        self.assertEqual(get_level_record('DataBrowse1.1', self.path)['完成状态'], '未执行')
+        d = get_level_record('DataBrowse2.1', self.path)
+        self.assertEqual((d['完成状态'], d['尝试次数'], d['备注']), ('异常', 3, '超时'))
+
+
+if __name__ == '__main__':
+    unittest.main()
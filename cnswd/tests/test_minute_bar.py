@@ -0,0 +1,122 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cnswd.scripts.szsh.minute_bar import aggregate, read_bars, refresh_minute_bars
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import CJMX
+from cnswd.tick_store import TickStore
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+def _ticks(code, date):
+    times = pd.to_datetime([f'{date} {t}' for t in (
+        '09:25:00', '09:30:00', '09:30:59', '09:31:00', '11:30:00',
+        '13:00:02', '14:59:59', '15:00:00')])
+    return pd.DataFrame({
+        '股票代码': code, '成交时间': times,
+        '成交价': [10.0, 10.1, 9.9, 10.2, 10.3, 10.4, 10.5, 10.6],
+        '成交量': 100, '成交额': 1000.0,
+        '性质': ['买盘', '卖盘', '中性盘', '买盘', '买盘', '卖盘', '买盘', '买盘'],
+    })
+
+
+class MinuteBarTestCase(unittest.TestCase):
+    """分钟线汇总测试"""
+
+    def test_aggregate(self):
+        """测试时间归属及各周期汇总"""
+        bars = aggregate(_ticks('000001', '2018-12-03'))
+        m1 = bars[bars['周期'] == 1].set_index('时间')
+        # 集合竞价并入首根分钟线
+        first = m1.loc['2018-12-03 09:31']
+        self.assertListEqual([first['开盘'], first['最高'], first['最低'], first['收盘']],
+                             [10.0, 10.1, 9.9, 9.9])
+        self.assertEqual(first['成交笔数'], 3)
+        self.assertEqual(first['买盘成交量'], 100)
+        self.assertEqual(first['卖盘成交量'], 100)
+        self.assertIn(pd.Timestamp('2018-12-03 13:01'), m1.index)
+        self.assertEqual(m1.loc['2018-12-03 15:00', '成交量'], 200)
+
+        m60 = bars[bars['周期'] == 60].set_index('时间')
+        self.assertListEqual([t.strftime('%H:%M') for t in m60.index],
+                             ['10:30', '11:30', '14:00', '15:00'])
+        self.assertEqual(m60['成交量'].sum(), 800)
+        self.assertEqual(m60.loc['2018-12-03 10:30', '收盘'], 10.2)
+
+    def test_incremental_refresh(self):
+        """测试只汇总新增日期"""
+        root = tempfile.mkdtemp()
+        engine = get_engine(None, path_str=os.path.join(root, 'szsh.db'))
+        store = TickStore(os.path.join(root, 'ticks'))
+        kws = {'freqs': (1, 5), 'engine': engine, 'store': store}
+        try:
+            CJMX.__table__.create(engine)
+            _ticks('000001', '2018-12-03').to_sql(
+                CJMX.__tablename__, engine, if_exists='append', index=False)
+            self.assertEqual(refresh_minute_bars(**kws), 5 + 4)
+            self.assertEqual(refresh_minute_bars(**kws), 0)
+            _ticks('000001', '2018-12-04').to_sql(
+                CJMX.__tablename__, engine, if_exists='append', index=False)
+            self.assertEqual(refresh_minute_bars(**kws), 9)
+            df = read_bars(['000001'], '2018-12-04', '2018-12-04', freq=5, engine=engine)
+            self.assertEqual(len(df), 4)
+        finally:
+            store.engine.dispose()
+            engine.dispose()
+            shutil.rmtree(root)
+
+    def test_skip_old_days(self):
+        """测试再次刷新时不再检查已有分钟线最后日期之前的成交明细"""
+        root = tempfile.mkdtemp()
+        engine = get_engine(None, path_str=os.path.join(root, 'szsh.db'))
+        store = TickStore(os.path.join(root, 'ticks'))
+        kws = {'freqs': (1,), 'engine': engine, 'store': store}
+        try:
+            CJMX.__table__.create(engine)
+            _ticks('000001', '2018-12-03').to_sql(
+                CJMX.__tablename__, engine, if_exists='append', index=False)
+            self.assertEqual(refresh_minute_bars(**kws), 5)
+            # 补录更早日期及新增日期
+            pd.concat([_ticks('000001', '2018-11-30'), _ticks('000002', '2018-12-03'),
+                       _ticks('000001', '2018-12-04')]).to_sql(
+                CJMX.__tablename__, engine, if_exists='append', index=False)
+            self.assertEqual(refresh_minute_bars(**kws), 10)
+            df = read_bars(start='2018-11-30', end='2018-11-30', engine=engine)
+            self.assertTrue(df.empty)
+            # 指定开始日期时补汇总
+            self.assertEqual(refresh_minute_bars(start='2018-11-30', **kws), 5)
+            self.assertEqual(refresh_minute_bars(start='2018-11-30', **kws), 0)
+        finally:
+            store.engine.dispose()
+            engine.dispose()
+            shutil.rmtree(root)
+
+    @unittest.skipUnless(HAS_PYARROW, '需要安装pyarrow')
+    def test_tick_store(self):
+        """测试汇总成交明细存储中的成交，同一股票日期不重复计算"""
+        root = tempfile.mkdtemp()
+        engine = get_engine(None, path_str=os.path.join(root, 'szsh.db'))
+        store = TickStore(os.path.join(root, 'ticks'))
+        try:
+            CJMX.__table__.create(engine)
+            _ticks('000001', '2018-12-03').to_sql(
+                CJMX.__tablename__, engine, if_exists='append', index=False)
+            store.append(pd.concat([_ticks('000001', '2018-12-03'),
+                                    _ticks('000002', '2018-12-03')]))
+            self.assertEqual(refresh_minute_bars(freqs=(1,), engine=engine, store=store), 10)
+            df = read_bars(start='2018-12-03', end='2018-12-03', engine=engine)
+            self.assertListEqual(df.groupby('股票代码')['成交量'].sum().tolist(), [800, 800])
+        finally:
+            store.engine.dispose()
+            engine.dispose()
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy.exc import OperationalError
+
+from cnswd.scripts.szsh.intraday import IntradayAnalytics, read_intraday_stats
+from cnswd.scripts.szsh.quote_poller import QuotePoller
+from cnswd.scripts.szsh.snapshot import QuoteSnapshot
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import LiveQuote
+from cnswd.websource.replay import FixtureStore, Transport, using
+
+URL = 'http://hq.sinajs.cn/list=sz000001,sz000002'
+
+
+def _line(code, name, volume, bid1):
+    today = pd.Timestamp('today').strftime('%Y-%m-%d')
+    levels = [f'100,{bid1}'] + ['100,10.00'] * 9
+    fields = [name, '10.00', '9.90', '10.00', '10.10', '9.80', '9.99', '10.00',
+              str(volume), str(volume * 10)] + levels + [today, '10:00:00', '00']
+    return f'var hq_str_sz{code}="{",".join(fields)}";'
+
+
+class QuotePollerTestCase(unittest.TestCase):
+    """实时报价轮询测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.engine = get_engine(None, path_str=os.path.join(self.root, 'szsh.db'))
+        LiveQuote.__table__.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.root)
+
+    def _transport(self, name, lines):
+        store = FixtureStore(os.path.join(self.root, name))
+        meta = {'url': URL, 'status': 200, 'encoding': 'gb18030', 'elapsed': 0,
+                'headers': {'Content-Type': 'application/javascript; charset=GBK'}}
+        store.save(FixtureStore.key('GET', URL), meta, '\n'.join(lines).encode('gb18030'))
+        return Transport('replay', store)
+
+    def _poll(self, poller, transport):
+        with using(transport):
+            return asyncio.run(poller.poll_once(None))
+
+    def test_delta_write(self):
+        """测试只写入变化的行"""
+        poller = QuotePoller(codes=['000001', '000002'], engine=self.engine,
+                             snapshot=QuoteSnapshot(), analytics=IntradayAnalytics())
+        first = self._transport('a', [_line('000001', '平安银行', 1000, '9.99'),
+                                      _line('000002', '万科A', 2000, '9.99')])
+        self.assertEqual(self._poll(poller, first), 2)
+        self.assertEqual(self._poll(poller, first), 0)
+        # 一只股票成交量变化，另一只不变
+        second = self._transport('b', [_line('000001', '平安银行', 1100, '9.99'),
+                                       _line('000002', '万科A', 2000, '9.99')])
+        self.assertEqual(self._poll(poller, second), 1)
+        # 只有五档报价变化
+        third = self._transport('c', [_line('000001', '平安银行', 1100, '9.99'),
+                                      _line('000002', '万科A', 2000, '9.98')])
+        self.assertEqual(self._poll(poller, third), 1)
+        df = pd.read_sql(f'SELECT 股票代码 FROM {LiveQuote.__tablename__} ORDER BY 序号',
+                         self.engine)
+        self.assertListEqual(df['股票代码'].tolist(), ['000001', '000002', '000001', '000002'])
+        self.assertListEqual(poller.snapshot.get()['成交量'].tolist(), [1100, 2000])
+        stats = read_intraday_stats(engine=self.engine)
+        self.assertListEqual(stats['区间成交量'].tolist(), [1000, 2000])
+
+    def test_failed_write(self):
+        """测试写入失败时不更新快照及指标状态，下次轮询重新写入"""
+        poller = QuotePoller(codes=['000001', '000002'], engine=self.engine,
+                             analytics=IntradayAnalytics())
+        first = self._transport('a', [_line('000001', '平安银行', 1000, '9.99'),
+                                      _line('000002', '万科A', 2000, '9.99')])
+        error = OperationalError('INSERT', {}, Exception('database is locked'))
+        with mock.patch.object(poller, '_write', side_effect=error):
+            with self.assertRaises(OperationalError):
+                self._poll(poller, first)
+        self.assertIsNone(poller.last)
+        self.assertEqual(self._poll(poller, first), 2)
+        stats = read_intraday_stats(engine=self.engine)
+        self.assertListEqual(stats['区间成交量'].tolist(), [1000, 2000])
+
+    def test_restart(self):
+        """测试重新启动后恢复状态，不重复写入，区间值与上次报价比较"""
+        first = self._transport('a', [_line('000001', '平安银行', 1000, '9.99'),
+                                      _line('000002', '万科A', 2000, '9.99')])
+        poller = QuotePoller(codes=['000001', '000002'], engine=self.engine,
+                             analytics=IntradayAnalytics())
+        self.assertEqual(self._poll(poller, first), 2)
+        poller = QuotePoller(codes=['000001', '000002'], engine=self.engine,
+                             analytics=IntradayAnalytics())
+        self.assertEqual(poller.restore(), 2)
+        self.assertEqual(self._poll(poller, first), 0)
+        second = self._transport('b', [_line('000001', '平安银行', 1100, '9.99'),
+                                       _line('000002', '万科A', 2000, '9.99')])
+        self.assertEqual(self._poll(poller, second), 1)
+        stats = read_intraday_stats(engine=self.engine)
+        self.assertListEqual(stats['区间成交量'].tolist(), [1000, 2000])
+
+    def test_existing_stats(self):
+        """测试未恢复状态时，已有指标不致写入失败"""
+        first = self._transport('a', [_line('000001', '平安银行', 1000, '9.99'),
+                                      _line('000002', '万科A', 2000, '9.99')])
+        for _ in range(2):
+            poller = QuotePoller(codes=['000001', '000002'], engine=self.engine,
+                                 analytics=IntradayAnalytics())
+            self.assertEqual(self._poll(poller, first), 2)
+        self.assertEqual(len(read_intraday_stats(engine=self.engine)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
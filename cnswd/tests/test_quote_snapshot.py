@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import unittest
+
+import pandas as pd
+
+from cnswd.scripts.szsh.snapshot import VALUE_COLS, QuoteSnapshot, read_snapshot, start_server
+
+
+def _quotes(codes, price, time):
+    df = pd.DataFrame({c: price for c in VALUE_COLS}, index=range(len(codes)))
+    df.insert(0, '股票代码', codes)
+    df.insert(1, '股票简称', [f'股票{c}' for c in codes])
+    df['时间'] = pd.Timestamp(time)
+    return df
+
+
+class QuoteSnapshotTestCase(unittest.TestCase):
+    """最新报价快照测试"""
+
+    def test_update(self):
+        """测试新增、替换及忽略较早报价"""
+        snapshot = QuoteSnapshot()
+        self.assertEqual(snapshot.update(_quotes(['000001', '000002'], 10.0, '2018-12-03 10:00')), 2)
+        self.assertEqual(snapshot.update(_quotes(['000002', '600000'], 11.0, '2018-12-03 10:01')), 2)
+        self.assertEqual(snapshot.update(_quotes(['000001'], 9.0, '2018-12-03 09:59')), 0)
+        self.assertEqual(len(snapshot), 3)
+        df = snapshot.get(['600000', '000001', '999999'])
+        self.assertListEqual(df['股票代码'].tolist(), ['600000', '000001'])
+        self.assertListEqual(df['现价'].tolist(), [11.0, 10.0])
+        self.assertEqual(snapshot.get('000002')['时间'].iloc[0], pd.Timestamp('2018-12-03 10:01'))
+
+    def test_server(self):
+        """测试本机查询服务"""
+        snapshot = QuoteSnapshot()
+        snapshot.update(_quotes(['000001', '000002'], 10.0, '2018-12-03 10:00'))
+        loop = asyncio.new_event_loop()
+        runner = loop.run_until_complete(start_server(snapshot, port=0))
+        port = runner.addresses[0][1]
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            df = read_snapshot(port=port)
+            self.assertListEqual(df['股票代码'].tolist(), ['000001', '000002'])
+            df = read_snapshot('000002', port=port)
+            self.assertEqual(len(df), 1)
+            self.assertEqual(df['现价'].iloc[0], 10.0)
+            self.assertEqual(df['时间'].iloc[0], pd.Timestamp('2018-12-03 10:00'))
+        finally:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cnswd.websource.base import get_page_response
+from cnswd.websource.exceptions import NoFixture
+from cnswd.websource.replay import (FixtureStore, Transport, async_request,
+                                   using)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content = f'路径{self.path}'.encode('gb18030')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=gb18030')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayTestCase(unittest.TestCase):
+    """网络请求录制与回放测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = 'http://{}:{}'.format(*self.server.server_address)
+        self.url = self.host + '/a?x=1'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root)
+
+    def test_record_and_replay(self):
+        """测试录制后离线回放，内容一致"""
+        store = FixtureStore(self.root)
+        with using(Transport('record', store)):
+            expected = get_page_response(self.url).text
+            asyncio.run(_async_text(self.host + '/b?random=0.123'))
+        self.assertEqual(len(store), 2)
+        # 关闭服务器，以确保回放不访问网络
+        self.server.shutdown()
+        with using(Transport('replay', store)):
+            self.assertEqual(get_page_response(self.url).text, expected)
+            # 防缓存随机参数不影响回放
+            text = asyncio.run(_async_text(self.host + '/b?random=0.456'))
+            self.assertEqual(text, '路径/b?random=0.123')
+            with self.assertRaises(NoFixture):
+                get_page_response(self.url + '&x=2')
+
+    def test_rate_limit(self):
+        """测试回放时按网站限制访问频率"""
+        store = FixtureStore(self.root)
+        with using(Transport('record', store)):
+            get_page_response(self.url)
+        with using(Transport('replay', store, latency=0, rate=20)):
+            start = time.time()
+            for _ in range(4):
+                get_page_response(self.url)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+
+async def _async_text(url):
+    r = await async_request(None, 'GET', url)
+    return await r.text()
+
+
+if __name__ == '__main__':
+    unittest.main()
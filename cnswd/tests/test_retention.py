@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cnswd.scripts.szsh.retention import archive, read_all
+from cnswd.sql.base import get_engine
+from cnswd.sql.szsh import CJMX, LiveQuote, TradingCalendar
+
+
+class RetentionTestCase(unittest.TestCase):
+    """滚动保留测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.hot = os.path.join(self.root, 'szsh.db')
+        self.backup = os.path.join(self.root, 'backup.db')
+        engine = get_engine(None, path_str=self.hot)
+        for model in (CJMX, LiveQuote, TradingCalendar):
+            model.__table__.create(engine)
+        days = pd.bdate_range('2018-11-01', '2018-12-31')
+        pd.DataFrame({'日期': days, '交易日': True}).to_sql(
+            TradingCalendar.__tablename__, engine, if_exists='append', index=False)
+        times = np.repeat(days, 10) + pd.Timedelta('09:30:00')
+        pd.DataFrame({'股票代码': '000001', '成交时间': times, '成交价': 10.0}).to_sql(
+            CJMX.__tablename__, engine, if_exists='append', index=False)
+        pd.DataFrame({'股票代码': '000001', '时间': times, '现价': 10.0}).to_sql(
+            LiveQuote.__tablename__, engine, if_exists='append', index=False)
+        self.engine = engine
+        self.total = len(times)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.root)
+
+    def _count(self, table):
+        return pd.read_sql(f'SELECT count(*) AS n FROM {table}', self.engine)['n'][0]
+
+    def test_archive(self):
+        """测试分批移动、重复运行及合并读取"""
+        kws = {'keep_days': 5, 'hot_path': self.hot, 'backup_path': self.backup}
+        res = archive(batch_size=37, **kws)
+        moved = self.total - 50
+        self.assertDictEqual(res, {CJMX.__tablename__: moved,
+                                   LiveQuote.__tablename__: moved})
+        self.assertEqual(self._count(CJMX.__tablename__), 50)
+        # 再次运行无数据移动
+        self.assertEqual(sum(archive(**kws).values()), 0)
+
+        df = read_all(CJMX.__tablename__, hot_path=self.hot, backup_path=self.backup)
+        self.assertEqual(len(df), self.total)
+        self.assertTrue(df['成交时间'].is_monotonic_increasing)
+        df = read_all(LiveQuote.__tablename__, '2018-12-20', '2018-12-27', ['000001'],
+                      hot_path=self.hot, backup_path=self.backup)
+        self.assertEqual(len(df), 50)
+
+    def test_conflict(self):
+        """测试备份中序号相同的不同数据不致丢失"""
+        kws = {'keep_days': 5, 'hot_path': self.hot, 'backup_path': self.backup}
+        archive(**kws)
+        # 热数据库重建后序号重新开始
+        self.engine.dispose()
+        os.remove(self.hot)
+        engine = get_engine(None, path_str=self.hot)
+        CJMX.__table__.create(engine)
+        pd.DataFrame({'股票代码': '000002', '成交时间': [pd.Timestamp('2018-11-01 09:30')],
+                      '成交价': 20.0}).to_sql(
+            CJMX.__tablename__, engine, if_exists='append', index=False)
+        self.engine = engine
+        self.assertDictEqual(archive(**kws), {CJMX.__tablename__: 1})
+        df = read_all(CJMX.__tablename__, codes=['000002'],
+                      hot_path=self.hot, backup_path=self.backup)
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df['成交价'][0], 20.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
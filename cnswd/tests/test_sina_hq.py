@@ -0,0 +1,41 @@
+import unittest
+
+from cnswd.websource.sina import parse_hq
+
+
+def _line(prefix, code, volume='100', extra=()):
+    levels = ['100,9.99'] * 10
+    fields = ['平安银行', '10.00', '9.90', '10.00', '10.10', '9.80', '9.99', '10.00',
+              volume, '1000.000'] + levels + ['2018-12-03', '15:00:03', '00'] + list(extra)
+    return f'var hq_str_{prefix}{code}="{",".join(fields)}";'
+
+
+class ParseHqTestCase(unittest.TestCase):
+    """实时报价解析测试"""
+
+    def test_parse(self):
+        """测试类型、停牌及多余字段"""
+        content = '\n'.join([_line('sz', '000001'),
+                             'var hq_str_sz000002="";',
+                             _line('sh', '600000', extra=('', '0'))])
+        df = parse_hq(content)
+        self.assertListEqual(df['股票代码'].tolist(), ['000001', '600000'])
+        self.assertEqual(df['成交量'].dtype, 'int64')
+        self.assertEqual(df['买1价'].dtype, 'float64')
+        self.assertEqual(df['时间'].iloc[1], '15:00:03')
+        self.assertEqual(df.shape[1], 33)
+
+    def test_fallback(self):
+        """测试非整数成交量以浮点数读取"""
+        df = parse_hq(_line('sz', '000001', volume=''))
+        self.assertEqual(df['成交量'].dtype, 'float64')
+        self.assertTrue(df['成交量'].isna().all())
+
+    def test_empty(self):
+        df = parse_hq('var hq_str_sz000002="";')
+        self.assertTrue(df.empty)
+        self.assertEqual(df['成交额'].dtype, 'float64')
+
+
+if __name__ == '__main__':
+    unittest.main()
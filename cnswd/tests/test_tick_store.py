@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from cnswd.tick_store import TickStore
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+def _ticks(code, date, n=5):
+    times = pd.Timestamp(date) + pd.Timedelta('09:30:00') + \
+        pd.to_timedelta(np.arange(n) * 3, unit='s')
+    return pd.DataFrame({
+        '股票代码': code, '成交时间': times, '成交价': 10.0, '价格变动': 0.0,
+        '成交量': 100, '成交额': 1000.0, '性质': '买盘',
+    })
+
+
+class TickStoreTestCase(unittest.TestCase):
+    """成交明细存储测试"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = TickStore(self.root)
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        shutil.rmtree(self.root)
+
+    def test_empty(self):
+        """测试空存储"""
+        self.assertFalse(self.store.has('000001', '2018-12-03'))
+        self.assertSetEqual(self.store.stored(), set())
+        self.assertTrue(self.store.read('000001').empty)
+
+    @unittest.skipUnless(HAS_PYARROW, '需要安装pyarrow')
+    def test_append_and_read(self):
+        """测试追加、清单检查、过滤读取及合并"""
+        df = pd.concat([_ticks('000001', '2018-12-03'), _ticks('000002', '2018-12-03'),
+                        _ticks('000001', '2018-12-04')])
+        self.assertEqual(self.store.append(df), 15)
+        # 已登记项目不重复写入
+        self.assertEqual(self.store.append(df), 0)
+        self.assertEqual(self.store.append(_ticks('600000', '2018-12-03')), 5)
+        self.assertTrue(self.store.has('000001', '2018-12-04'))
+        self.assertFalse(self.store.has('000002', '2018-12-04'))
+
+        res = self.store.read('000001', '2018-12-04', '2018-12-04', columns=['成交价'])
+        self.assertListEqual(list(res.columns), ['成交价'])
+        self.assertEqual(len(res), 5)
+        self.assertEqual(len(self.store.read(start='2018-12-03', end='2018-12-03')), 15)
+
+        self.store.compact('2018-12-03')
+        summary = self.store.summary().set_index('日期')
+        self.assertEqual(summary['文件数量'].sum(), 2)
+        day_dir = os.path.join(self.root, '2018', '20181203')
+        self.assertEqual(len(os.listdir(day_dir)), 1)
+        self.assertEqual(len(self.store.read()), 20)
+
+    @unittest.skipUnless(HAS_PYARROW, '需要安装pyarrow')
+    def test_mixed_types(self):
+        """测试整数与含空值的批次以相同类型写入，可合并读取"""
+        self.store.append(_ticks('000001', '2018-12-03'))
+        df = _ticks('000002', '2018-12-03')
+        df['成交量'] = df['成交量'].astype('float64')
+        df.loc[0, '成交量'] = np.nan
+        self.store.append(df.drop(columns=['价格变动']))
+        res = self.store.read(start='2018-12-03', end='2018-12-03')
+        self.assertEqual(len(res), 10)
+        self.assertEqual(res['成交量'].isna().sum(), 1)
+        self.assertEqual(res['价格变动'].isna().sum(), 5)
+        self.store.compact('2018-12-03')
+        self.assertEqual(len(self.store.read()), 10)
+
+    @unittest.skipUnless(HAS_PYARROW, '需要安装pyarrow')
+    def test_compact_orphans(self):
+        """测试合并后旧文件无法删除时，清单仍指向新文件"""
+        self.store.append(_ticks('000001', '2018-12-03'))
+        self.store.append(_ticks('000002', '2018-12-03'))
+        with mock.patch('os.remove', side_effect=PermissionError('占用')):
+            self.store.compact('2018-12-03')
+        self.assertEqual(self.store.summary()['文件数量'].sum(), 1)
+        self.assertEqual(len(self.store.read()), 10)
+        day_dir = os.path.join(self.root, '2018', '20181203')
+        self.assertEqual(len(os.listdir(day_dir)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cnswd.utils import combine_date_time, normalize_ticks
+
+
+class TickUtilsTestCase(unittest.TestCase):
+    """成交明细整理测试"""
+
+    def test_combine_date_time(self):
+        """测试向量化合并与逐项解析结果一致"""
+        times = pd.Series(['09:25:00', '11:29:59', '14:59:03'])
+        expected = times.map(lambda x: pd.Timestamp('2018-12-03 {}'.format(x)))
+        res = combine_date_time('2018-12-03', times)
+        self.assertTrue((res == pd.DatetimeIndex(expected)).all())
+        # 非固定格式回退至逐项解析
+        res = combine_date_time('2018-12-03', pd.Series(['9:30:00', np.nan]))
+        self.assertEqual(res[0], pd.Timestamp('2018-12-03 09:30:00'))
+        self.assertTrue(pd.isna(res[1]))
+
+    def test_normalize_ticks(self):
+        """测试就地整理：合并时间、调整成交量、截断小数并排序"""
+        df = pd.DataFrame({
+            '时间': ['09:30:03', '09:30:00'],
+            '成交量': [1, 2],
+            '成交额': [0.29, np.nan],
+            '价格变动': [-0.019, 0.0],
+        })
+        res = normalize_ticks(df, '2018-12-03', time_col='时间', volume_scale=100,
+                              truncate=('成交额', '价格变动'))
+        self.assertIs(res, df)
+        self.assertNotIn('时间', df)
+        self.assertListEqual(list(df['成交量']), [200, 100])
+        self.assertEqual(df['成交时间'].iat[0], pd.Timestamp('2018-12-03 09:30:00'))
+        self.assertAlmostEqual(df['成交额'].iat[1], 0.29)
+        self.assertAlmostEqual(df['价格变动'].iat[1], -0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
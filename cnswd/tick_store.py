@@ -0,0 +1,319 @@
+"""
+成交明细存储
+
+以压缩Parquet文件按日期分区保存成交明细，取代逐项(股票代码, 日期)的pickle文件：
+    <root>/<yyyy>/<yyyymmdd>/part-<随机标识>.parquet
+
+每次追加为每个日期写入一个文件，文件内按股票代码、成交时间排序，以利于按行组统计过滤。
+清单(`manifest.db`)登记每个(股票代码, 日期)所在文件，存在性检查无需访问文件系统。
+读取时先由清单选取文件，再以过滤条件下推至Parquet读取，只读取所需列。
+各文件均按`COLUMNS`固定列类型写入，不同来源、不同批次的文件可以合并读取。
+
+需要安装pyarrow：
+$ pip install pyarrow
+
+用法：
+    >>> store = TickStore()
+    >>> store.append(df)
+    >>> store.has('000001', '2018-12-03')
+    >>> df = store.read(['000001'], '2018-12-01', '2018-12-31', columns=['成交时间', '成交价'])
+"""
+import os
+import uuid
+
+import logbook
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from cnswd.sql.base import get_engine
+from cnswd.sql.tick_manifest import Base, TickPartition
+from cnswd.utils import data_root, ensure_list
+
+logger = logbook.Logger('成交明细存储')
+
+MANIFEST_NAME = 'manifest.db'
+COMPRESSION = 'zstd'
+ROW_GROUP_SIZE = 100000
+IMPORT_BATCH_ROWS = 2000000  # 导入旧文件时每批行数
+COLUMNS = ['股票代码', '成交时间', '成交价', '价格变动', '成交量', '成交额', '性质']
+
+
+def _pq():
+    """延迟导入，仅在读写文件时需要pyarrow"""
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('成交明细存储需要安装pyarrow：pip install pyarrow')
+    return pyarrow, pq
+
+
+def _schema(pa, columns=COLUMNS):
+    """固定列类型，`成交量`以可空整数保存"""
+    types = {
+        '股票代码': pa.string(),
+        '成交时间': pa.timestamp('ns'),
+        '成交价': pa.float64(),
+        '价格变动': pa.float64(),
+        '成交量': pa.int64(),
+        '成交额': pa.float64(),
+        '性质': pa.string(),
+    }
+    return pa.schema([(c, types[c]) for c in columns])
+
+
+def _to_date(d):
+    return pd.Timestamp(d).date()
+
+
+class TickStore(object):
+    """成交明细存储
+
+    Keyword Arguments:
+        root {str} -- 存储目录 (default: {data_root('ticks')})
+    """
+
+    def __init__(self, root=None):
+        self.root = root or data_root('ticks')
+        os.makedirs(self.root, exist_ok=True)
+        self.engine = get_engine(None, path_str=os.path.join(self.root, MANIFEST_NAME))
+        Base.metadata.create_all(self.engine)
+        self._Session = sessionmaker(bind=self.engine)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.root})'
+
+    def _session(self):
+        return self._Session()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    # 清单
+    def has(self, code, date):
+        """是否已存储指定股票日期的成交明细"""
+        session = self._session()
+        try:
+            r = session.query(TickPartition).get((code, _to_date(date)))
+            return r is not None
+        finally:
+            session.close()
+
+    def stored(self, codes=None, start=None, end=None):
+        """已存储的(股票代码, 日期)集合"""
+        session = self._session()
+        try:
+            q = session.query(TickPartition.股票代码, TickPartition.日期)
+            q = self._filter(q, codes, start, end)
+            return {(c, pd.Timestamp(d)) for c, d in q.all()}
+        finally:
+            session.close()
+
+    def summary(self):
+        """按日期汇总股票数量、行数及文件数量"""
+        session = self._session()
+        try:
+            q = session.query(
+                TickPartition.日期,
+                func.count(TickPartition.股票代码),
+                func.sum(TickPartition.行数),
+                func.count(TickPartition.文件.distinct()),
+            ).group_by(TickPartition.日期)
+            return pd.DataFrame(q.all(), columns=['日期', '股票数量', '行数', '文件数量'])
+        finally:
+            session.close()
+
+    def _filter(self, q, codes, start, end):
+        if codes is not None:
+            q = q.filter(TickPartition.股票代码.in_(ensure_list(codes)))
+        if start is not None:
+            q = q.filter(TickPartition.日期 >= _to_date(start))
+        if end is not None:
+            q = q.filter(TickPartition.日期 <= _to_date(end))
+        return q
+
+    # 写入
+    def _write_file(self, date, df):
+        """写入单一日期文件，返回相对路径"""
+        pa, pq = _pq()
+        name = os.path.join(date.strftime('%Y'), date.strftime('%Y%m%d'),
+                            f'part-{uuid.uuid4().hex[:12]}.parquet')
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 缺少的列以空值写入
+        table = pa.Table.from_pandas(df.reindex(columns=COLUMNS), schema=_schema(pa),
+                                     preserve_index=False)
+        # 先写临时文件，完成后改名，避免留下不完整文件
+        tmp = path + '.tmp'
+        try:
+            pq.write_table(table, tmp, compression=COMPRESSION,
+                           row_group_size=ROW_GROUP_SIZE)
+            os.replace(tmp, path)
+        except Exception:
+            self._remove(name + '.tmp')
+            raise
+        return name
+
+    def _remove(self, name):
+        """删除文件，失败时记录孤立文件，返回是否删除"""
+        path = self._path(name)
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+            return True
+        except OSError as e:
+            logger.error(f'无法删除孤立文件{path}：{e}')
+            return False
+
+    def append(self, df):
+        """追加成交明细
+
+        已登记的(股票代码, 日期)将被跳过，不会重复写入
+
+        Arguments:
+            df {pd.DataFrame} -- 含`股票代码`、`成交时间`列的成交明细，可包含多个股票及日期
+
+        Returns:
+            int -- 写入行数
+        """
+        if df.empty:
+            return 0
+        dates = df['成交时间'].dt.normalize()
+        done = self.stored(df['股票代码'].unique().tolist(), dates.min(), dates.max())
+        rows = 0
+        for date, group in df.groupby(dates, sort=True):
+            done_codes = [c for c, d in done if d == date]
+            if done_codes:
+                group = group[~group['股票代码'].isin(done_codes)]
+            if group.empty:
+                continue
+            group = group.sort_values(['股票代码', '成交时间'], kind='mergesort')
+            name = self._write_file(date, group)
+            counts = group['股票代码'].value_counts()
+            now = pd.Timestamp('now').to_pydatetime()
+            session = self._session()
+            try:
+                session.add_all([
+                    TickPartition(股票代码=code, 日期=date.date(), 文件=name,
+                                  行数=int(n), 写入时间=now)
+                    for code, n in counts.items()])
+                session.commit()
+            except Exception:
+                session.rollback()
+                self._remove(name)
+                raise
+            finally:
+                session.close()
+            rows += len(group)
+            logger.info(f'{date.date()} 写入{len(counts)}只股票 共{len(group)}行')
+        return rows
+
+    # 读取
+    def _files(self, codes, start, end):
+        session = self._session()
+        try:
+            q = session.query(TickPartition.文件).distinct()
+            q = self._filter(q, codes, start, end)
+            return sorted(r[0] for r in q.all())
+        finally:
+            session.close()
+
+    def read(self, codes=None, start=None, end=None, columns=None):
+        """读取成交明细
+
+        Keyword Arguments:
+            codes {str, list} -- 股票代码，为None时不限定 (default: {None})
+            start {datelike} -- 开始日期 (default: {None})
+            end {datelike} -- 结束日期(含) (default: {None})
+            columns {list} -- 读取列，为None时读取全部列 (default: {None})
+
+        Returns:
+            pd.DataFrame -- 按股票代码、成交时间排序的成交明细
+        """
+        files = self._files(codes, start, end)
+        if not files:
+            return pd.DataFrame(columns=columns or COLUMNS)
+        pa, pq = _pq()
+        filters = []
+        if codes is not None:
+            filters.append(('股票代码', 'in', ensure_list(codes)))
+        if start is not None:
+            filters.append(('成交时间', '>=', pd.Timestamp(start).normalize()))
+        if end is not None:
+            filters.append(('成交时间', '<', pd.Timestamp(end).normalize() + pd.Timedelta(days=1)))
+        read_cols = None
+        if columns is not None:
+            read_cols = list(dict.fromkeys(['股票代码', '成交时间'] + list(columns)))
+        tables = []
+        for f in files:
+            t = pq.read_table(self._path(f), columns=read_cols, filters=filters or None)
+            # 兼容按推断类型写入的旧文件
+            tables.append(t.cast(_schema(pa, t.column_names)))
+        df = pa.concat_tables(tables).to_pandas()
+        df.sort_values(['股票代码', '成交时间'], inplace=True, kind='mergesort')
+        df.reset_index(drop=True, inplace=True)
+        return df if columns is None else df[list(columns)]
+
+    # 维护
+    def compact(self, date):
+        """合并指定日期的全部文件为一个文件"""
+        date = pd.Timestamp(date).normalize()
+        files = self._files(None, date, date)
+        if len(files) < 2:
+            return
+        df = self.read(start=date, end=date)
+        name = self._write_file(date, df)
+        session = self._session()
+        try:
+            session.query(TickPartition).filter(
+                TickPartition.日期 == date.date()
+            ).update({TickPartition.文件: name}, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            self._remove(name)
+            raise
+        finally:
+            session.close()
+        # 清单已指向新文件，旧文件删除失败不影响读取
+        orphans = [f for f in files if not self._remove(f)]
+        msg = f'{date.date()} 合并{len(files)}个文件'
+        if orphans:
+            msg += f'，{len(orphans)}个旧文件未能删除'
+        logger.info(msg)
+
+    def import_pickles(self, pkl_root=None, batch_rows=IMPORT_BATCH_ROWS):
+        """导入旧版`<code>/<yyyymmdd>.pkl`文件，返回导入行数
+
+        按批写入后合并各日期文件，避免每只股票产生一个文件
+        """
+        pkl_root = pkl_root or data_root('cjmx')
+        rows, dates = 0, set()
+        buf, buf_rows = [], 0
+
+        def flush():
+            df = pd.concat(buf, ignore_index=True)
+            dates.update(df['成交时间'].dt.normalize().unique())
+            return self.append(df)
+
+        for code in sorted(os.listdir(pkl_root)):
+            code_dir = os.path.join(pkl_root, code)
+            if not os.path.isdir(code_dir):
+                continue
+            for name in sorted(os.listdir(code_dir)):
+                if not name.endswith('.pkl'):
+                    continue
+                df = pd.read_pickle(os.path.join(code_dir, name))
+                if df.empty:
+                    continue
+                buf.append(df)
+                buf_rows += len(df)
+            if buf_rows >= batch_rows:
+                rows += flush()
+                buf, buf_rows = [], 0
+        if buf:
+            rows += flush()
+        for date in sorted(dates):
+            self.compact(date)
+        return rows
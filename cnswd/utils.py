@@ -230,6 +230,83 @@ def round_price_to_penny(df, ndigits=2):
     return pd.concat([df[remaining_cols], penny_part.apply(round, ndigits=ndigits)],
                      axis=1)
 
+
+_DIGIT_POS = [0, 1, 3, 4, 6, 7]
+_COLON_POS = [2, 5]
+_HMS_WEIGHTS = np.array([36000, 3600, 600, 60, 10, 1], dtype='int64')
+
+
+def combine_date_time(date, times):
+    """日期与`HH:MM:SS`时间合并为时间戳
+
+    固定格式时以整数运算向量化计算，否则回退至逐项解析
+
+    Arguments:
+        date {datelike} -- 日期
+        times {pd.Series} -- 时间字符串序列
+
+    Returns:
+        pd.DatetimeIndex -- 时间戳
+    """
+    base = pd.Timestamp(date).normalize()
+    # 多取一位，用于检查字符串长度
+    arr = np.asarray(times, dtype='U9')
+    codes = arr.view(np.uint32).reshape(len(arr), 9).astype('int64')
+    digits = codes[:, _DIGIT_POS] - ord('0')
+    fixed = ((codes[:, 8] == 0).all()
+             and (codes[:, _COLON_POS] == ord(':')).all()
+             and ((digits >= 0) & (digits <= 9)).all())
+    if not fixed:
+        times = pd.Series(times)
+        # 缺失值转换为NaT
+        times = times.where(times.isna(), times.astype(str))
+        return pd.DatetimeIndex(pd.to_datetime(base.strftime('%Y-%m-%d ') + times))
+    seconds = digits @ _HMS_WEIGHTS
+    return pd.DatetimeIndex(base.to_datetime64() + seconds.astype('timedelta64[s]'))
+
+
+def truncate_decimals(values, ndigits=2):
+    """截断(而非四舍五入)至指定小数位数，缺失值保持不变"""
+    scale = 10.0 ** ndigits
+    res = np.multiply(values, scale, dtype='float64')
+    # 先消除浮点表示误差，避免如0.29截断为0.28
+    np.round(res, 6, out=res)
+    np.trunc(res, out=res)
+    np.divide(res, scale, out=res)
+    return res
+
+
+def normalize_ticks(df, date, time_col='成交时间', volume_scale=1,
+                    truncate=(), ndigits=2):
+    """就地整理成交明细
+
+    合并日期与时间列为`成交时间`，按倍数调整成交量，截断指定列的小数位数，
+    并按成交时间排序。各列只计算一次，不复制整个数据框。
+
+    Arguments:
+        df {pd.DataFrame} -- 成交明细
+        date {datelike} -- 交易日期
+
+    Keyword Arguments:
+        time_col {str} -- 时间列名称 (default: {'成交时间'})
+        volume_scale {int} -- 成交量倍数，如以手为单位时为100 (default: {1})
+        truncate {tuple} -- 需截断小数位数的列 (default: {()})
+        ndigits {int} -- 保留小数位数 (default: {2})
+
+    Returns:
+        pd.DataFrame -- 整理后的数据框(同一对象)
+    """
+    df['成交时间'] = combine_date_time(date, df[time_col])
+    if time_col != '成交时间':
+        del df[time_col]
+    if volume_scale != 1:
+        df['成交量'] = df['成交量'].to_numpy() * volume_scale
+    for col in truncate:
+        df[col] = truncate_decimals(df[col].to_numpy(), ndigits)
+    if not df['成交时间'].is_monotonic_increasing:
+        df.sort_values('成交时间', inplace=True, kind='mergesort')
+    return df
+
 ## 路径
 
 
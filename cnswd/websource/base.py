@@ -4,7 +4,8 @@ from functools import wraps
 import numpy as np
 from logbook import Logger
 
-from cnswd.websource.exceptions import ConnectFailed, ThreeTryFailed
+from cnswd.websource.exceptions import ConnectFailed, NoFixture, ThreeTryFailed
+from cnswd.websource.replay import request
 from cnswd.utils import get_server_name
 
 # 可能会遇到服务器定期重启，导致网络中断。休眠时长应大于重启完成时间
@@ -68,9 +69,11 @@ def _get(url, params, timeout):
     """超时不能设置太短，否则经常出错"""
     for i in range(3):
         try:
-            r = requests.get(url, params=params, timeout=timeout)
+            r = request('get', url, params=params, timeout=timeout)
             if r.status_code == 200:
                 return r
+        except NoFixture:
+            raise
         except requests.exceptions.ConnectionError:
             logger.info('第{}次尝试。无法连接服务器：{}'.format(
             	i + 1, get_server_name(url)))
@@ -85,9 +88,11 @@ def _get(url, params, timeout):
 def _post(url, params, timeout):
     for i in range(3):
         try:
-            r = requests.post(url, params=params, timeout=timeout)
+            r = request('post', url, params=params, timeout=timeout)
             if r.status_code == 200:
                 return r
+        except NoFixture:
+            raise
         except requests.exceptions.ConnectionError:
             logger.info('第{}次尝试。无法连接服务器：{}'.format(
             	i + 1, get_server_name(url)))
@@ -9,19 +9,23 @@ import time
 import re
 import logbook
 import pandas as pd
+from pandas.io.parsers import TextParser
 from logbook.more import ColorizedStderrHandler
-from selenium.common.exceptions import ElementNotInteractableException, NoSuchElementException
+from selenium.common.exceptions import (ElementNotInteractableException,
+                                        NoSuchElementException,
+                                        TimeoutException, WebDriverException)
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select, WebDriverWait
+from cnswd.utils import loop_period_by
 from cnswd.websource.exceptions import RetryException
 from cnswd.websource._selenium import make_headless_browser
 from cnswd.websource.cninfo._firefox import clear_firefox_cache
-from cnswd.websource.cninfo.constants import TIMEOUT
+from cnswd.websource.cninfo.constants import API_BASE_URL, MAX_TABS, TIMEOUT
 
-HOME_URL_FMT = 'http://webapi.cninfo.com.cn/#/{}'
+HOME_URL_FMT = '{}/#/{}'
 PAGINATION_PAT = re.compile(r'共\s(\d{1,})\s条记录')
 API_MAPS = {
     5:   ('个股API', 'dataDownload'),
@@ -32,6 +36,198 @@ API_MAPS = {
     10:  ('公告定制', 'notice'),
 }
 
+# 以MutationObserver监听元素属性，一旦变更为指定值立即返回
+# 返回值 true:完成 false:超时 null:无法定位元素
+WAIT_FOR_ATTRIBUTE_SCRIPT = """
+var is_xpath = arguments[0], expr = arguments[1], name = arguments[2],
+    value = arguments[3], timeout = arguments[4];
+var done = arguments[arguments.length - 1];
+var norm = function (s) {
+    return s === null ? null : s.replace(/\\s+/g, '').replace(/;$/, '');
+};
+var elem = is_xpath ? document.evaluate(
+    expr, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue :
+    document.querySelector(expr);
+if (elem === null) {
+    done(null);
+    return;
+}
+if (norm(elem.getAttribute(name)) === norm(value)) {
+    done(true);
+    return;
+}
+var observer = new MutationObserver(function () {
+    if (norm(elem.getAttribute(name)) === norm(value)) {
+        clearTimeout(timer);
+        observer.disconnect();
+        done(true);
+    }
+});
+var timer = setTimeout(function () {
+    observer.disconnect();
+    done(false);
+}, timeout);
+observer.observe(elem, {attributes: true, attributeFilter: [name]});
+"""
+
+# 预览完成监听，由`PREVIEW_SCRIPT`、`SUBMIT_PREVIEW_SCRIPT`共用
+# 完成条件：加载指示出现后恢复为隐藏；或加载指示隐藏时，数据表已有行且与点击前内容不同。
+# 重新加载开始时清空数据表(无行)不视为完成
+WATCH_PREVIEW_JS = """
+var norm = function (s) {
+    return s === null ? null : s.replace(/\\s+/g, '').replace(/;$/, '');
+};
+var watchPreview = function (loading, table_css, style, timeout, resolve) {
+    var hidden = function () {
+        return norm(loading.getAttribute('style')) === norm(style);
+    };
+    var current = function () {
+        var body = document.querySelector(table_css);
+        return body === null ? null : {rows: body.rows.length, html: body.innerHTML};
+    };
+    var before = current(), shown = false;
+    var finish = function (res) {
+        clearTimeout(timer);
+        observer.disconnect();
+        resolve(res);
+    };
+    var observer = new MutationObserver(function (records) {
+        records.forEach(function (r) {
+            // 显示、隐藏可能在同一批变动中完成
+            if (r.target === loading && norm(r.oldValue) !== norm(style)) {
+                shown = true;
+            }
+        });
+        if (!hidden()) {
+            shown = true;
+            return;
+        }
+        var now = current();
+        var changed = now !== null && now.rows > 0 &&
+            (before === null || now.html !== before.html);
+        if (shown || changed) {
+            finish(true);
+        }
+    });
+    var timer = setTimeout(function () {
+        finish(false);
+    }, timeout);
+    observer.observe(loading, {
+        attributes: true, attributeFilter: ['style'], attributeOldValue: true});
+    // 数据表可能整体替换，监听其所在表格
+    var body = document.querySelector(table_css);
+    if (body !== null) {
+        observer.observe(body.parentNode, {childList: true, subtree: true});
+    }
+};
+"""
+
+# 点击预览按钮前先安装监听，完成条件见`WATCH_PREVIEW_JS`
+# 返回值 true:完成 false:超时 null:无法定位按钮或加载指示元素(尚未点击)
+PREVIEW_SCRIPT = WATCH_PREVIEW_JS + """
+var btn_css = arguments[0], loading_css = arguments[1], table_css = arguments[2],
+    style = arguments[3], timeout = arguments[4];
+var done = arguments[arguments.length - 1];
+var btn = document.querySelector(btn_css);
+var loading = document.querySelector(loading_css);
+if (btn === null || loading === null) {
+    done(null);
+    return;
+}
+watchPreview(loading, table_css, style, timeout, done);
+btn.click();
+"""
+
+# 多标签页模式：安装监听后点击预览按钮，不等待结果，完成状态保存在页面中
+# 返回值 true:已点击 null:无法定位按钮或加载指示元素(尚未点击)
+SUBMIT_PREVIEW_SCRIPT = WATCH_PREVIEW_JS + """
+var btn_css = arguments[0], loading_css = arguments[1], table_css = arguments[2],
+    style = arguments[3], timeout = arguments[4];
+var btn = document.querySelector(btn_css);
+var loading = document.querySelector(loading_css);
+window.__cnswdPreview = null;
+if (btn === null || loading === null) {
+    return null;
+}
+window.__cnswdPreview = new Promise(function (resolve) {
+    watchPreview(loading, table_css, style, timeout, resolve);
+});
+btn.click();
+return true;
+"""
+
+# 等待`SUBMIT_PREVIEW_SCRIPT`的结果
+# 返回值 true:完成 false:超时 null:尚未提交
+COLLECT_PREVIEW_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var p = window.__cnswdPreview;
+window.__cnswdPreview = null;
+if (!p) {
+    done(null);
+    return;
+}
+p.then(done);
+"""
+
+# 读取bootstrap-table客户端数据模型
+# 返回值 {headers:[表头], rows:[[值,...],...]}，无法定位数据模型时返回null
+READ_TABLE_MODEL_SCRIPT = """
+if (typeof jQuery === 'undefined') {
+    return null;
+}
+var tables = document.querySelectorAll('table');
+for (var i = 0; i < tables.length; i++) {
+    var $t = jQuery(tables[i]);
+    if (!$t.data('bootstrap.table')) {
+        continue;
+    }
+    var ths = tables[i].querySelectorAll('thead th[data-field]');
+    var headers = [], fields = [];
+    for (var j = 0; j < ths.length; j++) {
+        headers.push(ths[j].innerText.trim());
+        fields.push(ths[j].getAttribute('data-field'));
+    }
+    var data = $t.bootstrapTable('getOptions').data || [];
+    var rows = data.map(function (row) {
+        return fields.map(function (f) {
+            var v = row[f];
+            return v === null || v === undefined ? '' : String(v);
+        });
+    });
+    return {headers: headers, rows: rows};
+}
+return null;
+"""
+
+# 将每页显示行数调整为总行数，表格重新呈现后返回
+# 返回值 true:完成 false:超时或无法定位数据表
+EXPAND_PAGE_SIZE_SCRIPT = """
+var total = arguments[0], timeout = arguments[1];
+var done = arguments[arguments.length - 1];
+if (typeof jQuery === 'undefined') {
+    done(false);
+    return;
+}
+var $t = jQuery('table').filter(function () {
+    return !!jQuery(this).data('bootstrap.table');
+}).first();
+if ($t.length === 0) {
+    done(false);
+    return;
+}
+var timer = setTimeout(function () {
+    done(false);
+}, timeout);
+$t.one('post-body.bs.table', function () {
+    clearTimeout(timer);
+    done(true);
+});
+$t.bootstrapTable('refreshOptions', {pageSize: total, pageList: [total]});
+"""
+
+# 网页表格中代表无数据的字符
+NA_VALUES = ['-', '无', ';']
+
 # 设置显示日志
 logbook.set_datetime_format('local')
 handler = ColorizedStderrHandler()
@@ -88,16 +284,26 @@ class SZXPage(object):
     level_query_bnt_css = ''
     preview_btn_css = ''       # 预览数据按钮
     wait_for_preview_css = ''  # 检验预览结果css
+    preview_table_css = 'table > tbody'  # 预览数据表
+    observe_preview = True     # 是否以脚本监听加载指示元素，否则点击后由`_wait_for_preview`等待
     view_selection = {}        # 可调显示行数 如 {1:10,2:20,3:50}
+    # 多标签页模式下，各标签页独立保存的状态
+    tab_state_attrs = ('code_loaded', 'current_level',
+                       'current_t1_value', 'current_t2_value')
 
-    def __init__(self, clear_cache=True):
+    def __init__(self, clear_cache=True, tabs=1, base_url=API_BASE_URL):
         start = time.time()
+        # 可指向本地替身网站，用于离线测试及性能基准
+        self.base_url = base_url.rstrip('/')
+        self.tabs = max(1, min(tabs, MAX_TABS))
+        self._tab_states = {}
         self.driver = make_headless_browser()
         self.logger = logbook.Logger("深证信")
         if clear_cache:
             clear_firefox_cache(self.driver)
             self.logger.notice("清理缓存")
         self.wait = WebDriverWait(self.driver, TIMEOUT)
+        self.driver.set_script_timeout(TIMEOUT + 5)
         try:
             self._load_page()
         except Exception as e:
@@ -122,6 +328,7 @@ class SZXPage(object):
         self.current_level = ''
         self.current_t1_value = ''      # 开始日期
         self.current_t2_value = ''      # 结束日期
+        self._tab_states = {}
 
         start = time.time()
         self.driver = make_headless_browser()
@@ -129,6 +336,7 @@ class SZXPage(object):
         clear_firefox_cache(self.driver)
         self.logger.notice("清理缓存")
         self.wait = WebDriverWait(self.driver, TIMEOUT)
+        self.driver.set_script_timeout(TIMEOUT + 5)
         try:
             self._load_page()
         except Exception as e:
@@ -140,7 +348,7 @@ class SZXPage(object):
     def _load_page(self):
         # 如果重复加载同一网址，耗时约为1ms
         self.logger.info(self.api_name)
-        url = HOME_URL_FMT.format(self.api_e_name)
+        url = HOME_URL_FMT.format(self.base_url, self.api_e_name)
         self.driver.get(url)
         # 特定元素可见，完成首次页面加载
         self._wait_for_visibility(self.check_loaded_css, self.api_name)
@@ -156,23 +364,93 @@ class SZXPage(object):
             '', self.current_level, self.current_t1_value, self.current_t2_value)
         return msg
 
+    def _wait_for_attribute(self, locator, name, value, msg=''):
+        """
+        等待元素属性变更为指定值
+
+        在页面中安装MutationObserver，属性一旦变更立即返回，无轮询延时。
+        无法定位元素或脚本执行异常时，退回`WebDriverWait`轮询。
+        """
+        by, expr = locator
+        try:
+            res = self.driver.execute_async_script(
+                WAIT_FOR_ATTRIBUTE_SCRIPT, by == By.XPATH, expr, name, value, TIMEOUT * 1000)
+        except WebDriverException as e:
+            self.logger.warning(f'{e!r}')
+            res = None
+        if res is None:
+            self.wait.until(element_attribute_change_to(
+                locator, name, value), msg)
+        elif not res:
+            raise TimeoutException(msg)
+
     def _wait_for_activate(self, data_name, status='active'):
         """等待元素激活"""
         xpath_fmt = "//a[@data-name='{}']"
         locator = (By.XPATH, xpath_fmt.format(data_name))
-        self.wait.until(element_attribute_change_to(
-            locator, 'class', status), f'{self.api_name} {data_name} 激活元素超时')
+        self._wait_for_attribute(
+            locator, 'class', status, f'{self.api_name} {data_name} 激活元素超时')
 
     def _wait_for_preview(self, style='display: none;'):
         """等待预览结果完全呈现"""
         # 以属性值改变来判断
         locator = (By.CSS_SELECTOR, self.wait_for_preview_css)
-        self.wait.until(element_attribute_change_to(
-            locator, 'style', style), f'{self.api_name} 等待预览结果超时')
+        self._wait_for_attribute(
+            locator, 'style', style, f'{self.api_name} 等待预览结果超时')
         # # 以加载指示元素不可见来判断
         # self._wait_for_invisibility(
         #     self.wait_for_preview_css, f'{self.api_name} 等待预览结果超时')
 
+    def _preview(self, style='display: none;'):
+        """点击`预览数据`，等待预览结果完全呈现"""
+        if not self.observe_preview:
+            self.driver.find_element_by_css_selector(self.preview_btn_css).click()
+            self._wait_for_preview()
+            return
+        try:
+            res = self.driver.execute_async_script(
+                PREVIEW_SCRIPT, self.preview_btn_css, self.wait_for_preview_css,
+                self.preview_table_css, style, TIMEOUT * 1000)
+        except WebDriverException as e:
+            # 此时可能已经点击，只需等待
+            self.logger.warning(f'{e!r}')
+            res = False
+        if res is None:
+            self.driver.find_element_by_css_selector(
+                self.preview_btn_css).click()
+        if not res:
+            self._wait_for_preview()
+
+    def _submit_preview(self, style='display: none;'):
+        """点击`预览数据`，不等待结果"""
+        if self.api_e_name == 'thematicStatistics' and not any(self.css_map[self.current_level]):
+            # 专题统计中，部分项目无命令按钮
+            return
+        if not self.observe_preview:
+            self.driver.find_element_by_css_selector(self.preview_btn_css).click()
+            return
+        try:
+            res = self.driver.execute_script(
+                SUBMIT_PREVIEW_SCRIPT, self.preview_btn_css, self.wait_for_preview_css,
+                self.preview_table_css, style, TIMEOUT * 1000)
+        except WebDriverException as e:
+            self.logger.warning(f'{e!r}')
+            res = None
+        if res is None:
+            self.driver.find_element_by_css_selector(
+                self.preview_btn_css).click()
+
+    def _collect_preview(self):
+        """等待已提交的预览完成，读取结果"""
+        try:
+            res = self.driver.execute_async_script(COLLECT_PREVIEW_SCRIPT)
+        except WebDriverException as e:
+            self.logger.warning(f'{e!r}')
+            res = None
+        if not res:
+            self._wait_for_preview()
+        return self._read_result()
+
     def _wait_for_invisibility(self, elem_css, msg=''):
         """
         等待指定css元素不可见
@@ -326,61 +604,198 @@ class SZXPage(object):
             self.driver.find_element_by_css_selector(
                 '.dropdown-toggle').click()
             locator = (By.CSS_SELECTOR, '.btn-group')
-            self.wait.until(element_attribute_change_to(
-                locator, 'class', 'btn-group dropup open'), '调整每页显示行数超时')
+            self._wait_for_attribute(
+                locator, 'class', 'btn-group dropup open', '调整每页显示行数超时')
             css = '.btn-group > ul:nth-child(2) li'
             lis = self.driver.find_elements_by_css_selector(css)
             lis[nth-1].click()
 
     def _read_html_table(self):
         """读取当前网页数据表"""
-        # 点击`预览数据`
+        return _concat(list(self._iter_html_table()))
+
+    def _iter_html_table(self):
+        """逐页读取当前网页数据表，依次生成各页数据"""
+        # 点击`预览数据`，等待预览数据完成加载。如数据量大，可能会比较耗时。最长约6秒。
         if self.api_e_name == 'thematicStatistics':
             # 专题统计中，部分项目无命令按钮
             if any(self.css_map[self.current_level]):
-                # 预览数据
-                self.driver.find_element_by_css_selector(
-                    self.preview_btn_css).click()
+                self._preview()
             else:
-                # 没有预览按钮时，等待一小段时间
-                self.driver.implicitly_wait(0.3)
+                self._wait_for_preview()
         else:
-            # 预览数据
-            self.driver.find_element_by_css_selector(
-                self.preview_btn_css).click()
-        # 数据加载与tip好像有延时
-        self.driver.implicitly_wait(0.3)
-        # 等待预览数据完成加载。如数据量大，可能会比较耗时。最长约6秒。
-        self._wait_for_preview()
+            self._preview()
+        yield from self._iter_result()
+
+    def _read_result(self):
+        """读取已呈现的预览结果"""
+        return _concat(list(self._iter_result()))
+
+    def _iter_result(self):
+        """逐页读取已呈现的预览结果"""
         # 是否无数据返回
         # 测试表明，专题统计不一定能准确捕获`.no-records-found`提示，导致后续无法获取数据行数
         # 多次运行，可解决此类问题
         if self._no_data():
-            return pd.DataFrame()
+            return
         # 是否存在异常
         if self._has_exception():
             item = self.name_map[self.current_level]
             raise RetryException(f'项目：{item} 提取的网页数据不完整')
+        total = self._get_row_num()
+        # 优先一次性读取全部数据，避免逐页点击
+        df = self._read_table_model(total)
+        if df is None:
+            df = self._read_expanded_table(total)
+        if df is None:
+            yield from self._iter_pages()
+        else:
+            yield df
+
+    def _read_table_model(self, total):
+        """读取数据表客户端模型中的全部数据
+
+        如模型行数与总行数不一致(如服务端分页)，返回None
+        """
+        try:
+            model = self.driver.execute_script(READ_TABLE_MODEL_SCRIPT)
+        except WebDriverException as e:
+            self.logger.warning(e)
+            return None
+        if not model or len(model['rows']) != total:
+            return None
+        parser = TextParser(model['rows'], names=model['headers'],
+                            na_values=NA_VALUES, thousands=',')
+        return parser.read()
+
+    def _read_expanded_table(self, total):
+        """将每页显示行数调整为总行数后，读取单页表格
+
+        如调整失败或读取行数与总行数不一致，返回None
+        """
+        # 单页无需调整
+        if total <= min(self.view_selection.values()):
+            return pd.read_html(self.driver.page_source, na_values=NA_VALUES)[0]
+        try:
+            expanded = self.driver.execute_async_script(
+                EXPAND_PAGE_SIZE_SCRIPT, total, TIMEOUT * 1000)
+        except WebDriverException as e:
+            self.logger.warning(e)
+            return None
+        if not expanded:
+            return None
+        df = pd.read_html(self.driver.page_source, na_values=NA_VALUES)[0]
+        if len(df) != total:
+            self.logger.warning(f'单页读取{len(df)}行，与总行数{total}不一致，改为分页读取')
+            return None
+        return df
+
+    def _read_by_pagination(self):
+        """逐页读取数据"""
+        return _concat(list(self._iter_pages()))
+
+    def _iter_pages(self):
+        """逐页读取数据，依次生成各页数据"""
         # 自动调整显示行数，才读取页数
         self._auto_change_view_row_num()
         pages = self._get_pages()
         n_width = 5  # 最多为万
-        dfs = []
-        na_values = ['-', '无', ';']
-        level = self.current_level
-        if level:
-            item = self.name_map[level]
-        else:
-            item = ''
         for i in range(pages):
-            df = pd.read_html(self.driver.page_source, na_values=na_values)[0]
-            dfs.append(df)
+            df = pd.read_html(self.driver.page_source, na_values=NA_VALUES)[0]
+            yield df
             # 点击进入下一页
             if i != (pages - 1):
                 next_page = self.driver.find_element_by_link_text(str(i + 2))
                 next_page.click()
             self.logger.info(f'>> 分页 第{i+1:{n_width}}页 / 共{pages:{n_width}}页')
-        return _concat(dfs)
+
+    def _open_tabs(self):
+        """打开多标签页，返回标签页句柄列表
+
+        新标签页共享浏览器cookie，各自加载单页应用
+        """
+        handles = self.driver.window_handles
+        current = self.driver.current_window_handle
+        url = HOME_URL_FMT.format(self.base_url, self.api_e_name)
+        for _ in range(self.tabs - len(handles)):
+            self.driver.execute_script('window.open(arguments[0]);', url)
+        new_handles = [h for h in self.driver.window_handles if h not in handles]
+        for handle in new_handles:
+            self.driver.switch_to.window(handle)
+            self._wait_for_visibility(self.check_loaded_css, self.api_name)
+            self._tab_states[handle] = {
+                k: getattr(type(self), k) for k in self.tab_state_attrs}
+        self.driver.switch_to.window(current)
+        return [current] + [h for h in self.driver.window_handles if h != current][:self.tabs - 1]
+
+    def _switch_tab(self, handle):
+        """切换标签页，保存当前标签页状态并恢复目标标签页状态"""
+        current = self.driver.current_window_handle
+        if handle == current:
+            return
+        self._tab_states[current] = {
+            k: getattr(self, k) for k in self.tab_state_attrs}
+        self.driver.switch_to.window(handle)
+        for k, v in self._tab_states.get(handle, {}).items():
+            setattr(self, k, v)
+
+    def _fetch_by_tabs(self, tasks, prepare):
+        """多标签页并发读取
+
+        每轮为各标签页分配一项任务：先在各标签页设置条件并提交预览，再依次收集结果。
+        结果按任务顺序合并，与逐项读取一致。
+
+        Arguments:
+            tasks {list} -- 任务参数列表
+            prepare {callable} -- 在当前标签页设置查询条件，参数为单项任务参数
+        """
+        handles = self._open_tabs()
+        n = len(handles)
+        results = [None] * len(tasks)
+        try:
+            for i in range(0, len(tasks), n):
+                batch = list(zip(handles, range(i, min(i + n, len(tasks)))))
+                for handle, j in batch:
+                    self._switch_tab(handle)
+                    prepare(*tasks[j])
+                    self._submit_preview()
+                for handle, j in batch:
+                    self._switch_tab(handle)
+                    results[j] = self._collect_preview()
+        finally:
+            self._switch_tab(handles[0])
+        return _concat(results)
+
+    def _loop_periods(self, level, start, end, periods=None):
+        """项目循环期间对应的(t1, t2)值列表，无需循环时返回None
+
+        指定`periods`[(开始日期, 结束日期), ...]时，按其查询，不再按项目周期划分
+        """
+        # 第一项为循环指示字符，第二项为是否包含未来日期
+        loop_str = self.date_map[level][0]
+        include = self.date_map[level][1]
+        if loop_str is None:
+            return None
+        # 第一个字符指示循环周期freq
+        freq = loop_str[0]
+        # 第二个字符指示值的表达格式
+        fmt_str = loop_str[1]
+        if fmt_str in ('B', 'D', 'W', 'M'):
+            def t1_fmt_func(x): return x.strftime(r'%Y-%m-%d')
+            def t2_fmt_func(x): return x.strftime(r'%Y-%m-%d')
+        elif fmt_str == 'Q':
+            def t1_fmt_func(x): return x.year
+            def t2_fmt_func(x): return x.quarter
+        elif fmt_str == 'Y':
+            def t1_fmt_func(x): return x.year
+            def t2_fmt_func(x): return None
+        else:
+            raise ValueError(f'{loop_str}为错误格式。')
+        if periods is None:
+            ps = loop_period_by(start, end, freq, include)
+        else:
+            ps = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in periods]
+        return [(t1_fmt_func(s), t2_fmt_func(e)) for s, e in ps]
 
     def _change_year(self, css, year):
         """改变查询指定id元素的年份"""
@@ -1,4 +1,7 @@
 TIMEOUT = 20             # 标准等待时间，单位：秒
+MAX_TABS = 4             # 同一浏览器最多并发标签页数量
+HEALTH_TTL = 600         # 可用状态缓存有效期，单位：秒
+HEALTH_MARKET = '深市B'  # 检查可用状态所使用的市场分类(代码数量少)
 # 轮询时间缩短
 POLL_FREQUENCY = 0.3
 
@@ -306,3 +309,92 @@ TS_DATE_FREQ = {
     # 11 基金报表
     '11.1':     ('BD', True),
 }
+
+# 数据服务接口（单页应用通过XHR调用的JSON接口）
+API_BASE_URL = 'http://webapi.cninfo.com.cn'
+API_DATE_FMT = r'%Y%m%d'
+# 字段元数据接口，返回接口输出字段的编码、中文名称及顺序
+FIELD_API = 'sysapi/p_sysapi1018'
+# 选项接口，参数为接口名称，返回项目下拉选项的值及名称
+OPTION_API = 'sysapi/p_sysapi1017'
+# 分类代码接口，参数为平台类别及分类编码
+CLASSIFY_API = 'stock/p_public0004'
+MARKET_PLATE_TYPE = '137001'  # 市场分类
+MARKET_PLATES = {
+    '深市A':  '012002',
+    '深市B':  '012003',
+    '沪市A':  '012001',
+    '沪市B':  '012004',
+    '科创板': '012029',
+}
+
+# 数据搜索项目对应的接口名称
+DB_API = {
+    '1.1':    'stock/p_stock2101',
+    '2.1':    'stock/p_stock2211',
+    '2.2':    'stock/p_stock2215',
+    '2.3':    'stock/p_stock2218',
+    '2.4':    'stock/p_stock2217',
+    '2.5':    'stock/p_stock2212',
+    '3.1':    'stock/p_stock2402',
+    '4.1':    'stock/p_stock2203',
+    '5.1':    'stock/p_stock2204',
+    '6.1':    'stock/p_stock2201',
+    '7.1':    'stock/p_stock2205',
+    '7.2':    'stock/p_stock2206',
+    '7.3':    'stock/p_stock2207',
+    '7.4':    'stock/p_stock2208',
+    '7.5':    'stock/p_stock2209',
+    '8.1.1':  'stock/p_stock2331',
+    '8.1.2':  'stock/p_stock2332',
+    '8.2.1':  'stock/p_stock2333',
+    '8.2.2':  'stock/p_stock2334',
+    '8.2.3':  'stock/p_stock2335',
+    '8.3.1':  'stock/p_stock2300',
+    '8.3.2':  'stock/p_stock2301',
+    '8.3.3':  'stock/p_stock2302',
+    '8.3.4':  'stock/p_stock2325',
+    '8.3.5':  'stock/p_stock2326',
+    '8.3.6':  'stock/p_stock2327',
+    '8.4.1':  'stock/p_stock2303',
+    '8.4.2':  'stock/p_stock2336',
+}
+
+# 专题统计项目对应的接口名称
+TS_API = {
+    '2.1':      'stock/p_stock2501',
+    '2.2':      'stock/p_stock2502',
+    '2.3':      'stock/p_stock2503',
+    '2.4':      'stock/p_stock2504',
+    '2.5':      'stock/p_stock2505',
+    '3.1':      'stock/p_stock2511',
+    '3.2':      'stock/p_stock2512',
+    '3.3':      'stock/p_stock2513',
+    '3.6':      'stock/p_stock2516',
+    '5.1':      'stock/p_stock2541',
+    '5.2':      'stock/p_stock2542',
+    '5.3':      'stock/p_stock2543',
+    '5.4':      'stock/p_stock2544',
+    '7.1':      'stock/p_stock2571',
+    '9.1':      'stock/p_stock2591',
+    '10.1':     'stock/p_stock2601',
+    '10.2':     'stock/p_stock2602',
+    '10.3':     'stock/p_stock2603',
+    '10.4':     'stock/p_stock2604',
+    '10.5':     'stock/p_stock2605',
+    '10.6':     'stock/p_stock2606',
+    '10.7':     'stock/p_stock2607',
+    '10.8':     'stock/p_stock2608',
+    '11.1':     'stock/p_stock2611',
+}
+# 专题统计项目下拉选项(对应`TS_CSS`选项css)：(参数名称, 读取方式)
+# 全部 -> 以空值一次读取全部选项；逐项 -> 按选项接口返回的各值分别读取
+TS_OPTIONS = {
+    '2.1':      ('type', '全部'),
+    '2.5':      ('type', '逐项'),
+    '3.6':      ('type', '全部'),
+    '5.1':      ('type', '全部'),
+    '5.4':      ('type', '全部'),
+    '7.1':      ('type', '逐项'),
+    '11.1':     ('type', '逐项'),
+}
@@ -13,11 +13,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 
 from cnswd.utils import (ensure_list, get_exchange_from_code, loop_codes,
-                         loop_period_by, sanitize_dates)
+                         sanitize_dates)
 from cnswd.websource.exceptions import RetryException
 from selenium.common.exceptions import TimeoutException
 from cnswd.websource.cninfo.base import SZXPage, _concat
-from .constants import DB_NAME, DB_CSS, DB_DATE_FREQ
+from .constants import (DB_CSS, DB_DATE_FREQ, DB_NAME, HEALTH_MARKET,
+                        HEALTH_TTL)
 
 BATCH_CODE_NUM = 50
 CLASS_ID = re.compile(r'=(\d{6})&')
@@ -30,14 +31,48 @@ PLATE_MAPS = {
     '137007': '指数分类',
 }
 
+# 在一次脚本调用中选中待选区内的全部目标代码，然后点击添加按钮
+SELECT_CODES_SCRIPT = """
+var codes = arguments[0], span_css = arguments[1], btn_css = arguments[2];
+var wanted = {};
+for (var i = 0; i < codes.length; i++) {
+    wanted[codes[i]] = true;
+}
+var spans = document.querySelectorAll(span_css);
+var found = 0;
+for (var j = 0; j < spans.length; j++) {
+    if (wanted[spans[j].getAttribute('data-id')] === true) {
+        spans[j].click();
+        found += 1;
+    }
+}
+document.querySelector(btn_css).click();
+return found;
+"""
+
+# 一次性读取多个区域的代码，避免逐个元素调用`get_attribute`
+READ_CODES_SCRIPT = """
+var res = [];
+for (var i = 0; i < arguments.length; i++) {
+    var spans = document.querySelectorAll(arguments[i]);
+    for (var j = 0; j < spans.length; j++) {
+        res.push(spans[j].getAttribute('data-id'));
+    }
+}
+return res;
+"""
+
 
 class DataBrowse(SZXPage):
     """数据搜索页"""
     # 变量
     code_loaded = False
+    all_codes = ()             # 全部股票代码
     current_codes = ()         # 当前已选代码
+    _health = {}               # 可用状态缓存 {'time':检查时间, 'status':状态}
     current_t1_value = ''      # 开始日期
     current_t2_value = ''      # 结束日期
+    tab_state_attrs = SZXPage.tab_state_attrs + ('current_codes',)
 
     # 改写的属性
     preview_btn_css = '.dataBrowseBtn'
@@ -74,11 +109,21 @@ class DataBrowse(SZXPage):
             self.current_level = level
             self._select_all_fields()
 
+    def reset(self):
+        super().reset()
+        self.all_codes = ()
+        self.current_codes = ()
+
     def load_all_code(self):
         """全选股票代码"""
         if self.code_loaded:
             return
         markets = ['深市A', '深市B', '沪市A', '沪市B', '科创板']
+        self._load_markets(markets)
+        self.code_loaded = True
+
+    def _load_markets(self, markets):
+        """全选指定市场分类的股票代码"""
         market_cate_css = '.classify-tree > li:nth-child(6)'
         self._wait_for_visibility(market_cate_css)
         li = self.driver.find_element_by_css_selector(market_cate_css)
@@ -97,16 +142,20 @@ class DataBrowse(SZXPage):
             # 全部添加
             self._add_or_delete_all(add_label_css, add_btn_css)
             # self.driver.save_screenshot(f'{market}.png')
-        self.code_loaded = True
 
     @property
     def stock_code_list(self):
         """所有股票代码列表"""
         if not self.code_loaded:
             self.load_all_code()
-        selected_css = 'div.select-box:nth-child(3) > div:nth-child(2) > ul:nth-child(1) span'
-        spans = self.driver.find_elements_by_css_selector(selected_css)
-        return [span.get_attribute('data-id') for span in spans]
+        if not self.all_codes:
+            # 分批添加代码后，已选区只剩部分代码，需合并待选区
+            selected_css = 'div.select-box:nth-child(3) > div:nth-child(2) > ul:nth-child(1) span'
+            unselect_css = 'div.select-box:nth-child(1) > div:nth-child(3) > ul:nth-child(1) span'
+            codes = self.driver.execute_script(
+                READ_CODES_SCRIPT, selected_css, unselect_css)
+            self.all_codes = tuple(sorted(set(codes)))
+        return list(self.all_codes)
 
     def _clear_selected_codes(self):
         """清除已选代码，置放于待选区"""
@@ -118,11 +167,8 @@ class DataBrowse(SZXPage):
             btn_css = 'div.arrows-box:nth-child(2) > div:nth-child(1) > button:nth-child(2)'
             self._add_or_delete_all(label_css, btn_css)
 
-    def _add_codes(self, codes):
-        """从待选区选中代码"""
-        if not self.code_loaded:
-            self.load_all_code()
-        self._clear_selected_codes()
+    def _click_codes(self, codes):
+        """逐个点击待选区代码，然后添加"""
         unselect_css_fmt = "div.select-box:nth-child(1) > div:nth-child(3) > ul:nth-child(1) span[data-id='{}']"
         for code in codes:
             elem = self.driver.find_element_by_css_selector(
@@ -131,6 +177,29 @@ class DataBrowse(SZXPage):
         btn_css = 'div.arrows-box:nth-child(2) > div:nth-child(1) > button:nth-child(1)'
         self.driver.find_element_by_css_selector(btn_css).click()
 
+    def _add_codes(self, codes):
+        """从待选区选中代码"""
+        if not self.code_loaded:
+            self.load_all_code()
+        self._clear_selected_codes()
+        codes = list(codes)
+        unselect_css = 'div.select-box:nth-child(1) > div:nth-child(3) > ul:nth-child(1) span'
+        btn_css = 'div.arrows-box:nth-child(2) > div:nth-child(1) > button:nth-child(1)'
+        tip_css = 'div.select-box:nth-child(3) > div:nth-child(1) > span:nth-child(2)'
+        # 一次脚本调用完成选择与添加
+        found = self.driver.execute_script(
+            SELECT_CODES_SCRIPT, codes, unselect_css, btn_css)
+        actual = self._get_count_tip(tip_css)
+        if actual == len(codes):
+            return
+        self.logger.warning(
+            f'批量选择代码：预期{len(codes)}只，找到{found}只，已选{actual}只。改为逐个点击')
+        self._clear_selected_codes()
+        self._click_codes(codes)
+        actual = self._get_count_tip(tip_css)
+        if actual != len(codes):
+            raise RetryException(f'已选代码数量{actual}与预期数量{len(codes)}不一致')
+
     def add_codes(self, codes):
         if self.current_codes != tuple(codes):
             self._add_codes(codes)
@@ -187,37 +256,29 @@ class DataBrowse(SZXPage):
         # 无法一次性读取时，采用分批代码读取
         # return self._get_data_by_batch_codes()
 
-    def _loop_by_period(self, level, start, end):
+    def _loop_by_period(self, level, start, end, periods=None):
         """分时期段读取数据"""
-        loop_str = self.date_map[level][0]
-        include = self.date_map[level][1]
-        if loop_str is None:
+        ps = self._loop_periods(level, start, end, periods)
+        if ps is None:
             return self._get_data(level, None, None)
-        # 第一个字符指示循环周期freq
-        freq = loop_str[0]
-        # 第二个字符指示值的表达格式
-        fmt_str = loop_str[1]
-        if fmt_str in ('B', 'D', 'W', 'M'):
-            def t1_fmt_func(x): return x.strftime(r'%Y-%m-%d')
-            def t2_fmt_func(x): return x.strftime(r'%Y-%m-%d')
-        elif fmt_str == 'Q':
-            def t1_fmt_func(x): return x.year
-            def t2_fmt_func(x): return x.quarter
-        elif fmt_str == 'Y':
-            def t1_fmt_func(x): return x.year
-            def t2_fmt_func(x): return None
-        else:
-            raise ValueError(f'{loop_str}为错误格式。')
-        ps = loop_period_by(start, end, freq, include)
+        if self.tabs > 1 and len(ps) > 1:
+            return self._fetch_by_tabs(ps, lambda t1, t2: self._prepare(level, t1, t2))
         dfs = []
-        for s, e in ps:
-            t1, t2 = t1_fmt_func(s), t2_fmt_func(e)
+        for t1, t2 in ps:
             self.logger.info(f'>  时段 {t1} ~ {t2}')
             df = self._get_data(level, t1, t2)
             dfs.append(df)
         return _concat(dfs)
 
-    def get_data(self, level, start=None, end=None):
+    def _prepare(self, level, t1, t2):
+        """多标签页模式下，在当前标签页设置查询条件"""
+        self.select_level(level)
+        self.load_all_code()
+        self.logger.info(f'>  时段 {t1} ~ {t2}')
+        self.set_t1_value(t1)
+        self.set_t2_value(t2)
+
+    def get_data(self, level, start=None, end=None, periods=None):
         """获取项目数据
 
         Arguments:
@@ -226,6 +287,7 @@ class DataBrowse(SZXPage):
         Keyword Arguments:
             start {str} -- 开始日期 (default: {None})，如为空，使用市场开始日期
             end {str} -- 结束日期 (default: {None})，如为空，使用当前日期
+            periods {list} -- 指定查询期间[(开始日期, 结束日期), ...]，为None时按项目周期划分 (default: {None})
 
 
         Usage:
@@ -239,7 +301,26 @@ class DataBrowse(SZXPage):
         self.select_level(level)
         self.load_all_code()
         self._log_info('==> ', level, start, end, " <==")
-        return self._loop_by_period(level, start, end)
+        return self._loop_by_period(level, start, end, periods)
+
+    def iter_data(self, level, start=None, end=None, periods=None):
+        """逐页获取项目数据
+
+        参数与`get_data`相同，依次生成各期间的分页数据，不在内存中合并。
+
+        Usage:
+            >>> for df in api.iter_data('3.1', '2018-01-01', '2018-08-01'):
+            ...     sink(df)
+        """
+        self.select_level(level)
+        self.load_all_code()
+        self._log_info('==> ', level, start, end, " <==")
+        ps = self._loop_periods(level, start, end, periods) or [(None, None)]
+        for t1, t2 in ps:
+            self.logger.info(f'>  时段 {t1} ~ {t2}')
+            self.set_t1_value(t1)
+            self.set_t2_value(t2)
+            yield from self._iter_html_table()
 
     @property
     def is_available(self):
@@ -247,25 +328,36 @@ class DataBrowse(SZXPage):
         API可用状态
 
         数据搜索经常会出现异常。
-        判定标准为加载全部代码，读取基本资料信息。如行数与股票代码数量一致，表明正常；否则异常。
+        判定标准为加载单一市场分类代码，读取基本资料信息。如行数与已选代码数量一致，表明正常；否则异常。
+        检查结果在`HEALTH_TTL`秒内有效，同类实例共用。
 
         如果此时状态异常，很容易丢失数据，导致数据不完整。须立即停止刷新。
         """
+        cached = DataBrowse._health.get('time')
+        if cached is not None and time.time() - cached < HEALTH_TTL:
+            return DataBrowse._health['status']
+        status = self._probe()
+        DataBrowse._health = {'time': time.time(), 'status': status}
+        return status
+
+    def _probe(self):
+        """以代码数量少的市场分类预览基本资料，检查行数与已选代码数量是否一致"""
         level = '1.1'
         self.select_level(level)  # 使用`select_level`方法
-        self.load_all_code()
+        self._clear_selected_codes()
+        self._load_markets([HEALTH_MARKET])
         span_css = 'div.select-box:nth-child(3) > div:nth-child(1) > span:nth-child(2)'
         expected = self._get_count_tip(span_css)
-        # # 选择单一字段，加快检查状态速度
-        # field_css = 'div.select-box:nth-child(2) > div:nth-child(3) > ul:nth-child(1) > li:nth-child(1) > label:nth-child(1) > span:nth-child(3)'
-        # self.driver.find_element_by_css_selector(field_css).click()
-        # add_btn_css = 'div.arrows-box:nth-child(3) > div:nth-child(1) > button:nth-child(1)'
-        # self.driver.find_element_by_css_selector(add_btn_css).click()
-        # 预览数据
-        self.driver.find_element_by_css_selector(self.preview_btn_css).click()
-        self._wait_for_preview()
-        actual = self._get_row_num()
-        return expected == actual
+        try:
+            # 预览数据
+            self._preview()
+            actual = self._get_row_num()
+        finally:
+            # 恢复为未加载代码状态，后续查询重新加载全部代码
+            self._clear_selected_codes()
+            self.code_loaded = False
+            self.current_codes = ()
+        return expected > 0 and expected == actual
 
     def get_levels_for(self, nth=3):
         """获取第nth种类别的分类层级"""
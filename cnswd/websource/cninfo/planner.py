@@ -0,0 +1,94 @@
+"""
+
+自适应期间规划
+
+按项目历史查询的行密度(每日行数)，合并稀疏期间、拆分密集期间，使每次查询约为一页数据。
+仅适用于以日期字符串表达期间的项目；季度、年度项目按原期间查询。
+
+由刷新程序统一规划与记录，各工作线程共用一个实例；
+`observe`只更新内存统计，`save`在每次运行结束时写入一次。
+"""
+import math
+import os
+import threading
+
+import pandas as pd
+
+from cnswd.utils import data_root
+
+# 密度指数加权系数，越大越偏重最近观测值
+ALPHA = 0.3
+DATE_FMT_STRS = ('B', 'D', 'W', 'M')
+
+
+class PeriodPlanner(object):
+    """期间规划器
+
+    Keyword Arguments:
+        path {str} -- 行密度统计文件 (default: {`record/cninfo_density.csv`})
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(data_root('record'), 'cninfo_density.csv')
+        self.path = path
+        try:
+            self.stats = pd.read_csv(path, index_col=0)['密度'].to_dict()
+        except FileNotFoundError:
+            self.stats = {}
+        self._lock = threading.Lock()
+
+    def density(self, key):
+        """项目每日平均行数，无统计时返回None"""
+        return self.stats.get(key)
+
+    def observe(self, key, start, end, rows):
+        """记录一次查询的行数"""
+        days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+        if days <= 0:
+            return
+        obs = rows / days
+        with self._lock:
+            old = self.stats.get(key)
+            self.stats[key] = obs if old is None else ALPHA * obs + (1 - ALPHA) * old
+
+    def save(self):
+        """写入行密度统计"""
+        with self._lock:
+            df = pd.DataFrame({'密度': pd.Series(self.stats, dtype='float64')})
+        df.index.name = '项目'
+        df.to_csv(self.path)
+
+    def plan(self, key, periods, budget, split=True):
+        """规划查询期间
+
+        Arguments:
+            key {str} -- 项目标识
+            periods {list} -- 按固定频率划分的期间[(开始日期, 结束日期), ...]
+            budget {int} -- 每次查询期望行数
+
+        Keyword Arguments:
+            split {bool} -- 是否拆分密集期间，为False时只合并稀疏期间 (default: {True})
+
+        Returns:
+            list -- 调整后的期间列表，覆盖范围与原期间一致
+        """
+        density = self.density(key)
+        if density is None or not periods:
+            return periods
+        # 每次查询可覆盖的天数
+        max_days = max(1, math.floor(budget / density)) if density > 0 else None
+        res = []
+        for s, e in periods:
+            if split and max_days is not None and (e - s).days + 1 > max_days:
+                # 拆分密集期间
+                for ps in pd.date_range(s, e, freq=f'{max_days}D'):
+                    pe = min(ps + pd.Timedelta(days=max_days - 1), e)
+                    res.append((ps, pe))
+            elif res and (max_days is None or (e - res[-1][0]).days + 1 <= max_days) \
+                    and (s - res[-1][1]).days <= 1:
+                # 与前一期间相邻且合并后仍在预算内
+                res[-1] = (res[-1][0], e)
+            else:
+                res.append((s, e))
+        return res
@@ -0,0 +1,631 @@
+"""
+
+本地替身网站
+
+模拟深证信`数据搜索`、`专题统计`单页应用，供网页版页面对象离线测试及性能基准使用。
+页面结构、元素css与页面对象所依赖的部分保持一致，数据为按需生成的合成数据。
+
+    1. 数据表支持三种读取方式：
+        model  -- 提供bootstrap-table客户端模型，可一次性读取全部数据
+        expand -- 模型仅含当前页数据，可将每页显示行数调整为总行数
+        pages  -- 无jQuery，只能逐页点击读取
+    2. 查询延时`latency`模拟服务端响应时间
+
+用法：
+    >>> with StandInSite(rows=500, latency=0.1) as site:
+    ...     with DataBrowse(clear_cache=False, base_url=site.base_url) as api:
+    ...         df = api.get_data('3.1', '2018-01-01', '2018-01-31')
+"""
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from cnswd.websource.cninfo.constants import DB_CSS, DB_NAME, TS_CSS, TS_NAME
+
+# 网页可选每页显示行数
+DB_VIEWS = [10, 20, 50]
+TS_VIEWS = [20, 50, 100, 200]
+# 专题统计中读取`全部`选项的项目，其余含选项的项目逐项读取
+TS_ALL_OPTION_LEVELS = ('2.1', '3.6', '5.1', '5.4', '5.5', '5.6')
+TS_OPTIONS = ['类别一', '类别二', '类别三']
+# 市场分类及代码前缀
+MARKETS = {
+    '深市A': ('137001001', '000'),
+    '深市B': ('137001002', '200'),
+    '沪市A': ('137001003', '600'),
+    '沪市B': ('137001004', '900'),
+    '科创板': ('137001005', '688'),
+}
+TABLE_MODES = ('model', 'expand', 'pages')
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>深证信数据服务</title>
+<style>
+.classify-tree li.closed > ul {display: none;}
+.list span {display: inline-block; margin: 1px;}
+.list span.selected {background: #ccc;}
+.btn-group > ul {display: none;}
+.btn-group.open > ul {display: block;}
+.hidden {display: none;}
+</style>
+</head>
+<body>
+<div id="app"></div>
+<script>
+var CONFIG = __CONFIG__;
+__SCRIPT__
+</script>
+</body>
+</html>
+"""
+
+# 单页应用：按`#/页面名称`呈现页面，查询通过XHR读取`/data`
+PAGE_SCRIPT = """
+(function () {
+    var name = location.hash.replace(/^#\\//, '') || 'dataBrowse';
+    var meta = CONFIG.pages[name];
+    var app = document.getElementById('app');
+    var state = {level: null, headers: [], rows: [], models: null,
+                 pageSize: meta.views[0], pageNumber: 1, onces: {}};
+
+    window.addEventListener('hashchange', function () {
+        location.reload();
+    });
+
+    var q = function (css, root) {
+        return (root || document).querySelector(css);
+    };
+    var qa = function (css, root) {
+        return Array.prototype.slice.call((root || document).querySelectorAll(css));
+    };
+    var esc = function (s) {
+        return String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    };
+    var closest = function (el, css) {
+        while (el && el.nodeType === 1) {
+            if (el.matches(css)) {
+                return el;
+            }
+            el = el.parentNode;
+        }
+        return null;
+    };
+    var post = function (url, body, callback) {
+        var xhr = new XMLHttpRequest();
+        xhr.open('POST', url);
+        xhr.setRequestHeader('Content-Type', 'application/json');
+        xhr.onload = function () {
+            callback(JSON.parse(xhr.responseText));
+        };
+        xhr.send(JSON.stringify(body));
+    };
+
+    var selectBox = function (title, tip) {
+        return '<div class="select-box"><div><label>全选</label>' +
+            (tip ? '<span>' + title + '<i>0</i></span>' : '') +
+            '</div>' + (tip === 'tree' ? '<div class="classify"></div>' : '') +
+            '<div class="list"><ul></ul></div></div>';
+    };
+    var arrowsBox = '<div class="arrows-box"><div><button type="button">添加</button>' +
+        '<button type="button">移除</button></div></div>';
+
+    var levelLinks = meta.levels.map(function (item) {
+        return '<li><a data-name="' + esc(item.key) + '" data-level="' + item.level +
+            '">' + esc(item.name) + '</a></li>';
+    }).join('');
+
+    var html = '<div class="header"><span id="' + meta.name_id + '">' + meta.title + '</span></div>' +
+        '<div class="api-left"><div class="api-search-left"><input type="text">' +
+        '<i class="search">搜索</i></div><ul class="api-tree">' + levelLinks + '</ul></div>' +
+        '<div class="api-right"><div id="conditions"></div>';
+    if (meta.codes) {
+        var markets = Object.keys(CONFIG.markets).map(function (m) {
+            return '<li class="tree-empty"><a data-name="' + m + '" data-id="' +
+                CONFIG.markets[m] + '" data-param="platetype=137001&platecode=' +
+                CONFIG.markets[m] + '">' + m + '</a></li>';
+        }).join('');
+        var roots = ['证监会行业分类', '国证行业分类', '申万行业分类', '地区分类', '指数分类'];
+        var tree = roots.map(function (r) {
+            return '<li class="closed"><span class="toggler"></span><a data-name="' + r + '">' + r + '</a></li>';
+        }).join('') + '<li class="closed"><span class="toggler"></span><a data-name="市场分类">市场分类</a>' +
+            '<ul>' + markets + '</ul></li>';
+        html += '<div class="select-area codes">' +
+            selectBox('待选', 'tree') + arrowsBox + selectBox('已选', 'tip') + '</div>' +
+            '<div class="select-area fields"><div class="title">字段</div>' +
+            selectBox('', null) + arrowsBox + selectBox('', null) + '</div>';
+    }
+    html += '<div class="btn-area"><button type="button" class="btn ' + meta.btn + '">预览数据</button></div>' +
+        '<div class="onloading" style="display: none;"></div>' +
+        '<span class="tips" style="display: none;"></span>' +
+        '<div class="bootstrap-table"><div class="fixed-table-container">' +
+        '<div class="fixed-table-loading" style="display: none;">正在努力地加载数据中</div>' +
+        '<table id="contentTable" class="table"></table></div>' +
+        '<div class="fixed-table-pagination"></div></div></div>';
+    app.innerHTML = html;
+    if (meta.codes) {
+        q('.classify').innerHTML = '<ul class="classify-tree">' + tree + '</ul>';
+    }
+
+    var codeBoxes = qa('.select-area.codes > .select-box');
+    var fieldBoxes = qa('.select-area.fields > .select-box');
+    var table = q('#contentTable');
+
+    var updateTips = function () {
+        codeBoxes.forEach(function (box) {
+            var i = q('span > i', box);
+            if (i) {
+                i.textContent = qa('.list span', box).length;
+            }
+        });
+    };
+    var move = function (from, to) {
+        var ul = q('.list > ul', to);
+        qa('.list span.selected', from).forEach(function (span) {
+            span.classList.remove('selected');
+            ul.appendChild(span.parentNode);
+        });
+        updateTips();
+    };
+    var fillList = function (box, items) {
+        q('.list > ul', box).innerHTML = items.map(function (item) {
+            return '<li><span data-id="' + esc(item[0]) + '" data-name="' + esc(item[1]) +
+                '">' + esc(item[0]) + ' ' + esc(item[1]) + '</span></li>';
+        }).join('');
+        updateTips();
+    };
+
+    // bootstrap-table客户端模型
+    var currentRows = function () {
+        var start = (state.pageNumber - 1) * state.pageSize;
+        return state.rows.slice(start, start + state.pageSize);
+    };
+    var toModels = function (rows) {
+        return rows.map(function (row) {
+            var obj = {};
+            row.forEach(function (v, j) {
+                obj['f' + j] = v;
+            });
+            return obj;
+        });
+    };
+    var bootstrapTable = {
+        getOptions: function () {
+            if (CONFIG.table === 'model') {
+                state.models = state.models || toModels(state.rows);
+                return {data: state.models, pageSize: state.pageSize};
+            }
+            return {data: toModels(currentRows()), pageSize: state.pageSize};
+        },
+        refreshOptions: function (options) {
+            if (options.pageSize) {
+                state.pageSize = options.pageSize;
+                state.pageNumber = 1;
+            }
+            renderTable();
+        }
+    };
+    if (CONFIG.table !== 'pages') {
+        var Wrapped = function (elems) {
+            this.elems = elems;
+            this.length = elems.length;
+        };
+        Wrapped.prototype.data = function (key) {
+            return this.elems.length && this.elems[0] === table && key === 'bootstrap.table' ?
+                bootstrapTable : undefined;
+        };
+        Wrapped.prototype.filter = function (fn) {
+            return new Wrapped(this.elems.filter(function (el, i) {
+                return fn.call(el, i, el);
+            }));
+        };
+        Wrapped.prototype.first = function () {
+            return new Wrapped(this.elems.slice(0, 1));
+        };
+        Wrapped.prototype.one = function (event, fn) {
+            (state.onces[event] = state.onces[event] || []).push(fn);
+            return this;
+        };
+        Wrapped.prototype.bootstrapTable = function (method, options) {
+            var res = bootstrapTable[method](options);
+            return res === undefined ? this : res;
+        };
+        window.jQuery = function (arg) {
+            if (typeof arg === 'string') {
+                return new Wrapped(qa(arg));
+            }
+            return new Wrapped(arg ? [arg] : []);
+        };
+    }
+    var trigger = function (event) {
+        var fns = state.onces[event] || [];
+        state.onces[event] = [];
+        fns.forEach(function (fn) {
+            fn();
+        });
+    };
+
+    var renderPagination = function () {
+        var total = state.rows.length;
+        var box = q('.fixed-table-pagination');
+        if (total === 0) {
+            box.innerHTML = '';
+            return;
+        }
+        var pages = Math.ceil(total / state.pageSize);
+        var first = (state.pageNumber - 1) * state.pageSize + 1;
+        var last = Math.min(total, state.pageNumber * state.pageSize);
+        var sizes = meta.views.map(function (v) {
+            return '<li' + (v === state.pageSize ? ' class="active"' : '') + '><a>' + v + '</a></li>';
+        }).join('');
+        var html = '<div class="pull-left pagination-detail"><span class="pagination-info">显示第 ' +
+            first + ' 到第 ' + last + ' 条记录，总共 ' + total + ' 条记录</span>' +
+            '<span class="page-list">每页显示 <span class="btn-group dropup">' +
+            '<button type="button" class="btn btn-default dropdown-toggle"><span class="page-size">' +
+            state.pageSize + '</span> <span class="caret"></span></button>' +
+            '<ul class="dropdown-menu" role="menu">' + sizes + '</ul></span> 条记录</span></div>';
+        if (pages > 1) {
+            var from = Math.max(1, state.pageNumber - 2);
+            var to = Math.min(pages, state.pageNumber + 2);
+            var lis = '<li class="page-pre"><a>‹</a></li>';
+            if (from > 1) {
+                lis += '<li class="page-first"><a>1</a></li><li class="page-first-separator disabled"><a>...</a></li>';
+            }
+            for (var i = from; i <= to; i++) {
+                lis += '<li class="page-number' + (i === state.pageNumber ? ' active' : '') +
+                    '"><a>' + i + '</a></li>';
+            }
+            if (to < pages) {
+                lis += '<li class="page-last-separator disabled"><a>...</a></li><li class="page-last"><a>' +
+                    pages + '</a></li>';
+            }
+            lis += '<li class="page-next"><a>›</a></li>';
+            html += '<div class="pull-right pagination"><ul class="pagination">' + lis + '</ul></div>';
+        }
+        box.innerHTML = html;
+    };
+
+    var renderTable = function () {
+        var thead = '<thead><tr>' + state.headers.map(function (h, j) {
+            return '<th data-field="f' + j + '"><div class="th-inner">' + esc(h) + '</div></th>';
+        }).join('') + '</tr></thead>';
+        var body;
+        if (state.rows.length === 0) {
+            body = '<tr class="no-records-found"><td colspan="' + Math.max(1, state.headers.length) +
+                '">没有找到匹配的记录</td></tr>';
+        } else {
+            body = currentRows().map(function (row) {
+                return '<tr>' + row.map(function (v) {
+                    return '<td>' + esc(v) + '</td>';
+                }).join('') + '</tr>';
+            }).join('');
+        }
+        table.innerHTML = thead + '<tbody>' + body + '</tbody>';
+        renderPagination();
+        trigger('post-body.bs.table');
+    };
+
+    var loading = function (show) {
+        var style = show ? 'display: block;' : 'display: none;';
+        q('.onloading').setAttribute('style', style);
+        q('.fixed-table-loading').setAttribute('style', style);
+    };
+
+    var conditions = function () {
+        var inputs = qa('#conditions input');
+        var quarter = q('#conditions .condition2 > select');
+        var option = q('#conditions .condition6 > select');
+        return {
+            t1: inputs.length > 0 ? inputs[0].value : '',
+            t2: quarter ? quarter.value : (inputs.length > 1 ? inputs[1].value : ''),
+            option: option ? option.value : null
+        };
+    };
+
+    var query = function () {
+        var body = conditions();
+        body.page = name;
+        body.level = state.level;
+        if (meta.codes) {
+            body.codes = qa('.list span', codeBoxes[1]).map(function (s) {
+                return s.getAttribute('data-id');
+            });
+            body.fields = qa('.list span', fieldBoxes[1]).map(function (s) {
+                return parseInt(s.getAttribute('data-id'), 10);
+            });
+        }
+        loading(true);
+        post('/data', body, function (res) {
+            state.headers = res.headers;
+            state.rows = res.rows;
+            state.models = null;
+            state.pageSize = meta.views[0];
+            state.pageNumber = 1;
+            renderTable();
+            table.removeAttribute('style');
+            loading(false);
+        });
+    };
+
+    var selectLevel = function (a) {
+        qa('.api-tree a').forEach(function (x) {
+            x.setAttribute('class', '');
+        });
+        a.setAttribute('class', 'active');
+        state.level = a.getAttribute('data-level');
+        var item = meta.levels.filter(function (x) {
+            return x.level === state.level;
+        })[0];
+        q('#conditions').innerHTML = item.html;
+        if (meta.codes) {
+            fillList(fieldBoxes[0], CONFIG.headers.map(function (h, j) {
+                return [j, h];
+            }));
+            q('.list > ul', fieldBoxes[1]).innerHTML = '';
+        }
+        if (item.auto) {
+            // 无查询条件的项目，选中后自动加载默认数据
+            table.setAttribute('style', 'display: none;');
+            query();
+        }
+    };
+
+    var selectMarket = function (a) {
+        qa('.classify-tree a').forEach(function (x) {
+            x.setAttribute('class', '');
+        });
+        q('.list > ul', codeBoxes[0]).innerHTML = '';
+        a.setAttribute('class', 'active');
+        post('/codes', {market: a.getAttribute('data-name')}, function (res) {
+            var selected = {};
+            qa('.list span', codeBoxes[1]).forEach(function (s) {
+                selected[s.getAttribute('data-id')] = true;
+            });
+            fillList(codeBoxes[0], res.codes.filter(function (c) {
+                return selected[c[0]] !== true;
+            }));
+        });
+    };
+
+    var changePage = function (li) {
+        var pages = Math.ceil(state.rows.length / state.pageSize);
+        var n;
+        if (li.classList.contains('page-pre')) {
+            n = state.pageNumber - 1;
+        } else if (li.classList.contains('page-next')) {
+            n = state.pageNumber + 1;
+        } else {
+            n = parseInt(li.textContent, 10);
+        }
+        if (n >= 1 && n <= pages) {
+            state.pageNumber = n;
+            renderTable();
+        }
+    };
+
+    document.addEventListener('click', function (e) {
+        var t = e.target, el;
+        if (closest(t, '.api-search-left > i')) {
+            var text = q('.api-search-left > input').value.trim();
+            qa('.api-tree li').forEach(function (li) {
+                var key = q('a', li).getAttribute('data-name');
+                li.setAttribute('class', key.indexOf(text) >= 0 ? '' : 'hidden');
+            });
+        } else if ((el = closest(t, '.api-tree a'))) {
+            selectLevel(el);
+        } else if ((el = closest(t, '.classify-tree > li > span'))) {
+            var li = el.parentNode;
+            li.setAttribute('class', li.getAttribute('class') === 'closed' ? 'opened' : 'closed');
+        } else if ((el = closest(t, '.classify-tree li.tree-empty > a'))) {
+            selectMarket(el);
+        } else if ((el = closest(t, '.list span'))) {
+            el.classList.toggle('selected');
+        } else if ((el = closest(t, '.select-box > div > label'))) {
+            qa('.list span', el.parentNode.parentNode).forEach(function (s) {
+                s.classList.add('selected');
+            });
+        } else if ((el = closest(t, '.arrows-box button'))) {
+            var boxes = el.parentNode.parentNode.parentNode.querySelectorAll(':scope > .select-box');
+            var add = el === el.parentNode.firstElementChild;
+            move(add ? boxes[0] : boxes[1], add ? boxes[1] : boxes[0]);
+        } else if (closest(t, '.' + meta.btn)) {
+            query();
+        } else if (closest(t, '.dropdown-toggle')) {
+            var group = q('.btn-group');
+            group.setAttribute('class', group.getAttribute('class') === 'btn-group dropup' ?
+                'btn-group dropup open' : 'btn-group dropup');
+        } else if ((el = closest(t, '.btn-group > ul > li'))) {
+            q('.btn-group').setAttribute('class', 'btn-group dropup');
+            state.pageSize = parseInt(el.textContent, 10);
+            state.pageNumber = 1;
+            renderTable();
+        } else if ((el = closest(t, 'ul.pagination > li'))) {
+            changePage(el);
+        }
+    });
+})();
+"""
+
+
+def _input(id_=None, cls='form-control date'):
+    id_attr = f' id="{id_}"' if id_ else ''
+    return f'<input{id_attr} class="{cls}" type="text" value="">'
+
+
+def _select(label, options):
+    items = ''.join(f'<option value="{v}">{t}</option>' for v, t in options)
+    return f'<label>{label}</label><select class="form-control">{items}</select>'
+
+
+def condition_html(t1_css, t2_css, option_css=None, label=None):
+    """按页面对象使用的css构造查询条件元素"""
+    parts = []
+    if t1_css is None:
+        pass
+    elif t1_css.endswith('_sele'):
+        # 年份输入
+        parts.append(f'<div class="condition1">{_input(t1_css[1:], "form-control")}</div>')
+    elif t1_css.startswith('#'):
+        # 指定容器的日期输入，如`#dBDatepair > input:nth-child(1)`
+        box = t1_css.split(' ')[0][1:]
+        n = 2 if t2_css and t2_css.startswith('input') else 1
+        parts.append(f'<div id="{box}" class="condition1">{_input(cls="form-control") * n}</div>')
+    else:
+        parts.append(f'<div class="condition1">{_input() * 2}</div>')
+    if t2_css and t2_css.startswith('.condition2'):
+        quarters = [(i, f'第{i}季度') for i in (1, 2, 3, 4)]
+        parts.append(f'<div class="condition2">{_select("季度", quarters)}</div>')
+    if option_css is not None:
+        if label == '交易市场':
+            options = [('', '全部')] + [(t, t) for t in TS_OPTIONS]
+        else:
+            options = [(t, t) for t in TS_OPTIONS]
+        parts.append(f'<div class="condition6">{_select(label, options)}</div>')
+    return ''.join(parts)
+
+
+def _levels(name_map, css_map, is_ts):
+    res = []
+    for level, name in name_map.items():
+        css = css_map.get(level)
+        if css is None:
+            continue
+        t1_css, t2_css = css[0], css[1]
+        option_css = css[2] if is_ts else None
+        label = '交易市场' if level in TS_ALL_OPTION_LEVELS else '分类'
+        res.append({'level': level, 'name': name, 'key': name.lower(),
+                    'html': condition_html(t1_css, t2_css, option_css, label),
+                    'auto': is_ts and not any(css)})
+    return res
+
+
+def market_codes(market, n):
+    """市场分类合成代码[(代码, 简称), ...]"""
+    prefix = MARKETS[market][1]
+    return [(f'{prefix}{i:03d}', f'{market}{i:03d}') for i in range(1, n + 1)]
+
+
+class StandInSite(object):
+    """深证信网站替身
+
+    Keyword Arguments:
+        rows {int|dict} -- 每次查询返回行数，或按项目层级指定 (default: {100})
+        columns {int} -- 数据列数量，不少于3列 (default: {8})
+        codes_per_market {int} -- 每个市场分类代码数量 (default: {50})
+        latency {float} -- 查询延时，单位：秒 (default: {0})
+        table {str} -- 数据表读取方式，见`TABLE_MODES` (default: {'model'})
+    """
+
+    def __init__(self, rows=100, columns=8, codes_per_market=50, latency=0,
+                 table='model'):
+        assert table in TABLE_MODES, f'数据表读取方式可接受范围：{TABLE_MODES}'
+        self.rows = rows
+        self.headers = ['证券代码', '证券简称', '日期'] + \
+            [f'指标{i}' for i in range(1, max(columns, 3) - 2)]
+        self.codes = {m: market_codes(m, codes_per_market) for m in MARKETS}
+        self.latency = latency
+        self.table = table
+        self.queries = []      # 已执行查询(参数, 行数)
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def page(self):
+        """单页应用网页内容"""
+        config = {
+            'table': self.table,
+            'headers': self.headers,
+            'markets': {m: v[0] for m, v in MARKETS.items()},
+            'pages': {
+                'dataBrowse': {
+                    'title': '数据搜索', 'name_id': 'apiName', 'btn': 'dataBrowseBtn',
+                    'codes': True, 'views': DB_VIEWS,
+                    'levels': _levels(DB_NAME, DB_CSS, False)},
+                'thematicStatistics': {
+                    'title': '专题统计', 'name_id': 'apiName2',
+                    'btn': 'thematicStatisticsBtn', 'codes': False, 'views': TS_VIEWS,
+                    'levels': _levels(TS_NAME, TS_CSS, True)},
+            },
+        }
+        content = json.dumps(config, ensure_ascii=False)
+        return PAGE_HTML.replace('__CONFIG__', content).replace('__SCRIPT__', PAGE_SCRIPT)
+
+    def row_num(self, level):
+        if isinstance(self.rows, dict):
+            return self.rows.get(level, 0)
+        return self.rows
+
+    def query(self, params):
+        """按查询条件生成数据 {'headers':[表头], 'rows':[[值,...],...]}"""
+        if params.get('page') == 'dataBrowse':
+            codes = params.get('codes') or []
+            n = self.row_num(params.get('level')) if codes else 0
+        else:
+            codes = [c for m in MARKETS for c, _ in self.codes[m]]
+            n = self.row_num(params.get('level'))
+        fields = params.get('fields') or list(range(len(self.headers)))
+        date = params.get('t1') or '2018-01-01'
+        rows = []
+        for i in range(n):
+            code = codes[i % len(codes)]
+            row = [code, f'股票{code}', date] + \
+                [f'{(i * 7 + j) % 100000 / 100:.2f}' for j in range(len(self.headers) - 3)]
+            rows.append([row[j] for j in fields])
+        if self.latency:
+            time.sleep(self.latency)
+        self.queries.append((params, n))
+        return {'headers': [self.headers[j] for j in fields], 'rows': rows}
+
+    def pages(self, view):
+        """以每页`view`行计，已执行查询的总页数"""
+        return sum(max(1, math.ceil(n / view)) for _, n in self.queries)
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _send(self, content, content_type):
+                content = content.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                self._send(site.page(), 'text/html')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8')
+                path = urlparse(self.path).path
+                params = json.loads(body) if body.startswith('{') else dict(parse_qsl(body))
+                if path == '/codes':
+                    res = {'codes': site.codes.get(params.get('market'), [])}
+                else:
+                    res = site.query(params)
+                self._send(json.dumps(res, ensure_ascii=False), 'application/json')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -9,7 +9,6 @@ import re
 import time
 import numpy as np
 import pandas as pd
-from cnswd.utils import loop_period_by
 from selenium.common.exceptions import (ElementNotInteractableException,
                                         NoSuchElementException,
                                         StaleElementReferenceException,
@@ -29,6 +28,7 @@ class ThematicStatistics(SZXPage):
     # 改写的属性
     preview_btn_css = '.thematicStatisticsBtn'
     wait_for_preview_css = '.fixed-table-loading' # '.fixed-table-header'
+    observe_preview = False  # 以`#contentTable`呈现为准，见`_wait_for_preview`
     view_selection = {1: 20, 2: 50, 3: 100, 4: 200}
     name_map = TS_NAME
     css_map = TS_CSS
@@ -92,30 +92,19 @@ class ThematicStatistics(SZXPage):
         self.set_t2_value(t2)
         return self._loop_options(level)
 
-    def _loop_by_period(self, level, start, end):
-        # 循环指示字符位于第5项
-        loop_str = self.date_map[level][0]
-        # 排除未来日期指示在第6项
-        include = self.date_map[level][1]
-        if loop_str is None:
+    def _loop_by_period(self, level, start, end, periods=None):
+        ps = self._loop_periods(level, start, end, periods)
+        if ps is None:
             return self._get_data(level, None, None)
-        freq = loop_str[0]
-        fmt_str = loop_str[1]
-        if fmt_str in ('B', 'D', 'W', 'M'):
-            def t1_fmt_func(x): return x.strftime(r'%Y-%m-%d')
-            def t2_fmt_func(x): return x.strftime(r'%Y-%m-%d')
-        elif fmt_str == 'Q':
-            def t1_fmt_func(x): return x.year
-            def t2_fmt_func(x): return x.quarter
-        elif fmt_str == 'Y':
-            def t1_fmt_func(x): return x.year
-            def t2_fmt_func(x): return None
-        else:
-            raise ValueError(f'{loop_str}为错误格式。')
-        ps = loop_period_by(start, end, freq, include)
+        if self.tabs > 1:
+            # 期间与选项组合，分配至各标签页
+            options = self._option_texts(level)
+            tasks = [(t1, t2, o) for t1, t2 in ps for o in options]
+            if len(tasks) > 1:
+                return self._fetch_by_tabs(
+                    tasks, lambda t1, t2, o: self._prepare(level, t1, t2, o))
         dfs = []
-        for i, (s, e) in enumerate(ps, 1):
-            t1, t2 = t1_fmt_func(s), t2_fmt_func(e)
+        for i, (t1, t2) in enumerate(ps, 1):
             self._log_info('>', level, t1, t2)
             df = self._get_data(level, t1, t2)
             dfs.append(df)
@@ -123,7 +112,37 @@ class ThematicStatistics(SZXPage):
                 time.sleep(np.random.random())
         return _concat(dfs)
 
-    def get_data(self, level, start=None, end=None):
+    def _option_texts(self, level):
+        """项目需逐项读取的选项文本
+
+        无选项时为[None]；读取`全部`选项时为['']
+        """
+        css = self.css_map[level][2]
+        if css is None:
+            return [None]
+        label_css = css.split('>')[0] + ' > label:nth-child(1)'
+        label = self.driver.find_element_by_css_selector(label_css)
+        if label.text in ('交易市场', '控制类型'):
+            return ['']
+        elem = self.driver.find_element_by_css_selector(css)
+        return [o.text for o in Select(elem).options]
+
+    def _prepare(self, level, t1, t2, option):
+        """多标签页模式下，在当前标签页设置查询条件"""
+        self.select_level(level)
+        self._log_info('>', level, t1, t2, option or '')
+        self.set_t1_value(t1)
+        self.set_t2_value(t2)
+        if option is not None:
+            elem = self.driver.find_element_by_css_selector(
+                self.css_map[level][2])
+            select = Select(elem)
+            if option:
+                select.select_by_visible_text(option)
+            else:
+                select.select_by_value("")
+
+    def get_data(self, level, start=None, end=None, periods=None):
         """获取项目数据
 
         Arguments:
@@ -132,6 +151,7 @@ class ThematicStatistics(SZXPage):
         Keyword Arguments:
             start {str} -- 开始日期 (default: {None})，如为空，使用市场开始日期
             end {str} -- 结束日期 (default: {None})，如为空，使用当前日期
+            periods {list} -- 指定查询期间[(开始日期, 结束日期), ...]，为None时按项目周期划分 (default: {None})
 
 
         Usage:
@@ -145,9 +165,24 @@ class ThematicStatistics(SZXPage):
         if self.current_t1_css:
             # 由于专题统计会预先加载默认数据，需要等待日期元素可见后，才可执行下一步
             self._wait_for_visibility(self.current_t1_css, self.api_name)
-        df = self._loop_by_period(level, start, end)
+        df = self._loop_by_period(level, start, end, periods)
         return df
 
+    def iter_data(self, level, start=None, end=None, periods=None):
+        """逐页获取项目数据
+
+        参数与`get_data`相同，依次生成各期间、各选项的分页数据，不在内存中合并。
+        """
+        self.select_level(level)
+        if self.current_t1_css:
+            self._wait_for_visibility(self.current_t1_css, self.api_name)
+        ps = self._loop_periods(level, start, end, periods) or [(None, None)]
+        options = self._option_texts(level)
+        for t1, t2 in ps:
+            for o in options:
+                self._prepare(level, t1, t2, o)
+                yield from self._iter_html_table()
+
     def _loop_options(self, level):
         """循环读取所有可选项目数据"""
         # 第三项为选项css
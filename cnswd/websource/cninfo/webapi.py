@@ -0,0 +1,342 @@
+"""
+
+深证信数据服务JSON接口
+
+网页版`数据搜索`、`专题统计`均为单页应用，数据通过XHR调用服务端接口取得。
+本模块直接请求这些接口，免去浏览器操作，与网页版保持相同的`get_data`用法及项目层级。
+
+用法：
+    >>> with DataBrowseClient() as api:
+    ...     df = api.get_data('4.1', '2018-01-01', '2018-08-01')
+"""
+import base64
+import time
+
+import logbook
+import numpy as np
+import pandas as pd
+import requests
+
+from cnswd.utils import loop_codes, loop_period_by
+from cnswd.websource.exceptions import ConnectFailed, RetryException
+
+from .base import _concat
+from .constants import (API_BASE_URL, API_DATE_FMT, CLASSIFY_API, DB_API,
+                        DB_DATE_FREQ, DB_NAME, FIELD_API, HEALTH_MARKET,
+                        HEALTH_TTL, MARKET_PLATE_TYPE, MARKET_PLATES,
+                        OPTION_API, TIMEOUT, TS_API, TS_DATE_FREQ, TS_NAME,
+                        TS_OPTIONS)
+
+# 每批请求的股票代码数量
+BATCH_CODE_NUM = 300
+# 单次请求最多尝试次数
+MAX_TRY = 3
+
+
+def _mcode():
+    """请求头校验码：当前时间戳(秒)的base64编码"""
+    ts = str(int(time.time()))
+    return base64.b64encode(ts.encode('utf-8')).decode('utf-8')
+
+
+def _period_params(fmt_str, s, e):
+    """根据日期格式指示构造期间查询参数"""
+    if fmt_str in ('B', 'D', 'W', 'M'):
+        return {'sdate': s.strftime(API_DATE_FMT),
+                'edate': e.strftime(API_DATE_FMT)}
+    elif fmt_str == 'Q':
+        # 报告期为季度末
+        rdate = e + pd.offsets.QuarterEnd(0)
+        return {'rdate': rdate.strftime(API_DATE_FMT)}
+    elif fmt_str == 'Y':
+        return {'rdate': f'{e.year}1231'}
+    raise ValueError(f'{fmt_str}为错误格式。')
+
+
+class WebApiClient(object):
+    """深证信数据服务JSON接口基础类"""
+
+    # 子类需要改写的属性
+    api_name = ''
+    name_map = {}
+    date_map = {}
+    api_map = {}
+
+    def __init__(self, clear_cache=True, base_url=API_BASE_URL):
+        # `clear_cache`仅为兼容网页版参数，接口版无缓存需要清理
+        self.base_url = base_url.rstrip('/')
+        self.logger = logbook.Logger("深证信")
+        self.session = None
+        self.reset()
+
+    def reset(self):
+        """重建会话"""
+        if self.session is not None:
+            self.session.close()
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Referer': f'{self.base_url}/',
+            'X-Requested-With': 'XMLHttpRequest',
+        })
+        self._fields = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.session.close()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.base_url})'
+
+    def _request(self, api, params=None):
+        """请求接口，返回记录列表"""
+        url = f'{self.base_url}/api/{api}'
+        for i in range(MAX_TRY):
+            try:
+                r = self.session.post(url, data=params,
+                                      headers={'Accept-EncKey': _mcode()},
+                                      timeout=TIMEOUT)
+                r.raise_for_status()
+                res = r.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.logger.warning(f'第{i+1}次尝试。{api} 错误：{e}')
+                time.sleep(np.random.random())
+                continue
+            code = res.get('resultcode')
+            if code != 200:
+                raise RetryException(
+                    f"接口{api}返回异常：{code} {res.get('resultmsg', '')}")
+            return res.get('records', [])
+        raise ConnectFailed(f'无法连接接口：{url}')
+
+    def _get_fields(self, api):
+        """接口输出字段(编码, 中文名称)列表，按显示顺序排列"""
+        if api not in self._fields:
+            records = self._request(FIELD_API, {'apiname': api})
+            records = sorted(records, key=lambda x: int(x.get('sortNo', 0)))
+            fields = [(r['fieldName'], r['fieldChineseName']) for r in records]
+            if not fields:
+                # 不缓存，下次重新读取
+                return fields
+            self._fields[api] = fields
+        return self._fields[api]
+
+    def _to_dataframe(self, api, records):
+        """记录转换为与网页表格一致的数据框(中文列名)
+
+        无字段信息时保留原始列名；有字段信息而记录中无任一字段，视为接口输出已变更
+        """
+        fields = self._get_fields(api)
+        if not records:
+            return pd.DataFrame()
+        df = pd.DataFrame.from_records(records)
+        if not fields:
+            self.logger.warning(f'接口{api}无字段信息，保留原始列名')
+            return df.replace(['-', '无', ''], np.nan)
+        codes = [c for c, _ in fields if c in df.columns]
+        if not codes:
+            raise RetryException(
+                f'接口{api}记录中无任一输出字段，记录列：{list(df.columns)}')
+        df = df[codes].rename(columns=dict(fields))
+        # 与网页表格保持一致
+        return df.replace(['-', '无', ''], np.nan)
+
+    def _query(self, level, params):
+        """读取项目数据"""
+        api = self.api_map[level]
+        return self._to_dataframe(api, self._request(api, params))
+
+    def _iter_query(self, level, params):
+        """逐批读取项目数据"""
+        yield self._query(level, params)
+
+    def _check_level(self, level):
+        """检查项目层级"""
+        if level not in self.api_map:
+            raise ValueError(f'{self.api_name}无项目：{level}')
+
+    def _option_params(self, level, option=None):
+        """项目各选项查询参数列表，无选项时为[{}]"""
+        if option is not None:
+            raise ValueError(f'{self.api_name}项目{level}无下拉选项')
+        return [{}]
+
+    def _query_params(self, level, start, end, option=None, periods=None):
+        """项目查询参数列表(期间与选项组合)"""
+        options = self._option_params(level, option)
+        return [dict(p, **o)
+                for p in self._period_params(level, start, end, periods)
+                for o in options]
+
+    def _period_params(self, level, start, end, periods=None):
+        """项目各期间查询参数列表"""
+        loop_str = self.date_map[level][0]
+        include = self.date_map[level][1]
+        if loop_str is None:
+            return [{}]
+        freq, fmt_str = loop_str[0], loop_str[1]
+        if periods is None:
+            ps = loop_period_by(start, end, freq, include)
+        else:
+            ps = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in periods]
+        return [_period_params(fmt_str, s, e) for s, e in ps]
+
+    def _loop_by_period(self, level, start, end, option=None, periods=None):
+        """分时期段读取数据"""
+        dfs = []
+        for params in self._query_params(level, start, end, option, periods):
+            self.logger.info(f'>  时段 {params}')
+            dfs.append(self._query(level, params))
+        return _concat(dfs)
+
+    def get_data(self, level, start=None, end=None, option=None, periods=None):
+        """获取项目数据
+
+        Arguments:
+            level {str} -- 项目层级
+
+        Keyword Arguments:
+            start {str} -- 开始日期 (default: {None})，如为空，使用市场开始日期
+            end {str} -- 结束日期 (default: {None})，如为空，使用当前日期
+            option {str} -- 下拉选项值，为None时按项目读取方式读取全部选项 (default: {None})
+            periods {list} -- 指定查询期间[(开始日期, 结束日期), ...]，为None时按项目周期划分 (default: {None})
+
+        Returns:
+            pd.DataFrame -- 如期间没有数据，返回长度为0的空表
+        """
+        self._check_level(level)
+        item = self.name_map[level]
+        self.logger.info(f'==> {item} {start or ""} ~ {end or ""} <==')
+        return self._loop_by_period(level, start, end, option, periods)
+
+    def iter_data(self, level, start=None, end=None, option=None, periods=None):
+        """逐批获取项目数据
+
+        参数与`get_data`相同，依次生成各期间、各选项、各批次数据，不在内存中合并。
+        """
+        self._check_level(level)
+        for params in self._query_params(level, start, end, option, periods):
+            self.logger.info(f'>  时段 {params}')
+            yield from self._iter_query(level, params)
+
+    @property
+    def is_available(self):
+        """接口可用状态"""
+        try:
+            self._request(FIELD_API, {'apiname': self.api_map['1.1']})
+        except Exception as e:
+            self.logger.error(e)
+            return False
+        return True
+
+
+class DataBrowseClient(WebApiClient):
+    """数据搜索JSON接口"""
+
+    api_name = '数据搜索'
+    name_map = DB_NAME
+    date_map = DB_DATE_FREQ
+    api_map = DB_API
+    all_codes = ()             # 全部股票代码
+    _health = {}               # 可用状态缓存 {'time':检查时间, 'status':状态}
+
+    def reset(self):
+        super().reset()
+        self.all_codes = ()
+
+    @property
+    def stock_code_list(self):
+        """全部股票代码"""
+        if not self.all_codes:
+            codes = []
+            for market, code in MARKET_PLATES.items():
+                self.logger.info(f"加载{market}代码")
+                records = self._request(
+                    CLASSIFY_API, {'platetype': MARKET_PLATE_TYPE, 'platecode': code})
+                codes.extend(r['SECCODE'] for r in records)
+            self.all_codes = tuple(sorted(set(codes)))
+        return self.all_codes
+
+    def _query(self, level, params):
+        """分批代码读取项目数据"""
+        api = self.api_map[level]
+        records = []
+        for batch_codes in loop_codes(self.stock_code_list, BATCH_CODE_NUM):
+            p = dict(params, scode=','.join(batch_codes))
+            records.extend(self._request(api, p))
+        return self._to_dataframe(api, records)
+
+    def _iter_query(self, level, params):
+        """按代码批次逐批读取项目数据"""
+        api = self.api_map[level]
+        for batch_codes in loop_codes(self.stock_code_list, BATCH_CODE_NUM):
+            p = dict(params, scode=','.join(batch_codes))
+            df = self._to_dataframe(api, self._request(api, p))
+            if not df.empty:
+                yield df
+
+    @property
+    def is_available(self):
+        """
+        API可用状态
+
+        判定标准为读取单一市场分类代码的基本资料。如行数与代码数量一致，表明正常；否则异常。
+        检查结果在`HEALTH_TTL`秒内有效，同类实例共用。
+        """
+        cached = DataBrowseClient._health.get('time')
+        if cached is not None and time.time() - cached < HEALTH_TTL:
+            return DataBrowseClient._health['status']
+        try:
+            records = self._request(
+                CLASSIFY_API, {'platetype': MARKET_PLATE_TYPE,
+                               'platecode': MARKET_PLATES[HEALTH_MARKET]})
+            codes = [r['SECCODE'] for r in records]
+            api = self.api_map['1.1']
+            actual = len(self._request(api, {'scode': ','.join(codes)}))
+            status = len(codes) > 0 and len(codes) == actual
+        except Exception as e:
+            self.logger.error(e)
+            status = False
+        DataBrowseClient._health = {'time': time.time(), 'status': status}
+        return status
+
+
+class ThematicStatisticsClient(WebApiClient):
+    """专题统计JSON接口"""
+
+    api_name = '专题统计'
+    name_map = TS_NAME
+    date_map = TS_DATE_FREQ
+    api_map = TS_API
+
+    def reset(self):
+        super().reset()
+        self._options = {}
+
+    def _option_values(self, level):
+        """项目下拉选项值列表"""
+        if level not in self._options:
+            records = self._request(OPTION_API, {'apiname': self.api_map[level]})
+            self._options[level] = [r['optionValue'] for r in records]
+        return self._options[level]
+
+    def _option_params(self, level, option=None):
+        """项目各选项查询参数列表
+
+        与网页版一致：`全部`方式以空值一次读取，`逐项`方式按各选项值分别读取。
+        指定`option`时只读取该选项。
+        """
+        if level not in TS_OPTIONS:
+            return super()._option_params(level, option)
+        name, how = TS_OPTIONS[level]
+        if option is not None:
+            return [{name: option}]
+        if how == '全部':
+            return [{name: ''}]
+        return [{name: v} for v in self._option_values(level)]
+
+    @property
+    def is_available(self):
+        """故障概率低，返回True"""
+        return True
@@ -0,0 +1,111 @@
+"""
+电子表格读取
+
+网站下载的`.xls`、`.xlsx`内容统一由`read_excel`解析。读取引擎：
+    calamine -- 基于`python-calamine`(Rust)，安装后默认使用，速度快
+    pandas   -- `pd.read_excel`默认引擎(xlrd/openpyxl)
+
+两种引擎均由pandas解析器完成表头、列选择、缺失值及类型转换，结果一致。
+默认引擎可由环境变量`CNSWD_EXCEL_ENGINE`指定，或以`register_reader`注册新引擎。
+
+用法：
+    >>> df = read_excel(get_content(url), usecols=['证券代码', '证券简称'],
+    ...                 dtype={'证券代码': str})
+"""
+import os
+from io import BytesIO
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+ENV_ENGINE = 'CNSWD_EXCEL_ENGINE'
+# 传递给解析器的关键字参数
+PARSER_KWDS = ('header', 'skiprows', 'usecols', 'dtype', 'na_values',
+               'thousands', 'index_col', 'parse_dates')
+
+
+def _to_io(io):
+    """字节内容转换为文件对象，路径及文件对象保持不变"""
+    if isinstance(io, (bytes, bytearray)):
+        return BytesIO(io)
+    return io
+
+
+def _frame(rows, **kwds):
+    """单元格数据(行列表)解析为`DataFrame`"""
+    kwds = {k: v for k, v in kwds.items() if v is not None}
+    kwds.setdefault('header', 0)
+    return TextParser(rows, **kwds).read()
+
+
+def _read_pandas(io, sheet_name, **kwds):
+    kwds = {k: v for k, v in kwds.items() if v is not None}
+    return pd.read_excel(io, sheet_name=sheet_name, **kwds)
+
+
+def _read_calamine(io, sheet_name, **kwds):
+    from python_calamine import CalamineWorkbook
+    wb = CalamineWorkbook.from_object(io)
+    if isinstance(sheet_name, int):
+        sheet = wb.get_sheet_by_index(sheet_name)
+    else:
+        sheet = wb.get_sheet_by_name(sheet_name)
+    return _frame(sheet.to_python(skip_empty_area=False), **kwds)
+
+
+_READERS = {
+    'calamine': _read_calamine,
+    'pandas': _read_pandas,
+}
+
+
+def register_reader(name, func):
+    """注册读取引擎
+
+    Arguments:
+        name {str} -- 引擎名称
+        func {callable} -- `func(io, sheet_name, **kwds)`，返回`DataFrame`
+    """
+    _READERS[name] = func
+
+
+def available_engines():
+    """当前环境可用的读取引擎"""
+    res = []
+    for name in _READERS:
+        if name == 'calamine':
+            try:
+                import python_calamine  # noqa: F401
+            except ImportError:
+                continue
+        res.append(name)
+    return res
+
+
+def default_engine():
+    """默认读取引擎"""
+    name = os.environ.get(ENV_ENGINE)
+    if name:
+        assert name in _READERS, f'读取引擎可接受范围：{list(_READERS)}'
+        return name
+    return available_engines()[0]
+
+
+def read_excel(io, sheet_name=0, engine=None, **kwds):
+    """读取电子表格
+
+    Arguments:
+        io {bytes, str, file-like} -- 表格内容、文件路径或文件对象
+
+    Keyword Arguments:
+        sheet_name {int, str} -- 工作表序号或名称 (default: {0})
+        engine {str} -- 读取引擎，为None时使用默认引擎 (default: {None})
+        kwds -- 解析参数，可接受范围见`PARSER_KWDS`，含义与`pd.read_excel`一致
+
+    Returns:
+        pd.DataFrame -- 表格数据
+    """
+    unknown = set(kwds) - set(PARSER_KWDS)
+    assert not unknown, f'不支持的参数：{unknown}'
+    reader = _READERS[engine or default_engine()]
+    return reader(_to_io(io), sheet_name, **kwds)
@@ -26,3 +26,13 @@ class FrequentAccess(Exception):
 class RetryException(Exception):
     """当数据不完整等原因触发，提示可以重新尝试"""
     pass
+
+
+class NoFixture(ConnectFailed):
+    """回放模式下无对应的响应夹具"""
+    pass
+
+
+class BudgetExceeded(Exception):
+    """超出时间预算，稍后重试，无需重建会话"""
+    pass
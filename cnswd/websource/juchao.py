@@ -36,6 +36,7 @@ from bs4 import BeautifulSoup
 
 from cnswd.utils import data_root
 from cnswd.websource.base import friendly_download, get_page_response
+from cnswd.websource.replay import get_content, request
 from cnswd.websource.exceptions import ConnectFailed, NoDataBefore, NoWebData, ThreeTryFailed
 
 EARLIEST_DATE = pd.Timestamp('2004-6-30')
@@ -169,7 +170,7 @@ def _get_url(stock_code, lm):
 def fetch_company_brief_info(stock_code):
     """公司简要信息"""
     url = _get_url(stock_code, 'brief')
-    r = requests.get(url)
+    r = request('get', url)
     r.encoding = 'gb18030'
     df = pd.read_html(r.text, flavor='lxml')[1]
     return df
@@ -328,10 +329,10 @@ def fetch_industry(date_str, department):
     url_fmt = 'http://www.cnindex.com.cn/syl/{}/{}_hsls.html'
     url = url_fmt.format(date_str, department)
     try:
-        df = pd.read_html(url)[1].loc[:, range(2)]
+        df = pd.read_html(BytesIO(get_content(url)))[1].loc[:, range(2)]
         df.columns = ['industry_id', 'name']
         return df
-    except HTTPError:
+    except (HTTPError, requests.HTTPError):
         msg_fmt = "或者当前日期的数据尚未发布，或者日期'{}'并非交易日"
         raise ValueError(msg_fmt.format(date_str))
 
@@ -411,7 +412,7 @@ def ensure_report_date(date_):
 
 
 def _retry_one_page(url, data):
-    r = requests.post(url, data)
+    r = request('post', url, data=data)
     return r.json()['prbookinfos']
 
 
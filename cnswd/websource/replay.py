@@ -0,0 +1,297 @@
+"""
+网络请求录制与回放
+
+各网站模块通过`request`、`async_request`访问网络。按传输模式：
+    live   -- 直接访问网站(默认)
+    record -- 访问网站，同时将响应保存至夹具库
+    replay -- 从夹具库读取响应，按设定模拟延时及访问频率限制，不访问网络
+
+默认模式可由环境变量`CNSWD_HTTP_MODE`、夹具目录由`CNSWD_FIXTURE_DIR`指定。
+
+用法：
+    >>> with using(Transport('replay', FixtureStore(path), latency=0.05, rate=10)):
+    ...     df = fetch_history('000001', '2018-01-01', '2018-12-31')
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from cnswd.utils import data_root
+from cnswd.websource.exceptions import NoFixture
+
+MODES = ('live', 'record', 'replay')
+ENV_MODE = 'CNSWD_HTTP_MODE'
+ENV_DIR = 'CNSWD_FIXTURE_DIR'
+# 防缓存随机参数，不参与夹具键值
+RANDOM_PAT = re.compile(r'[?&](random|_|rnd)=[0-9.]+')
+CHARSET_PAT = re.compile(r'charset=([\w-]+)', re.I)
+
+
+def _normalize(value):
+    """请求参数转换为稳定的可序列化形式"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    if isinstance(value, dict):
+        return sorted((str(k), str(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [list(map(str, x)) if isinstance(x, (list, tuple)) else str(x)
+                for x in value]
+    return str(value)
+
+
+class FixtureStore(object):
+    """夹具库
+
+    每项响应保存为`<键值>.json`(元数据)及`<键值>.body`(内容)，按键值前两位分目录
+
+    Arguments:
+        root {str} -- 夹具目录
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def key(method, url, params=None, data=None):
+        """请求键值"""
+        parts = [method.upper(), RANDOM_PAT.sub('', url),
+                 _normalize(params), _normalize(data)]
+        content = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def save(self, key, meta, content):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.body', 'wb') as f:
+            f.write(content)
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def load(self, key):
+        """返回(元数据, 内容)，无夹具时返回None"""
+        path = self._path(key)
+        try:
+            with open(path + '.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(path + '.body', 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        return meta, content
+
+    def keys(self):
+        """全部夹具键值"""
+        if not os.path.isdir(self.root):
+            return []
+        return [f[:-5] for _, _, files in os.walk(self.root)
+                for f in files if f.endswith('.json')]
+
+    def __len__(self):
+        return len(self.keys())
+
+
+class ReplayResponse(object):
+    """异步请求响应，与`aiohttp.ClientResponse`读取方法一致"""
+
+    def __init__(self, status, content, headers, url, encoding=None):
+        self.status = status
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.url = url
+        self.encoding = encoding
+
+    def _encoding(self):
+        if self.encoding:
+            return self.encoding
+        m = CHARSET_PAT.search(self.headers.get('Content-Type', ''))
+        return m.group(1) if m else 'utf-8'
+
+    async def read(self):
+        return self.content
+
+    async def text(self, encoding=None):
+        return self.content.decode(encoding or self._encoding(), 'replace')
+
+    async def json(self, **kwargs):
+        return json.loads(await self.text())
+
+
+def _to_response(meta, content):
+    """夹具转换为`requests.Response`"""
+    r = requests.models.Response()
+    r.status_code = meta['status']
+    r._content = content
+    r.url = meta['url']
+    r.headers = CaseInsensitiveDict(meta['headers'])
+    r.encoding = meta['encoding']
+    r.elapsed = timedelta(seconds=meta['elapsed'])
+    return r
+
+
+class Transport(object):
+    """网络传输
+
+    Keyword Arguments:
+        mode {str} -- 传输模式，见`MODES` (default: {'live'})
+        store {FixtureStore} -- 夹具库，录制及回放模式必须提供 (default: {None})
+        latency {float} -- 回放时每次响应延时(秒)，为None时使用录制时的响应时间 (default: {0})
+        rate {float} -- 回放时同一网站每秒最多请求次数，为None时不限制 (default: {None})
+    """
+
+    def __init__(self, mode='live', store=None, latency=0, rate=None):
+        assert mode in MODES, f'传输模式可接受范围：{MODES}'
+        assert mode == 'live' or store is not None, f'{mode}模式需要提供夹具库'
+        self.mode = mode
+        self.store = store
+        self.latency = latency
+        self.rate = rate
+        self.stats = {'requests': 0, 'bytes': 0}
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.mode})'
+
+    def _count(self, content):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += len(content)
+
+    def _delay(self, url, meta):
+        """回放等待时长：访问频率限制 + 响应延时"""
+        wait = 0
+        if self.rate:
+            host = urlparse(url).netloc
+            with self._lock:
+                now = time.time()
+                start = max(now, self._next.get(host, now))
+                self._next[host] = start + 1 / self.rate
+            wait = start - now
+        latency = meta['elapsed'] if self.latency is None else self.latency
+        return wait + latency
+
+    def _load(self, key, method, url):
+        fixture = self.store.load(key)
+        if fixture is None:
+            raise NoFixture(f'无回放夹具：{method.upper()} {url}')
+        return fixture
+
+    def request(self, method, url, **kwargs):
+        """同步请求，参数与`requests.request`一致"""
+        if self.mode == 'live':
+            r = requests.request(method, url, **kwargs)
+            self._count(r.content)
+            return r
+        key = FixtureStore.key(method, url, kwargs.get('params'),
+                               kwargs.get('data', kwargs.get('json')))
+        if self.mode == 'record':
+            r = requests.request(method, url, **kwargs)
+            meta = {'method': method.upper(), 'url': r.url, 'status': r.status_code,
+                    'headers': {'Content-Type': r.headers.get('Content-Type', '')},
+                    'encoding': r.encoding, 'elapsed': r.elapsed.total_seconds()}
+            self.store.save(key, meta, r.content)
+            self._count(r.content)
+            return r
+        meta, content = self._load(key, method, url)
+        time.sleep(self._delay(url, meta))
+        self._count(content)
+        return _to_response(meta, content)
+
+    async def async_request(self, session, method, url, **kwargs):
+        """异步请求，读取全部内容后返回`ReplayResponse`
+
+        Arguments:
+            session {aiohttp.ClientSession} -- 会话，为None时使用`aiohttp.request`
+        """
+        key = FixtureStore.key(method, url, kwargs.get('params'),
+                               kwargs.get('data', kwargs.get('json')))
+        if self.mode == 'replay':
+            meta, content = self._load(key, method, url)
+            await asyncio.sleep(self._delay(url, meta))
+            self._count(content)
+            return ReplayResponse(meta['status'], content, meta['headers'],
+                                  meta['url'], meta['encoding'])
+        # 延迟导入，仅使用同步请求时不依赖aiohttp
+        import aiohttp
+        start = time.time()
+        if session is None:
+            ctx = aiohttp.request(method, url, **kwargs)
+        else:
+            ctx = session.request(method, url, **kwargs)
+        async with ctx as r:
+            content = await r.read()
+            res = ReplayResponse(r.status, content,
+                                 {'Content-Type': r.headers.get('Content-Type', '')},
+                                 str(r.url), r.charset)
+        if self.mode == 'record':
+            meta = {'method': method.upper(), 'url': res.url, 'status': res.status,
+                    'headers': dict(res.headers), 'encoding': res.encoding,
+                    'elapsed': time.time() - start}
+            self.store.save(key, meta, content)
+        self._count(content)
+        return res
+
+
+def _default_transport():
+    mode = os.environ.get(ENV_MODE, 'live')
+    if mode == 'live':
+        return Transport()
+    root = os.environ.get(ENV_DIR) or data_root('fixtures')
+    return Transport(mode, FixtureStore(root))
+
+
+_transport = _default_transport()
+
+
+def get_transport():
+    """当前传输"""
+    return _transport
+
+
+def set_transport(transport):
+    """设置当前传输，返回原传输"""
+    global _transport
+    old, _transport = _transport, transport
+    return old
+
+
+@contextmanager
+def using(transport):
+    """在上下文中使用指定传输"""
+    old = set_transport(transport)
+    try:
+        yield transport
+    finally:
+        set_transport(old)
+
+
+def request(method, url, **kwargs):
+    """以当前传输执行同步请求"""
+    return _transport.request(method, url, **kwargs)
+
+
+async def async_request(session, method, url, **kwargs):
+    """以当前传输执行异步请求"""
+    return await _transport.async_request(session, method, url, **kwargs)
+
+
+def get_content(url, method='get', **kwargs):
+    """读取网页内容(字节)，响应状态异常时引发`requests.HTTPError`"""
+    r = request(method, url, **kwargs)
+    r.raise_for_status()
+    return r.content
@@ -8,12 +8,13 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import csv
 import re
 from datetime import date
+from io import BytesIO, StringIO
 from urllib.error import HTTPError
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 import logbook
 
@@ -21,9 +22,14 @@ from cnswd.constants import QUOTE_COLS
 from cnswd.utils import ensure_list
 from cnswd.data_proxy import DataProxy
 from cnswd.websource.base import friendly_download, get_page_response
+from cnswd.websource.replay import get_content, request
 from cnswd.websource.exceptions import NoWebData, FrequentAccess
 
 QUOTE_PATTERN = re.compile('"(.*)"')
+# 股票代码及前32个字段
+HQ_PATTERN = re.compile(r'hq_str_s[zh](\d{6})="((?:[^,"]*,){31}[^,"]*)')
+HQ_DTYPES = {c: 'int64' if c.endswith('量') else 'float64' for c in QUOTE_COLS[2:-2]}
+HQ_DTYPES.update({'股票代码': str, '股票简称': str, '日期': str, '时间': str})
 NEWS_PATTERN = re.compile(r'\W+')
 STOCK_CODE_PATTERN = re.compile(r'\d{6}')
 DATA_BASE_URL = 'http://vip.stock.finance.sina.com.cn/q/go.php/'
@@ -36,7 +42,7 @@ def fetch_company_info(stock_code):
     """获取公司基础信息"""
     url_fmt = 'http://vip.stock.finance.sina.com.cn/corp/go.php/vCI_CorpInfo/stockid/{}.phtml'
     url = url_fmt.format(stock_code)
-    df = pd.read_html(url, attrs={'id': 'comInfo1'})[0]
+    df = pd.read_html(BytesIO(get_content(url)), attrs={'id': 'comInfo1'})[0]
     return df
 
 
@@ -44,7 +50,7 @@ def fetch_issue_new_stock_info(stock_code):
     """获取发行新股信息"""
     url_fmt = 'http://vip.stock.finance.sina.com.cn/corp/go.php/vISSUE_NewStock/stockid/{}.phtml'
     url = url_fmt.format(stock_code)
-    df = pd.read_html(url, attrs={'id': 'comInfo1'})[0]
+    df = pd.read_html(BytesIO(get_content(url)), attrs={'id': 'comInfo1'})[0]
     return df
 
 
@@ -56,14 +62,31 @@ def _add_prefix(stock_code):
         return 'sz{}'.format(stock_code)
 
 
-def _to_dataframe(content, p_codes):
-    """解析网页数据，返回DataFrame对象"""
-    res = [x.split(',') for x in re.findall(QUOTE_PATTERN, content)]
-    df = pd.DataFrame(res).iloc[:, :32]
-    df.columns = QUOTE_COLS[1:]
-    df.insert(0, '股票代码', p_codes)
-    # df['股票代码'] = p_codes
-    df.dropna(inplace=True)
+def parse_hq(content):
+    """解析实时报价网页内容，返回已转换类型的DataFrame对象
+
+    以单一正则表达式同时提取股票代码及前32个字段(无数据的股票不匹配)，
+    再以C解析器一次完成全部列的类型转换。
+
+    Arguments:
+        content {str} -- 形如`var hq_str_sz000001="平安银行,...";`的多行内容
+
+    Returns:
+        pd.DataFrame -- 列见`QUOTE_COLS`
+    """
+    found = HQ_PATTERN.findall(content)
+    if not found:
+        return pd.DataFrame({c: pd.Series(dtype=HQ_DTYPES.get(c, 'object'))
+                             for c in QUOTE_COLS})
+    codes, rows = zip(*found)
+    kwds = {'header': None, 'names': QUOTE_COLS[1:], 'quoting': csv.QUOTE_NONE}
+    try:
+        df = pd.read_csv(StringIO('\n'.join(rows)), dtype=HQ_DTYPES, na_filter=False, **kwds)
+    except ValueError:
+        # 存在空值或非整数成交量时，数值列均以浮点数读取
+        dtypes = {c: 'float64' if t == 'int64' else t for c, t in HQ_DTYPES.items()}
+        df = pd.read_csv(StringIO('\n'.join(rows)), dtype=dtypes, **kwds)
+    df.insert(0, '股票代码', codes)
     return df
 
 
@@ -100,7 +123,7 @@ def fetch_quotes(stock_codes):
         p_codes = stock_codes[i * length:(i + 1) * length]
         url = url_fmt.format(','.join(map(_add_prefix, p_codes)))
         content = get_page_response(url).text
-        dfs.append(_to_dataframe(content, p_codes))
+        dfs.append(parse_hq(content))
     return pd.concat(dfs).sort_values('股票代码')
 
 # 不可用
@@ -109,7 +132,7 @@ def fetch_quotes(stock_codes):
 def fetch_globalnews():
     """获取24*7全球财经新闻"""
     url = 'http://live.sina.com.cn/zt/f/v/finance/globalnews1'
-    response = requests.get(url)
+    response = request('get', url)
     today = date.today()
     soup = BeautifulSoup(response.content, "lxml")
 
@@ -167,7 +190,7 @@ def fetch_cjmx(stock_code, date_):
     # 单日交易数据不可能超过1000页
     for i in range(1, 1000):
         params['page'] = i
-        r = requests.get(url, params=params)
+        r = request('get', url, params=params)
         r.encoding = 'gb18030'
         df = pd.read_html(r.text, attrs={'id': 'datatbl'}, na_values=['--'])[0]
         if '没有交易数据' in df.iat[0, 0]:
@@ -188,7 +211,7 @@ def _common_fun(url, pages, skiprows=1, verbose=False):
 
     def sina_read_fun(x):
         return pd.read_html(
-            x,
+            BytesIO(get_content(x)),
             skiprows=skiprows,
             na_values=['--'],
             flavor='html5lib',
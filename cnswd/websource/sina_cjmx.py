@@ -5,9 +5,10 @@ import time
 
 import logbook
 import pandas as pd
-import requests
 
+from cnswd.utils import normalize_ticks
 from cnswd.websource.base import friendly_download
+from cnswd.websource.replay import request
 from cnswd.websource._selenium import make_headless_browser
 
 log = logbook.Logger('提取成交明细网页数据')
@@ -43,13 +44,9 @@ def _query_url(code, date):
 def _fix_data(df, code, date):
     """整理数据框"""
     df.columns = ['成交时间', '成交价', '价格变动', '成交量', '成交额', '性质']
-    date_str = _to_str(date)
-    df.成交时间 = df.成交时间.map(lambda x: pd.Timestamp('{} {}'.format(date_str, x)))
     df['股票代码'] = code
     # df['涨跌幅'] = df['涨跌幅'].str.replace('%', '').astype(float) * 0.01
-    df['成交量'] = df['成交量'] * 100
-    df = df.sort_values('成交时间')
-    return df
+    return normalize_ticks(df, date, volume_scale=100)
 
 
 def _get_cjmx_1(code, date):
@@ -61,7 +58,7 @@ def _get_cjmx_1(code, date):
         raise NotImplementedError('尚未完成')
     for i in range(1, 1000):
         url = url_fmt.format(symbol_=symbol_, date_str=d.strftime(r'%Y-%m-%d'), page=i)
-        r = requests.get(url)
+        r = request('get', url)
         r.encoding = 'gb18030'
         # 当天不交易时，返回空`DataFrame`对象
         try:
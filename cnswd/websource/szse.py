@@ -14,7 +14,8 @@
 """
 import random
 
-import pandas as pd
+from cnswd.websource.excel import read_excel
+from cnswd.websource.replay import get_content
 
 HOST_URL = 'http://www.szse.cn/api/report/ShowReport'
 
@@ -27,8 +28,8 @@ def fetch_companys_info():
     """
     url = HOST_URL + \
         f'?SHOWTYPE=xlsx&CATALOGID=1110x&TABKEY=tab1?random={random.random()}'
-    df = pd.read_excel(url, thousands=',', dtype={
-                       '公司代码': str, 'A股代码': str, 'B股代码': str})
+    df = read_excel(get_content(url), thousands=',', dtype={
+        '公司代码': str, 'A股代码': str, 'B股代码': str})
     df.columns = df.columns.str.replace(r'\s', '')
     return df
 
@@ -37,7 +38,7 @@ def fetch_suspend_stocks():
     """获取暂停上市股票列表"""
     url = HOST_URL + \
         f'?SHOWTYPE=xlsx&CATALOGID=1793_ssgs&TABKEY=tab1&random={random.random()}'
-    df = pd.read_excel(url, dtype={'证券代码': str})
+    df = read_excel(get_content(url), dtype={'证券代码': str})
     return df
 
 
@@ -45,7 +46,7 @@ def fetch_delisting_stocks():
     """获取终止上市股票清单"""
     url = HOST_URL + \
         f'?SHOWTYPE=xlsx&CATALOGID=1793_ssgs&TABKEY=tab2&random={random.random()}'
-    df = pd.read_excel(url, dtype={'证券代码': str})
+    df = read_excel(get_content(url), dtype={'证券代码': str})
     return df
 
 
@@ -53,7 +54,7 @@ def fetch_fullname_history():
     """获取全称变更历史"""
     url = HOST_URL + \
         f'?SHOWTYPE=xlsx&CATALOGID=SSGSGMXX&TABKEY=tab1&random={random.random()}'
-    df = pd.read_excel(url, dtype={'证券代码': str})
+    df = read_excel(get_content(url), dtype={'证券代码': str})
     return df
 
 
@@ -61,7 +62,7 @@ def fetch_shortname_history():
     """获取简称变更历史"""
     url = HOST_URL + \
         f'?SHOWTYPE=xlsx&CATALOGID=SSGSGMXX&TABKEY=tab2&random={random.random()}'
-    df = pd.read_excel(url, dtype={'证券代码': str})
+    df = read_excel(get_content(url), dtype={'证券代码': str})
     return df
 
 
@@ -22,9 +22,9 @@ import re
 import click
 from bs4 import BeautifulSoup
 import pandas as pd
-from io import BytesIO
 
 from cnswd.websource.base import get_page_response
+from cnswd.websource.excel import read_excel
 
 QQ_URL_BASE = 'http://stockapp.finance.qq.com/mstats/'
 
@@ -156,7 +156,7 @@ def fetch_minutely_prices():
     url = 'http://stock.gtimg.cn/data/get_hs_xls.php?id=ranka&type=1&metric=chr'
     kwds = {'skiprows': [0], 'index_col': '代码'}
     page_response = get_page_response(url, 'post')
-    df = pd.read_excel(BytesIO(page_response.content), **kwds)
+    df = read_excel(page_response.content, **kwds)
     df.updatetime = pd.Timestamp('now')
     return df
 
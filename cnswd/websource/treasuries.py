@@ -14,6 +14,7 @@ import pandas as pd
 
 from cnswd.utils import data_root, sanitize_dates
 from cnswd.websource._selenium import make_headless_browser_with_auto_save_path
+from cnswd.websource.excel import read_excel
 
 EARLIEST_POSSIBLE_DATE = pd.Timestamp('2002-1-4', tz='UTC')
 
@@ -37,7 +38,7 @@ def read_local_data():
         for name in files:
             if name.endswith("xlsx"):
                 file_path = os.path.join(root, name)
-                df = pd.read_excel(file_path, index_col='日期', parse_dates=True)
+                df = read_excel(file_path, index_col='日期', parse_dates=True)
                 dfs.append(df)
     return pd.concat(dfs)
 
@@ -17,7 +17,6 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from urllib.error import HTTPError
 from bs4 import BeautifulSoup
 import requests
 import pandas as pd
@@ -28,6 +27,8 @@ from io import StringIO, BytesIO
 from cnswd.utils import sanitize_dates
 
 from cnswd.websource.base import get_page_response, friendly_download
+from cnswd.websource.excel import read_excel
+from cnswd.websource.replay import get_content, request
 from cnswd.websource.exceptions import NoWebData, NoDataBefore
 
 
@@ -40,6 +41,8 @@ _WY_INDEX_HISTORY_USE_COLS = list(
     set(range(15)).difference((1, 10, 13, 14, 15)))
 _WY_STOCK_HISTORY_USE_COLS = list(set(range(15)).difference([1]))
 _CJMX_COLS = ('时间', '价格', '涨跌额', '成交量', '成交额', '方向')
+# 按列序号指定类型，免去逐列推断(成交量保留推断，以容纳缺失值)
+_CJMX_DTYPE = {0: str, 1: float, 2: float, 4: float, 5: str}
 
 _WY_MARGIN_DATA_USE_COLS = [1, 4, 5, 6, 7, 8, 9, 10, 11]
 _WY_MARGIN_DATA_COL_NAMES = ['股票代码', '融资余额', '融资买入额', '融资偿还额',
@@ -157,11 +160,31 @@ def fetch_last_history():
     url += "page=0&query=STYPE:EQA&fields=SYMBOL,NAME,PRICE,PERCENT,OPEN,YESTCLOSE,"
     url += "HIGH,LOW,VOLUME,TURNOVER,PE,MCAP,TCAP&sort=PERCENT&"
     url += "order=desc&count=5000&type=query"
-    r = requests.get(url)
+    r = request('get', url)
     df = pd.DataFrame.from_records(r.json()['list'])
     return df
 
 
+def _cjmx_url(code, tdate):
+    """成交明细网址"""
+    tdate = pd.Timestamp(tdate)
+    url_fmt = 'http://quotes.money.163.com/cjmx/{qyear}/{qdate}/{qcode}.xls'
+    qyear = tdate.year
+    qdate = tdate.strftime(r'%Y%m%d')
+    qcode = _query_code(code, False)
+    return url_fmt.format_map({'qyear': qyear, 'qdate': qdate, 'qcode': qcode})
+
+
+def parse_cjmx(content, code, tdate):
+    """解析成交明细`.xls`内容"""
+    na_values = ['None', '--', 'none']
+    df = read_excel(content, na_values=na_values, dtype=_CJMX_DTYPE)
+    df.columns = _CJMX_COLS
+    df.insert(0, '日期', pd.Timestamp(tdate))
+    df.insert(0, '股票代码', code)
+    return df
+
+
 @friendly_download(10, None, 1)
 def fetch_cjmx(code, tdate):
     """
@@ -172,21 +195,12 @@ def fetch_cjmx(code, tdate):
         当前滞后2日
     """
     tdate = pd.Timestamp(tdate)
-    url_fmt = 'http://quotes.money.163.com/cjmx/{qyear}/{qdate}/{qcode}.xls'
-    qyear = tdate.year
-    qdate = tdate.strftime(r'%Y%m%d')
-    qcode = _query_code(code, False)
-    url = url_fmt.format_map({'qyear': qyear, 'qdate': qdate, 'qcode': qcode})
-    na_values = ['None', '--', 'none']
-    kwds = {'na_values': na_values}
+    url = _cjmx_url(code, tdate)
     try:
-        df = pd.read_excel(url, **kwds)
-    except HTTPError:
+        content = get_content(url)
+    except requests.HTTPError:
         raise NoWebData('不存在网页数据。股票：{}，日期：{}'.format(code, tdate.date()))
-    df.columns = _CJMX_COLS
-    df.insert(0, '日期', tdate)
-    df.insert(0, '股票代码', code)
-    return df
+    return parse_cjmx(content, code, tdate)
 
 
 def _cwzb_url(code, type, part):
@@ -239,7 +253,7 @@ def fetch_financial_indicator(code, report_type, part):
     assert part in ('zhzb', 'ylnl', 'chnl', 'cznl', 'yynl')
     url = _cwzb_url(code, report_type, part)
     data = pd.read_csv(
-        url, na_values=['--', ' --', '-- '], encoding='gb2312').iloc[:, :-1]
+        BytesIO(get_content(url)), na_values=['--', ' --', '-- '], encoding='gb2312').iloc[:, :-1]
     return data
 
 
@@ -265,7 +279,7 @@ def fetch_financial_report(code, report_type, report_item):
     assert report_item in ('lrb', 'zcfzb', 'xjllb')
     url = _report_url(code, report_type, report_item)
     data = pd.read_csv(
-        url, na_values=['--', ' --', '-- '], encoding='gb18030').iloc[:, :-1]
+        BytesIO(get_content(url)), na_values=['--', ' --', '-- '], encoding='gb18030').iloc[:, :-1]
     return data
 
 
@@ -305,7 +319,7 @@ def fetch_company_info(stock_code):
     url_fmt = 'http://quotes.money.163.com/f10/gszl_{}.html'
     url = url_fmt.format(stock_code)
     attrs = {'class': 'table_bg001 border_box limit_sale table_details'}
-    res = pd.read_html(url, attrs=attrs)
+    res = pd.read_html(BytesIO(get_content(url)), attrs=attrs)
     return res[0], res[1]
 
 
@@ -414,7 +428,8 @@ def fetch_top10_stockholder(stock_code, query_date, type_='c'):
     # df = pd.read_html(url, encoding='utf-8', header=0, skiprows=range(1))[0]
     attrs = {'class': 'table_bg001 border_box limit_sale'}
     # 必须使用html5lib解析
-    df = pd.read_html(url, encoding='utf-8', attrs=attrs, flavor='html5lib')[0]
+    df = pd.read_html(BytesIO(get_content(url)), encoding='utf-8',
+                      attrs=attrs, flavor='html5lib')[0]
     return df
 
 
@@ -500,7 +515,7 @@ def fetch_margin_data(query_date):
     url_fmt = "http://quotes.money.163.com/data/margintrade,{}.html"
     date_str = query_date.strftime('%Y%m%d')
     url = url_fmt.format(date_str)
-    df = pd.read_html(url)[2].iloc[:, _WY_MARGIN_DATA_USE_COLS]
+    df = pd.read_html(BytesIO(get_content(url)))[2].iloc[:, _WY_MARGIN_DATA_USE_COLS]
     df.columns = _WY_MARGIN_DATA_COL_NAMES
     df.insert(1, '日期', query_date.date())
     return df
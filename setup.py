@@ -17,6 +17,12 @@ setup(
     """,
     install_requires=requires +
     ['python_version>="3.7"'],
+    extras_require={
+        # 快速电子表格读取引擎
+        'fast': ['python-calamine'],
+        # 成交明细Parquet存储
+        'parquet': ['pyarrow'],
+    },
     tests_require=["pytest", "parameterized"],
     include_package_data=True,
     entry_points={